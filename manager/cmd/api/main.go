@@ -67,6 +67,7 @@ func main() {
 
 	// Message endpoints
 	protected.POST("/message", messageHandler.AddMessage)
+	protected.POST("/messages", messageHandler.AddMessages)
 
 	// Token endpoints
 	protected.POST("/token", tokenHandler.AddTokenUsage)
@@ -78,6 +79,13 @@ func main() {
 	protected.GET("/chat-history", chatHistoryHandler.GetChatHistory)
 	protected.PUT("/chat-history", chatHistoryHandler.UpdateChatHistory)
 	protected.DELETE("/chat-history", chatHistoryHandler.DeleteChatHistory)
+	protected.GET("/chat-history/summary", chatHistoryHandler.GetSummary)
+	protected.PUT("/chat-history/summary", chatHistoryHandler.UpdateSummary)
+
+	// Conversation context endpoint (prompt + history + memories in one round trip)
+	contextService := service.NewContextService(promptService, chatHistoryService, memoryService)
+	contextHandler := handler.NewContextHandler(contextService)
+	protected.GET("/context", contextHandler.GetConversationContext)
 
 	// Memory endpoints
 	protected.POST("/memory", memoryHandler.AddMemory)
@@ -71,6 +71,8 @@ func InitializeSchema(db *sql.DB) error {
 		messages JSONB NOT NULL
 	);
 
+	ALTER TABLE chat_history ADD COLUMN IF NOT EXISTS summary TEXT NOT NULL DEFAULT '';
+
 	CREATE TABLE IF NOT EXISTS user_memories (
 		id SERIAL PRIMARY KEY,
 		guild_id TEXT NOT NULL,
@@ -3,6 +3,7 @@ package handler
 import (
 	"net/http"
 	"server/internal/database"
+	"server/internal/model"
 	"server/internal/service"
 
 	"github.com/gin-gonic/gin"
@@ -67,3 +68,40 @@ func (h *ChatHistoryHandler) DeleteChatHistory(c *gin.Context) {
 
 	c.JSON(http.StatusOK, gin.H{"message": "Chat history deleted successfully"})
 }
+
+func (h *ChatHistoryHandler) GetSummary(c *gin.Context) {
+	guildID := c.Query("guild_id")
+	if guildID == "" {
+		c.JSON(http.StatusBadRequest, gin.H{"error": "guild_id is required"})
+		return
+	}
+
+	summary, err := h.service.GetSummary(guildID)
+	if err != nil {
+		c.JSON(http.StatusInternalServerError, gin.H{"error": "Failed to get chat summary"})
+		return
+	}
+
+	c.JSON(http.StatusOK, model.ChatSummary{Summary: summary})
+}
+
+func (h *ChatHistoryHandler) UpdateSummary(c *gin.Context) {
+	guildID := c.Query("guild_id")
+	if guildID == "" {
+		c.JSON(http.StatusBadRequest, gin.H{"error": "guild_id is required"})
+		return
+	}
+
+	var body model.ChatSummary
+	if err := c.ShouldBindJSON(&body); err != nil {
+		c.JSON(http.StatusBadRequest, gin.H{"error": "Invalid request body"})
+		return
+	}
+
+	if err := h.service.UpdateSummary(guildID, body.Summary); err != nil {
+		c.JSON(http.StatusInternalServerError, gin.H{"error": "Failed to update chat summary"})
+		return
+	}
+
+	c.JSON(http.StatusOK, gin.H{"message": "Chat summary updated successfully"})
+}
@@ -0,0 +1,43 @@
+package handler
+
+import (
+	"net/http"
+	"server/internal/service"
+	"strings"
+
+	"github.com/gin-gonic/gin"
+)
+
+type ContextHandler struct {
+	service *service.ContextService
+}
+
+func NewContextHandler(service *service.ContextService) *ContextHandler {
+	return &ContextHandler{service: service}
+}
+
+func (h *ContextHandler) GetConversationContext(c *gin.Context) {
+	guildID := c.Query("guild_id")
+	if guildID == "" {
+		c.JSON(http.StatusBadRequest, gin.H{"error": "guild_id is required"})
+		return
+	}
+
+	var authorIDs []string
+	for _, id := range strings.Split(c.Query("author_ids"), ",") {
+		if id = strings.TrimSpace(id); id != "" {
+			authorIDs = append(authorIDs, id)
+		}
+	}
+
+	includePrompt := c.DefaultQuery("include_prompt", "true") != "false"
+	includeHistory := c.DefaultQuery("include_history", "true") != "false"
+
+	ctx, err := h.service.GetConversationContext(guildID, authorIDs, includePrompt, includeHistory)
+	if err != nil {
+		c.JSON(http.StatusInternalServerError, gin.H{"error": "Failed to get conversation context"})
+		return
+	}
+
+	c.JSON(http.StatusOK, ctx)
+}
@@ -0,0 +1,143 @@
+package handler
+
+import (
+	"database/sql/driver"
+	"encoding/json"
+	"net/http"
+	"net/http/httptest"
+	"testing"
+
+	"server/internal/service"
+
+	"github.com/gin-gonic/gin"
+)
+
+func newContextRouter(db *fakeDB) *gin.Engine {
+	gin.SetMode(gin.TestMode)
+	conn := db.open()
+	h := NewContextHandler(service.NewContextService(
+		service.NewPromptService(conn),
+		service.NewChatHistoryService(conn),
+		service.NewMemoryService(conn),
+	))
+	router := gin.New()
+	router.GET("/context", h.GetConversationContext)
+	return router
+}
+
+func getContext(t *testing.T, router *gin.Engine, query string) (int, map[string]json.RawMessage) {
+	t.Helper()
+	req, _ := http.NewRequest(http.MethodGet, "/context?"+query, nil)
+	resp := httptest.NewRecorder()
+	router.ServeHTTP(resp, req)
+	var body map[string]json.RawMessage
+	if resp.Code == http.StatusOK {
+		if err := json.Unmarshal(resp.Body.Bytes(), &body); err != nil {
+			t.Fatalf("invalid JSON body: %v", err)
+		}
+	}
+	return resp.Code, body
+}
+
+func TestGetConversationContext(t *testing.T) {
+	db := newFakeDB()
+	db.queryFns["FROM boo_prompts"] = func(args []driver.Value) ([]string, [][]driver.Value, error) {
+		return []string{"guild_id", "system_prompt"}, [][]driver.Value{{"g", "be nice"}}, nil
+	}
+	db.queryFns["FROM chat_history"] = func(args []driver.Value) ([]string, [][]driver.Value, error) {
+		return []string{"messages", "summary"}, [][]driver.Value{{`[{"role":"user","content":"hi"}]`, "earlier"}}, nil
+	}
+	var memoryArgs []driver.Value
+	db.queryFns["FROM user_memories"] = func(args []driver.Value) ([]string, [][]driver.Value, error) {
+		memoryArgs = args
+		columns := []string{"id", "guild_id", "author_id", "author_name", "fact", "created_at"}
+		return columns, [][]driver.Value{
+			{int64(2), "g", "a", "amy", "likes tea", "2024-01-02"},
+			{int64(1), "g", "a", "amy", "likes go", "2024-01-01"},
+		}, nil
+	}
+	router := newContextRouter(db)
+
+	code, body := getContext(t, router, "guild_id=g&author_ids=a,%20b,")
+	if code != http.StatusOK {
+		t.Fatalf("expected 200, got %d", code)
+	}
+	if string(body["system_prompt"]) != `"be nice"` || string(body["summary"]) != `"earlier"` {
+		t.Fatalf("unexpected prompt/summary: %s %s", body["system_prompt"], body["summary"])
+	}
+	if string(body["chat_history"]) != `[{"role":"user","content":"hi"}]` {
+		t.Fatalf("unexpected history: %s", body["chat_history"])
+	}
+
+	// One windowed query for every author, grouped by author, empty for authors without any
+	if len(memoryArgs) != 2 || memoryArgs[0] != "g" || memoryArgs[1] != `{"a","b"}` {
+		t.Fatalf("unexpected memory query args: %v", memoryArgs)
+	}
+	var memories map[string][]struct {
+		Fact string `json:"fact"`
+	}
+	if err := json.Unmarshal(body["memories"], &memories); err != nil {
+		t.Fatalf("invalid memories: %v", err)
+	}
+	if len(memories["a"]) != 2 || memories["a"][0].Fact != "likes tea" {
+		t.Fatalf("unexpected memories for a: %+v", memories["a"])
+	}
+	if b, ok := memories["b"]; !ok || len(b) != 0 {
+		t.Fatalf("expected an empty list for b, got %+v", memories["b"])
+	}
+}
+
+func TestGetConversationContextSkipsCachedParts(t *testing.T) {
+	db := newFakeDB()
+	db.queryFns["FROM user_memories"] = func(args []driver.Value) ([]string, [][]driver.Value, error) {
+		return []string{"id", "guild_id", "author_id", "author_name", "fact", "created_at"}, nil, nil
+	}
+	router := newContextRouter(db)
+
+	code, body := getContext(t, router, "guild_id=g&author_ids=a&include_prompt=false&include_history=false")
+	if code != http.StatusOK {
+		t.Fatalf("expected 200, got %d", code)
+	}
+	if db.ran("boo_prompts") || db.ran("chat_history") {
+		t.Fatal("prompt or history was queried although the caller excluded them")
+	}
+	if string(body["system_prompt"]) != `""` {
+		t.Fatalf("expected an empty prompt, got %s", body["system_prompt"])
+	}
+}
+
+func TestGetConversationContextMissingPrompt(t *testing.T) {
+	db := newFakeDB()
+	db.queryFns["FROM boo_prompts"] = func(args []driver.Value) ([]string, [][]driver.Value, error) {
+		return []string{"guild_id", "system_prompt"}, nil, nil
+	}
+	db.queryFns["FROM chat_history"] = func(args []driver.Value) ([]string, [][]driver.Value, error) {
+		return []string{"messages", "summary"}, nil, nil
+	}
+	router := newContextRouter(db)
+
+	// No prompt row and no authors is still a valid context
+	code, body := getContext(t, router, "guild_id=g")
+	if code != http.StatusOK {
+		t.Fatalf("expected 200, got %d", code)
+	}
+	if string(body["system_prompt"]) != `""` || string(body["chat_history"]) != `[]` {
+		t.Fatalf("unexpected body: %v", body)
+	}
+	if db.ran("user_memories") {
+		t.Fatal("memories were queried without any authors")
+	}
+}
+
+func TestGetConversationContextErrors(t *testing.T) {
+	db := newFakeDB()
+	router := newContextRouter(db)
+
+	if code, _ := getContext(t, router, "author_ids=a"); code != http.StatusBadRequest {
+		t.Fatalf("expected 400 without guild_id, got %d", code)
+	}
+	// fakeDB fails queries it has no answer for
+	if code, _ := getContext(t, router, "guild_id=g&author_ids=a"); code != http.StatusInternalServerError {
+		t.Fatalf("expected 500 when the database fails, got %d", code)
+	}
+}
@@ -0,0 +1,148 @@
+package handler
+
+import (
+	"context"
+	"database/sql"
+	"database/sql/driver"
+	"errors"
+	"io"
+	"strings"
+	"sync"
+)
+
+// queryFunc answers a query with column names and rows.
+type queryFunc func(args []driver.Value) ([]string, [][]driver.Value, error)
+
+// execFunc answers a statement with the number of rows it affected.
+type execFunc func(args []driver.Value) (int64, error)
+
+// fakeDB is an in-memory database/sql driver for handler tests. Each statement is
+// answered by the first registered func whose key occurs in the SQL text, so tests
+// exercise the real services without a Postgres server.
+type fakeDB struct {
+	mu        sync.Mutex
+	queries   []string
+	queryFns  map[string]queryFunc
+	execFns   map[string]execFunc
+	commits   int
+	rollbacks int
+}
+
+func newFakeDB() *fakeDB {
+	return &fakeDB{queryFns: map[string]queryFunc{}, execFns: map[string]execFunc{}}
+}
+
+func (f *fakeDB) open() *sql.DB {
+	return sql.OpenDB(fakeConnector{f})
+}
+
+// ran reports whether any statement containing key was sent.
+func (f *fakeDB) ran(key string) bool {
+	f.mu.Lock()
+	defer f.mu.Unlock()
+	for _, query := range f.queries {
+		if strings.Contains(query, key) {
+			return true
+		}
+	}
+	return false
+}
+
+func (f *fakeDB) record(query string) {
+	f.mu.Lock()
+	defer f.mu.Unlock()
+	f.queries = append(f.queries, query)
+}
+
+func (f *fakeDB) query(query string, args []driver.Value) (driver.Rows, error) {
+	f.record(query)
+	for key, fn := range f.queryFns {
+		if strings.Contains(query, key) {
+			columns, rows, err := fn(args)
+			if err != nil {
+				return nil, err
+			}
+			return &fakeRows{columns: columns, rows: rows}, nil
+		}
+	}
+	return nil, errors.New("fakedb: unexpected query: " + query)
+}
+
+func (f *fakeDB) exec(query string, args []driver.Value) (driver.Result, error) {
+	f.record(query)
+	for key, fn := range f.execFns {
+		if strings.Contains(query, key) {
+			n, err := fn(args)
+			if err != nil {
+				return nil, err
+			}
+			return driver.RowsAffected(n), nil
+		}
+	}
+	return nil, errors.New("fakedb: unexpected statement: " + query)
+}
+
+type fakeConnector struct{ db *fakeDB }
+
+func (c fakeConnector) Connect(context.Context) (driver.Conn, error) { return &fakeConn{c.db}, nil }
+func (c fakeConnector) Driver() driver.Driver                        { return fakeDriver{} }
+
+type fakeDriver struct{}
+
+func (fakeDriver) Open(string) (driver.Conn, error) {
+	return nil, errors.New("fakedb: use sql.OpenDB")
+}
+
+type fakeConn struct{ db *fakeDB }
+
+func (c *fakeConn) Prepare(query string) (driver.Stmt, error) {
+	return &fakeStmt{db: c.db, query: query}, nil
+}
+func (c *fakeConn) Close() error              { return nil }
+func (c *fakeConn) Begin() (driver.Tx, error) { return &fakeTx{c.db}, nil }
+
+type fakeTx struct{ db *fakeDB }
+
+func (t *fakeTx) Commit() error {
+	t.db.mu.Lock()
+	defer t.db.mu.Unlock()
+	t.db.commits++
+	return nil
+}
+
+func (t *fakeTx) Rollback() error {
+	t.db.mu.Lock()
+	defer t.db.mu.Unlock()
+	t.db.rollbacks++
+	return nil
+}
+
+type fakeStmt struct {
+	db    *fakeDB
+	query string
+}
+
+func (s *fakeStmt) Close() error  { return nil }
+func (s *fakeStmt) NumInput() int { return -1 }
+func (s *fakeStmt) Exec(args []driver.Value) (driver.Result, error) {
+	return s.db.exec(s.query, args)
+}
+func (s *fakeStmt) Query(args []driver.Value) (driver.Rows, error) {
+	return s.db.query(s.query, args)
+}
+
+type fakeRows struct {
+	columns []string
+	rows    [][]driver.Value
+}
+
+func (r *fakeRows) Columns() []string { return r.columns }
+func (r *fakeRows) Close() error      { return nil }
+func (r *fakeRows) Next(dest []driver.Value) error {
+	if len(r.rows) == 0 {
+		return io.EOF
+	}
+	copy(dest, r.rows[0])
+	r.rows = r.rows[1:]
+	return nil
+}
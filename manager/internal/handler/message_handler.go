@@ -31,3 +31,25 @@ func (h *MessageHandler) AddMessage(c *gin.Context) {
 
 	c.Status(http.StatusCreated)
 }
+
+const maxMessageBatch = 500
+
+func (h *MessageHandler) AddMessages(c *gin.Context) {
+	var msgs []model.DiscordMessage
+	if err := c.ShouldBindJSON(&msgs); err != nil {
+		c.JSON(http.StatusBadRequest, gin.H{"error": err.Error()})
+		return
+	}
+	if len(msgs) > maxMessageBatch {
+		c.JSON(http.StatusBadRequest, gin.H{"error": "batch too large"})
+		return
+	}
+
+	inserted, err := h.service.AddMessages(msgs)
+	if err != nil {
+		c.JSON(http.StatusInternalServerError, gin.H{"error": err.Error()})
+		return
+	}
+
+	c.JSON(http.StatusCreated, gin.H{"inserted": inserted})
+}
@@ -0,0 +1,126 @@
+package handler
+
+import (
+	"bytes"
+	"database/sql/driver"
+	"encoding/json"
+	"errors"
+	"fmt"
+	"net/http"
+	"net/http/httptest"
+	"testing"
+
+	"server/internal/service"
+
+	"github.com/gin-gonic/gin"
+)
+
+func newMessageRouter(db *fakeDB) *gin.Engine {
+	gin.SetMode(gin.TestMode)
+	h := NewMessageHandler(service.NewMessageService(db.open()))
+	router := gin.New()
+	router.POST("/messages", h.AddMessages)
+	return router
+}
+
+func message(id string) map[string]string {
+	return map[string]string{
+		"message_id":      id,
+		"server_name":     "guild",
+		"channel_name":    "general",
+		"channel_id":      "c",
+		"author_name":     "amy",
+		"author_id":       "a",
+		"message_content": "hi " + id,
+	}
+}
+
+func postMessages(router *gin.Engine, body interface{}) *httptest.ResponseRecorder {
+	payload, _ := json.Marshal(body)
+	if raw, ok := body.(string); ok {
+		payload = []byte(raw)
+	}
+	req, _ := http.NewRequest(http.MethodPost, "/messages", bytes.NewReader(payload))
+	req.Header.Set("Content-Type", "application/json")
+	resp := httptest.NewRecorder()
+	router.ServeHTTP(resp, req)
+	return resp
+}
+
+// storeMessages makes db act like the ON CONFLICT (message_id) DO NOTHING insert.
+func storeMessages(db *fakeDB, stored map[string]bool) {
+	db.execFns["INSERT INTO discord_messages"] = func(args []driver.Value) (int64, error) {
+		id := args[0].(string)
+		if stored[id] {
+			return 0, nil
+		}
+		stored[id] = true
+		return 1, nil
+	}
+}
+
+func TestAddMessagesSkipsStoredMessages(t *testing.T) {
+	db := newFakeDB()
+	stored := map[string]bool{"1": true}
+	storeMessages(db, stored)
+	router := newMessageRouter(db)
+
+	resp := postMessages(router, []map[string]string{message("1"), message("2"), message("3")})
+	if resp.Code != http.StatusCreated {
+		t.Fatalf("expected 201, got %d: %s", resp.Code, resp.Body)
+	}
+	if body := resp.Body.String(); body != `{"inserted":2}` {
+		t.Fatalf("expected 2 inserted, got %s", body)
+	}
+	if !stored["2"] || !stored["3"] || db.commits != 1 {
+		t.Fatalf("batch not committed: stored=%v commits=%d", stored, db.commits)
+	}
+}
+
+func TestAddMessagesRejectsBadBatches(t *testing.T) {
+	db := newFakeDB()
+	router := newMessageRouter(db)
+
+	tooMany := make([]map[string]string, maxMessageBatch+1)
+	for i := range tooMany {
+		tooMany[i] = message(fmt.Sprint(i))
+	}
+	missingField := message("1")
+	delete(missingField, "message_content")
+
+	for name, body := range map[string]interface{}{
+		"too large":     tooMany,
+		"missing field": []map[string]string{message("2"), missingField},
+		"not a list":    message("3"),
+		"invalid JSON":  "[{",
+	} {
+		if resp := postMessages(router, body); resp.Code != http.StatusBadRequest {
+			t.Errorf("%s: expected 400, got %d", name, resp.Code)
+		}
+	}
+	if db.ran("INSERT") {
+		t.Fatal("a rejected batch reached the database")
+	}
+}
+
+func TestAddMessagesRollsBackOnError(t *testing.T) {
+	db := newFakeDB()
+	stored := map[string]bool{}
+	storeMessages(db, stored)
+	insert := db.execFns["INSERT INTO discord_messages"]
+	db.execFns["INSERT INTO discord_messages"] = func(args []driver.Value) (int64, error) {
+		if args[0] == "2" {
+			return 0, errors.New("disk full")
+		}
+		return insert(args)
+	}
+	router := newMessageRouter(db)
+
+	resp := postMessages(router, []map[string]string{message("1"), message("2")})
+	if resp.Code != http.StatusInternalServerError {
+		t.Fatalf("expected 500, got %d", resp.Code)
+	}
+	if db.commits != 0 || db.rollbacks != 1 {
+		t.Fatalf("expected a rollback, got commits=%d rollbacks=%d", db.commits, db.rollbacks)
+	}
+}
@@ -0,0 +1,6 @@
+package model
+
+// ChatSummary is the running summary of chat history turns that were compacted away.
+type ChatSummary struct {
+	Summary string `json:"summary"`
+}
@@ -0,0 +1,11 @@
+package model
+
+import "server/internal/database"
+
+type ConversationContext struct {
+	GuildID      string                          `json:"guild_id"`
+	SystemPrompt string                          `json:"system_prompt"`
+	ChatHistory  []database.Message              `json:"chat_history"`
+	Summary      string                          `json:"summary"`
+	Memories     map[string][]UserMemoryResponse `json:"memories"`
+}
@@ -15,25 +15,48 @@ func NewChatHistoryService(db *sql.DB) *ChatHistoryService {
 }
 
 func (s *ChatHistoryService) GetChatHistory(guildID string) ([]database.Message, error) {
-	rows, err := s.db.Query("SELECT messages FROM chat_history WHERE guild_id = $1", guildID)
+	messages, _, err := s.GetChatHistoryWithSummary(guildID)
+	return messages, err
+}
+
+// GetChatHistoryWithSummary returns the recent messages and the running summary of
+// older, compacted turns in one query.
+func (s *ChatHistoryService) GetChatHistoryWithSummary(guildID string) ([]database.Message, string, error) {
+	rows, err := s.db.Query("SELECT messages, summary FROM chat_history WHERE guild_id = $1", guildID)
 	if err != nil {
-		return nil, err
+		return nil, "", err
 	}
 	defer rows.Close()
 
 	if rows.Next() {
-		var messagesJSON string
-		if err := rows.Scan(&messagesJSON); err != nil {
-			return nil, err
+		var messagesJSON, summary string
+		if err := rows.Scan(&messagesJSON, &summary); err != nil {
+			return nil, "", err
 		}
 		var messages []database.Message
 		if err := json.Unmarshal([]byte(messagesJSON), &messages); err != nil {
-			return nil, err
+			return nil, "", err
 		}
-		return messages, nil
+		return messages, summary, nil
 	}
 
-	return []database.Message{}, nil
+	return []database.Message{}, "", nil
+}
+
+func (s *ChatHistoryService) GetSummary(guildID string) (string, error) {
+	_, summary, err := s.GetChatHistoryWithSummary(guildID)
+	return summary, err
+}
+
+func (s *ChatHistoryService) UpdateSummary(guildID string, summary string) error {
+	_, err := s.db.Exec(`
+		INSERT INTO chat_history (guild_id, messages, summary)
+		VALUES ($1, '[]', $2)
+		ON CONFLICT (guild_id)
+		DO UPDATE SET summary = $2`,
+		guildID, summary,
+	)
+	return err
 }
 
 func (s *ChatHistoryService) UpdateChatHistory(guildID string, messages []database.Message) error {
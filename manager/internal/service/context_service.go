@@ -0,0 +1,49 @@
+package service
+
+import (
+	"database/sql"
+	"server/internal/model"
+)
+
+// ContextService assembles everything the bot needs for one chat turn in a single call.
+type ContextService struct {
+	prompts     *PromptService
+	chatHistory *ChatHistoryService
+	memories    *MemoryService
+}
+
+func NewContextService(prompts *PromptService, chatHistory *ChatHistoryService, memories *MemoryService) *ContextService {
+	return &ContextService{prompts: prompts, chatHistory: chatHistory, memories: memories}
+}
+
+// GetConversationContext skips the prompt lookup when includePrompt is false
+// (the caller already has it cached) and the history lookup when includeHistory
+// is false (the caller's guild session holds it).
+func (s *ContextService) GetConversationContext(guildID string, authorIDs []string, includePrompt bool, includeHistory bool) (model.ConversationContext, error) {
+	ctx := model.ConversationContext{GuildID: guildID}
+
+	if includePrompt {
+		prompt, err := s.prompts.ReadPrompt(guildID)
+		if err != nil && err != sql.ErrNoRows {
+			return ctx, err
+		}
+		ctx.SystemPrompt = prompt.SystemPrompt
+	}
+
+	if includeHistory {
+		history, summary, err := s.chatHistory.GetChatHistoryWithSummary(guildID)
+		if err != nil {
+			return ctx, err
+		}
+		ctx.ChatHistory = history
+		ctx.Summary = summary
+	}
+
+	memories, err := s.memories.GetMemoriesForAuthors(guildID, authorIDs)
+	if err != nil {
+		return ctx, err
+	}
+	ctx.Memories = memories
+
+	return ctx, nil
+}
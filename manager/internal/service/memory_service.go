@@ -3,6 +3,8 @@ package service
 import (
 	"database/sql"
 	"server/internal/model"
+
+	"github.com/lib/pq"
 )
 
 type MemoryService struct {
@@ -44,6 +46,42 @@ func (s *MemoryService) GetMemories(guildID, authorID string) ([]model.UserMemor
 	return memories, nil
 }
 
+// GetMemoriesForAuthors returns up to 50 recent memories per author, keyed by author ID.
+func (s *MemoryService) GetMemoriesForAuthors(guildID string, authorIDs []string) (map[string][]model.UserMemoryResponse, error) {
+	memories := make(map[string][]model.UserMemoryResponse, len(authorIDs))
+	for _, id := range authorIDs {
+		memories[id] = []model.UserMemoryResponse{}
+	}
+	if len(authorIDs) == 0 {
+		return memories, nil
+	}
+
+	rows, err := s.db.Query(`
+		SELECT id, guild_id, author_id, author_name, fact, created_at FROM (
+			SELECT *, ROW_NUMBER() OVER (PARTITION BY author_id ORDER BY created_at DESC) AS rn
+			FROM user_memories
+			WHERE guild_id = $1 AND author_id = ANY($2)
+		) ranked
+		WHERE rn <= 50
+		ORDER BY author_id, created_at DESC`,
+		guildID, pq.Array(authorIDs),
+	)
+	if err != nil {
+		return nil, err
+	}
+	defer rows.Close()
+
+	for rows.Next() {
+		var m model.UserMemoryResponse
+		err := rows.Scan(&m.ID, &m.GuildID, &m.AuthorID, &m.AuthorName, &m.Fact, &m.CreatedAt)
+		if err != nil {
+			return nil, err
+		}
+		memories[m.AuthorID] = append(memories[m.AuthorID], m)
+	}
+	return memories, nil
+}
+
 func (s *MemoryService) GetRecentMemories(guildID string, limit int) ([]model.UserMemoryResponse, error) {
 	rows, err := s.db.Query(
 		"SELECT id, guild_id, author_id, author_name, fact, created_at FROM user_memories WHERE guild_id = $1 ORDER BY created_at DESC LIMIT $2",
@@ -17,3 +17,40 @@ func (s *MessageService) AddMessage(msg model.DiscordMessage) error {
 	_, err := s.db.Exec("INSERT INTO discord_messages (message_id, server_name, channel_name, channel_id, author_name, author_nickname, author_id, message_content) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)", msg.MessageID, msg.ServerName, msg.ChannelName, msg.ChannelID, msg.AuthorName, msg.AuthorNickname, msg.AuthorID, msg.MessageContent)
 	return err
 }
+
+// AddMessages inserts a batch of messages in one transaction. Messages that were
+// already stored (e.g. a batch retried by the bot) are skipped.
+func (s *MessageService) AddMessages(msgs []model.DiscordMessage) (int64, error) {
+	tx, err := s.db.Begin()
+	if err != nil {
+		return 0, err
+	}
+	defer tx.Rollback()
+
+	stmt, err := tx.Prepare(`
+		INSERT INTO discord_messages (message_id, server_name, channel_name, channel_id, author_name, author_nickname, author_id, message_content, timestamp)
+		VALUES ($1, $2, $3, $4, $5, $6, $7, $8, COALESCE(NULLIF($9, '')::timestamp, CURRENT_TIMESTAMP))
+		ON CONFLICT (message_id) DO NOTHING`)
+	if err != nil {
+		return 0, err
+	}
+	defer stmt.Close()
+
+	var inserted int64
+	for _, msg := range msgs {
+		result, err := stmt.Exec(msg.MessageID, msg.ServerName, msg.ChannelName, msg.ChannelID, msg.AuthorName, msg.AuthorNickname, msg.AuthorID, msg.MessageContent, msg.Timestamp)
+		if err != nil {
+			return 0, err
+		}
+		n, err := result.RowsAffected()
+		if err != nil {
+			return 0, err
+		}
+		inserted += n
+	}
+
+	if err := tx.Commit(); err != nil {
+		return 0, err
+	}
+	return inserted, nil
+}
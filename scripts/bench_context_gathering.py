@@ -0,0 +1,80 @@
+"""
+Time to first response for BooChatWorkflow's context gathering, serial vs concurrent.
+
+A stubbed benchmark: asyncio stand-ins replace Temporal and the manager, so it runs
+anywhere without services. Each context source costs one activity dispatch plus its
+manager latency; the reply costs one LLM first token. The concurrent variant applies
+the per-source schedule-to-close budgets from workflows/chat_workflow.py, falling back
+to an empty value when one runs out.
+
+  uv run scripts/bench_context_gathering.py [--runs N]
+
+This reproduces the figures in the commit that made the fetches concurrent. It models
+the per-source fallback path; the bulk /context call added later is a single fetch.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+DISPATCH = 0.008
+LLM_FIRST_TOKEN = 0.4
+
+# Schedule-to-close budgets of _LORE_BUDGET, _HISTORY_BUDGET and _MEMORY_BUDGET
+BUDGETS = {"lore": 8.0, "history": 8.0, "memories": 3.0}
+
+SCENARIOS = {
+  "typical (30/60/40ms manager)": {"lore": 0.03, "history": 0.06, "memories": 0.04},
+  "slow manager (150/250/200ms)": {"lore": 0.15, "history": 0.25, "memories": 0.2},
+  "hung memory lookup (10s)": {"lore": 0.03, "history": 0.06, "memories": 10.0},
+}
+
+
+async def fetch(latency: float) -> None:
+  await asyncio.sleep(DISPATCH + latency)
+
+
+async def serial(latencies: dict) -> None:
+  for source in ("lore", "history", "memories"):
+    await fetch(latencies[source])
+  await asyncio.sleep(LLM_FIRST_TOKEN)
+
+
+async def concurrent(latencies: dict) -> None:
+  async def bounded(source: str) -> None:
+    try:
+      await asyncio.wait_for(fetch(latencies[source]), BUDGETS[source])
+    except asyncio.TimeoutError:
+      pass  # the workflow falls back to an empty value
+
+  await asyncio.gather(*(bounded(source) for source in ("lore", "history", "memories")))
+  await asyncio.sleep(LLM_FIRST_TOKEN)
+
+
+async def median_seconds(variant, latencies: dict, runs: int) -> float:
+  timings = []
+  for _ in range(runs):
+    started = time.perf_counter()
+    await variant(latencies)
+    timings.append(time.perf_counter() - started)
+  return statistics.median(timings)
+
+
+def _format(seconds: float) -> str:
+  return f"{seconds:.1f}s" if seconds >= 2 else f"{seconds * 1000:.0f}ms"
+
+
+async def main(runs: int) -> None:
+  for name, latencies in SCENARIOS.items():
+    # A hung source makes each serial run take ten seconds
+    scenario_runs = 1 if max(latencies.values()) > 1 else runs
+    before = await median_seconds(serial, latencies, scenario_runs)
+    after = await median_seconds(concurrent, latencies, scenario_runs)
+    print(f"  {name:<32}  serial {_format(before):>6}  concurrent {_format(after):>6}")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument("--runs", type=int, default=15, help="runs per scenario (median is reported)")
+  asyncio.run(main(parser.parse_args().runs))
@@ -1,4 +1,5 @@
 import json
+import time
 import base64
 from urllib.parse import quote
 from typing import Optional
@@ -6,7 +7,7 @@ from typing import Optional
 import httpx
 from temporalio import activity
 
-from utils.config import DISCORD_TOKEN
+from utils.config import DISCORD_TOKEN, STREAM_EDIT_INTERVAL
 from utils.logger import logger
 from activities.models import SendResponseInput
 
@@ -16,6 +17,7 @@ DEFAULT_HEADERS = {
   "User-Agent": "DiscordBot (https://github.com/VVIP-Kitchen/boo, 1.1.0)",
 }
 MAX_INLINE_LENGTH = 1800
+STREAM_CURSOR = " \u258c"
 
 
 def _strict_status(resp: httpx.Response, context: str) -> None:
@@ -64,9 +66,8 @@ async def send_message(
     _strict_status(resp, "send_message")
 
 
-@activity.defn
-async def send_response(payload: SendResponseInput) -> None:
-  """Send a final bot response: handles long text → file attachment, generated images, sticker_ids."""
+def _build_response(payload: SendResponseInput, editing: bool) -> tuple[dict, list]:
+  """JSON body and multipart files for posting (or editing a draft into) a response."""
   files: list[tuple[str, tuple[str, bytes, str]]] = []
 
   # Long text becomes an attachment
@@ -85,6 +86,18 @@ async def send_response(payload: SendResponseInput) -> None:
   json_payload: dict = {}
   if not text_as_file:
     json_payload["content"] = payload.content
+  elif editing:
+    # Clear the streamed preview; the full text is in the attachment
+    json_payload["content"] = ""
+
+  if editing:
+    # Edits only keep attachments listed here; replies and stickers can't be edited in
+    if files:
+      json_payload["attachments"] = [
+        {"id": idx, "filename": f[1][0]} for idx, f in enumerate(files)
+      ]
+    return json_payload, files
+
   if payload.reply_to:
     json_payload["message_reference"] = {
       "message_id": payload.reply_to,
@@ -92,20 +105,130 @@ async def send_response(payload: SendResponseInput) -> None:
     }
   if payload.sticker_ids:
     json_payload["sticker_ids"] = payload.sticker_ids
+  return json_payload, files
+
+
+async def _send_response_request(
+  client: httpx.AsyncClient, method: str, url: str, json_payload: dict, files: list
+) -> httpx.Response:
+  if files:
+    data = {"payload_json": json.dumps(json_payload)}
+    return await client.request(method, url, headers=DEFAULT_HEADERS, data=data, files=files)
+  return await client.request(method, url, headers=DEFAULT_HEADERS, json=json_payload)
 
+
+@activity.defn
+async def send_response(payload: SendResponseInput) -> None:
+  """Send a final bot response: handles long text → file attachment, generated images, sticker_ids.
+
+  With `payload.message_id` set, the streamed draft is edited into the final response.
+  """
   url = f"{DISCORD_API}/channels/{payload.channel_id}/messages"
 
   async with httpx.AsyncClient(timeout=60.0) as client:
-    if files:
-      data = {"payload_json": json.dumps(json_payload)}
-      resp = await client.post(
-        url, headers=DEFAULT_HEADERS, data=data, files=files
+    if payload.message_id:
+      resp = await _send_response_request(
+        client, "PATCH", f"{url}/{payload.message_id}", *_build_response(payload, editing=True)
       )
-    else:
-      resp = await client.post(url, headers=DEFAULT_HEADERS, json=json_payload)
+      if resp.status_code != 404:
+        _strict_status(resp, "send_response(edit)")
+        return
+      logger.warning("Streamed draft is gone; posting the response as a new message")
+
+    resp = await _send_response_request(
+      client, "POST", url, *_build_response(payload, editing=False)
+    )
     _strict_status(resp, "send_response")
 
 
+class ReplyStreamer:
+  """
+  Shows a reply while it is still being generated. The first text posts a draft
+  message, later text edits it at most once per `interval` seconds; send_response
+  then edits the draft into the final response. Any Discord failure only turns the
+  preview off, it never interrupts generation.
+  """
+
+  def __init__(
+    self,
+    channel_id: str,
+    reply_to: Optional[str],
+    interval: float = STREAM_EDIT_INTERVAL,
+    message_id: Optional[str] = None,
+  ) -> None:
+    self.channel_id = channel_id
+    self.reply_to = reply_to
+    self.interval = interval
+    # Set to continue a draft posted by an earlier round
+    self.message_id = message_id
+    self._url = f"{DISCORD_API}/channels/{channel_id}/messages"
+    self._client = httpx.AsyncClient(timeout=5.0, headers=DEFAULT_HEADERS)
+    self._shown = ""
+    self._next_edit = 0.0
+    self._disabled = False
+
+  async def update(self, text: str) -> None:
+    """Show `text` (the reply so far) if the edit cadence allows it."""
+    if self._disabled or not text.strip():
+      return
+    now = time.monotonic()
+    if now < self._next_edit:
+      return
+
+    if len(text) > MAX_INLINE_LENGTH:
+      # Will be sent as a file; keep the preview at the inline limit
+      preview = text[: MAX_INLINE_LENGTH - 1] + "\u2026"
+    else:
+      preview = text + STREAM_CURSOR
+    if preview == self._shown:
+      return
+
+    try:
+      if self.message_id is None:
+        payload: dict = {"content": preview}
+        if self.reply_to:
+          payload["message_reference"] = {
+            "message_id": self.reply_to,
+            "fail_if_not_exists": False,
+          }
+        resp = await self._client.post(self._url, json=payload)
+      else:
+        resp = await self._client.patch(
+          f"{self._url}/{self.message_id}", json={"content": preview}
+        )
+    except httpx.HTTPError as e:
+      logger.warning(f"Reply streaming disabled for {self.channel_id}: {e}")
+      self._disabled = True
+      return
+
+    if resp.status_code == 429:
+      retry_after = float(resp.headers.get("Retry-After", self.interval))
+      self._next_edit = now + max(retry_after, self.interval)
+      return
+    if resp.status_code not in (200, 201):
+      logger.warning(f"Reply streaming disabled for {self.channel_id}: {resp.status_code} {resp.text}")
+      self._disabled = True
+      return
+
+    if self.message_id is None:
+      self.message_id = resp.json()["id"]
+    self._shown = preview
+    self._next_edit = now + self.interval
+
+  async def discard(self) -> None:
+    """Delete the draft, e.g. when the activity fails and will be retried."""
+    if self.message_id is None:
+      return
+    try:
+      await self._client.delete(f"{self._url}/{self.message_id}")
+    except httpx.HTTPError as e:
+      logger.warning(f"Could not delete streamed draft {self.message_id}: {e}")
+    self.message_id = None
+
+  async def aclose(self) -> None:
+    await self._client.aclose()
+
+
 @activity.defn
 async def fetch_sticker_ids(sticker_ids: list[str]) -> list[str]:
   """Filter out invalid sticker IDs by hitting Discord's sticker endpoint."""
@@ -1,10 +1,25 @@
 from dataclasses import dataclass, field
-from typing import List
+from typing import List, Optional
 
 from temporalio import activity
 
-from services.llm_service import LLMService
-from activities.models import ChatRequest, ChatResult, GeneratedImage, TokenUsage
+from services.llm_service import LLMService, is_rate_limit_error
+from utils.config import CONTEXT_TOKEN_BUDGET, STREAM_REPLIES
+from utils.degradation import SHORT_CONTEXT, degradation_policy
+from utils.logger import logger
+from utils.token_budget import pack_context, token_counter
+from activities.discord_rest import ReplyStreamer
+from activities.models import (
+  ChatRequest,
+  ChatResult,
+  GeneratedImage,
+  HistoryCompactionInput,
+  TokenUsage,
+  ToolCall,
+)
+
+# Upper bound on the running summary of compacted history
+SUMMARY_MAX_TOKENS = 500
 
 
 @dataclass
@@ -13,6 +28,24 @@ class AgenticChatInput:
   lore: str
   history: List[dict] = field(default_factory=list)
   memories: List[dict] = field(default_factory=list)
+  summary: str = ""
+
+
+@dataclass
+class ChatRoundInput:
+  request: ChatRequest
+  messages: List[dict]
+  enable_tools: bool = True
+  # Draft reply posted by an earlier round, continued by this one
+  stream_message_id: Optional[str] = None
+
+
+@dataclass
+class ChatRoundResult:
+  content: str
+  tool_calls: List[ToolCall] = field(default_factory=list)
+  usage: TokenUsage = field(default_factory=TokenUsage)
+  stream_message_id: Optional[str] = None
 
 
 def _build_user_content(req: ChatRequest) -> list:
@@ -22,37 +55,69 @@ def _build_user_content(req: ChatRequest) -> list:
   return content
 
 
-def _build_system_prompt(req: ChatRequest, lore: str, memories: list) -> str:
+def _build_system_prompt(
+  req: ChatRequest, lore: str, memories: list, members_list: str, summary: str = ""
+) -> str:
   base = lore or "You are a helpful assistant"
-  if req.members_list:
-    base = f"{base}\n\n{req.members_list}"
-  if memories:
-    facts = [m.get("fact", "") for m in memories if m.get("fact")]
-    if facts:
-      base = (
-        f"{base}\n\n-# Things you know about {req.author_name}: {', '.join(facts)}"
-      )
+  if summary:
+    base = f"{base}\n\n## Earlier in this conversation\n{summary}"
+  if members_list:
+    base = f"{base}\n\n{members_list}"
+
+  facts_by_author: dict[str, list[str]] = {}
+  names = {req.author_id: req.author_name}
+  for m in memories or []:
+    if not m.get("fact"):
+      continue
+    author_id = m.get("author_id") or req.author_id
+    facts_by_author.setdefault(author_id, []).append(m["fact"])
+    names.setdefault(author_id, m.get("author_name") or author_id)
+
+  for author_id, facts in facts_by_author.items():
+    base = f"{base}\n\n-# Things you know about {names[author_id]}: {', '.join(facts)}"
   return base
 
 
-@activity.defn
-def run_agentic_chat(payload: AgenticChatInput) -> ChatResult:
+def build_chat_messages(payload: AgenticChatInput) -> List[dict]:
+  """
+  System prompt, history and the new message, packed into CONTEXT_TOKEN_BUDGET
+  (half of it while degraded to SHORT_CONTEXT).
+  """
   req = payload.request
-  user_content = _build_user_content(req)
-  system_prompt = _build_system_prompt(req, payload.lore, payload.memories)
-
-  messages = (
-    [{"role": "system", "content": system_prompt}]
-    + payload.history
-    + [{"role": "user", "content": user_content}]
+  degradation_policy.observe_backlog(req.dispatch_load)
+  budget = CONTEXT_TOKEN_BUDGET
+  if degradation_policy.level >= SHORT_CONTEXT:
+    budget //= 2
+  user_message = {"role": "user", "content": _build_user_content(req)}
+  packed = pack_context(
+    token_counter,
+    budget,
+    lore=payload.lore,
+    memories=payload.memories,
+    members_list=req.members_list,
+    history=payload.history,
+    reserved=token_counter.count_message(user_message),
+    summary=payload.summary,
   )
+  if packed.dropped_history:
+    logger.debug(
+      f"Context for {req.server_id}: {packed.tokens} tokens, "
+      f"dropped {packed.dropped_history} older messages"
+    )
 
-  bot_response, usage, generated_images = LLMService().chat_completions(
-    messages=messages,
-    enable_tools=True,
-    guild_id=req.server_id,
+  system_prompt = _build_system_prompt(
+    req, packed.lore, packed.memories, packed.members_list, packed.summary
   )
+  return [{"role": "system", "content": system_prompt}] + packed.history + [user_message]
+
 
+def build_chat_result(
+  req: ChatRequest,
+  text: str,
+  usage: TokenUsage,
+  images: List[GeneratedImage],
+  streamed_message_id: Optional[str] = None,
+) -> ChatResult:
   has_imgs = bool(req.image_urls)
   user_log = (
     f"{req.author_name} (aka {req.author_display_name}, ID: {req.author_id}) said: "
@@ -61,17 +126,130 @@ def run_agentic_chat(payload: AgenticChatInput) -> ChatResult:
   )
 
   return ChatResult(
-    response_text=bot_response,
-    usage=TokenUsage(
-      prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
-      total_tokens=getattr(usage, "total_tokens", 0) or 0,
-    ),
-    generated_images=[
+    response_text=text,
+    usage=usage,
+    generated_images=images,
+    appended_messages=[
+      {"role": "user", "content": user_log},
+      {"role": "assistant", "content": text},
+    ],
+    streamed_message_id=streamed_message_id,
+  )
+
+
+def _token_usage(usage) -> TokenUsage:
+  return TokenUsage(
+    prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+    total_tokens=getattr(usage, "total_tokens", 0) or 0,
+  )
+
+
+@activity.defn
+async def run_agentic_chat(payload: AgenticChatInput) -> ChatResult:
+  req = payload.request
+  messages = build_chat_messages(payload)
+
+  streamer = ReplyStreamer(req.channel_id, req.message_id) if STREAM_REPLIES else None
+  try:
+    bot_response, usage, generated_images = await LLMService().chat_completions_async(
+      messages=messages,
+      enable_tools=True,
+      guild_id=req.server_id,
+      on_text=streamer.update if streamer else None,
+    )
+  except BaseException:
+    # A retried attempt posts its own draft
+    if streamer:
+      await streamer.discard()
+    raise
+  finally:
+    if streamer:
+      await streamer.aclose()
+
+  return build_chat_result(
+    req,
+    bot_response,
+    _token_usage(usage),
+    [
       GeneratedImage(data=img["data"], format=img.get("format", "png"))
       for img in (generated_images or [])
     ],
-    appended_messages=[
-      {"role": "user", "content": user_log},
-      {"role": "assistant", "content": bot_response},
+    streamer.message_id if streamer else None,
+  )
+
+
+@activity.defn
+def pack_chat_messages(payload: AgenticChatInput) -> List[dict]:
+  """First-round messages for the workflow-driven tool loop; keeps token counting out of the workflow."""
+  return build_chat_messages(payload)
+
+
+@activity.defn
+async def run_chat_round(payload: ChatRoundInput) -> ChatRoundResult:
+  """
+  One model round of a workflow-driven tool loop (ChatRequest.tool_execution ==
+  "activity"). Tool calls are returned for the workflow to run as activities.
+  """
+  req = payload.request
+  streamer = (
+    ReplyStreamer(req.channel_id, req.message_id, message_id=payload.stream_message_id)
+    if STREAM_REPLIES
+    else None
+  )
+  llm_service = LLMService()
+  try:
+    message, usage = await llm_service.complete_round_async(
+      payload.messages,
+      enable_tools=payload.enable_tools,
+      on_text=streamer.update if streamer else None,
+    )
+  except Exception as e:
+    if is_rate_limit_error(e):
+      # Retrying inside the rate limit window won't help; answer with the wait time
+      return ChatRoundResult(
+        content=llm_service._handle_api_error(e),
+        stream_message_id=payload.stream_message_id,
+      )
+    # Only drop a draft this attempt created; earlier rounds' draft is reused on retry
+    if streamer and not payload.stream_message_id:
+      await streamer.discard()
+    raise
+  finally:
+    if streamer:
+      await streamer.aclose()
+
+  return ChatRoundResult(
+    content=message.content or "",
+    tool_calls=[
+      ToolCall(id=call.id, name=call.function.name, arguments=call.function.arguments or "{}")
+      for call in (message.tool_calls or [])
     ],
+    usage=_token_usage(usage),
+    stream_message_id=streamer.message_id if streamer else None,
+  )
+
+
+@activity.defn
+async def summarize_history(payload: HistoryCompactionInput) -> str:
+  """Fold evicted chat turns into the guild's running summary."""
+  transcript = "\n".join(
+    f"{m.get('role', 'user')}: {m.get('content') or ''}" for m in payload.messages
+  )
+  prompt = (
+    "You maintain a running summary of a Discord conversation. Update the summary "
+    "with the new turns below: keep names, ongoing topics, decisions and anything "
+    "people may refer back to; drop small talk. Reply with the updated summary only, "
+    "in at most 200 words.\n\n"
+    f"Current summary:\n{payload.summary or '(none)'}\n\nNew turns:\n{transcript}"
+  )
+  # Errors propagate so the activity retries instead of storing an error message
+  message, _usage = await LLMService().complete_round_async(
+    [{"role": "user", "content": prompt}],
+    enable_tools=False,
+    temperature=0.2,
+    max_tokens=SUMMARY_MAX_TOKENS,
   )
+  summary = (message.content or "").strip()
+  if not summary:
+    raise RuntimeError(f"Empty summary for {payload.server_id}")
+  return summary
@@ -1,38 +1,91 @@
 from temporalio import activity
 
-from services.db_service import DBService
-from activities.models import TokenUsageInput
+from utils.cache import server_cache
+from services.db_service import AsyncDBService
+from activities.models import ConversationContext, TokenUsageInput
 
 
 @activity.defn
-def fetch_prompt(server_id: str) -> str:
-  result = DBService().fetch_prompt(server_id)
-  return (result or {}).get("system_prompt", "") or ""
+async def fetch_prompt(server_id: str, lore_version: int = 0) -> str:
+  lore = server_cache.get_lore(server_id, lore_version)
+  if lore is not None:
+    return lore
+
+  result = await AsyncDBService().fetch_prompt(server_id)
+  if result is None:
+    # Raise rather than cache "" so a manager blip doesn't strip the guild's lore
+    raise RuntimeError(f"Lore unavailable for {server_id}")
+  lore = result.get("system_prompt", "") or ""
+  server_cache.set_lore(server_id, lore, lore_version)
+  return lore
+
+
+@activity.defn
+async def get_chat_history(server_id: str) -> list:
+  history = await AsyncDBService().get_chat_history(server_id)
+  if history is None:
+    # Raise rather than return [] so the workflow never overwrites stored history
+    raise RuntimeError(f"Chat history unavailable for {server_id}")
+  return history
+
+
+@activity.defn
+async def get_conversation_context(
+  server_id: str, author_ids: list, lore_version: int = 0, include_history: bool = True
+) -> ConversationContext:
+  lore = server_cache.get_lore(server_id, lore_version)
+  result = await AsyncDBService().get_conversation_context(
+    server_id, author_ids, include_prompt=lore is None, include_history=include_history
+  )
+  if result is None:
+    raise RuntimeError(f"Conversation context unavailable for {server_id}")
+  if lore is None:
+    lore = result.get("system_prompt", "") or ""
+    server_cache.set_lore(server_id, lore, lore_version)
+
+  by_author = result.get("memories") or {}
+  return ConversationContext(
+    lore=lore,
+    history=result.get("chat_history") or [],
+    memories=[m for author_id in author_ids for m in by_author.get(author_id) or []],
+    summary=result.get("summary") or "",
+  )
+
+
+@activity.defn
+async def get_chat_summary(server_id: str) -> str:
+  summary = await AsyncDBService().get_chat_summary(server_id)
+  if summary is None:
+    # Compaction must not replace a summary it could not read
+    raise RuntimeError(f"Chat summary unavailable for {server_id}")
+  return summary
 
 
 @activity.defn
-def get_chat_history(server_id: str) -> list:
-  return DBService().get_chat_history(server_id) or []
+async def update_chat_summary(server_id: str, summary: str) -> bool:
+  if not await AsyncDBService().update_chat_summary(server_id, summary):
+    raise RuntimeError(f"Could not store chat summary for {server_id}")
+  return True
 
 
 @activity.defn
-def update_chat_history(server_id: str, messages: list) -> bool:
-  return DBService().update_chat_history(server_id, messages)
+async def update_chat_history(server_id: str, messages: list) -> bool:
+  return await AsyncDBService().update_chat_history(server_id, messages)
 
 
 @activity.defn
-def delete_chat_history(server_id: str) -> bool:
-  return DBService().delete_chat_history(server_id)
+async def delete_chat_history(server_id: str) -> bool:
+  return await AsyncDBService().delete_chat_history(server_id)
 
 
 @activity.defn
-def get_memories(server_id: str, author_id: str) -> list:
-  return DBService().get_memories(server_id, author_id) or []
+async def get_memories(server_id: str, author_id: str) -> list:
+  return await AsyncDBService().get_memories(server_id, author_id) or []
 
 
 @activity.defn
-def store_token_usage(payload: TokenUsageInput) -> None:
-  DBService().store_token_usage(
+async def store_token_usage(payload: TokenUsageInput) -> None:
+  await AsyncDBService().store_token_usage(
     {
       "message_id": payload.message_id,
       "guild_id": payload.guild_id,
@@ -0,0 +1,17 @@
+from temporalio import activity
+
+from utils.cache import server_cache
+from utils.degradation import degradation_policy
+from utils.tool_cache import tool_cache_stats
+from utils.tool_registry import tool_registry
+
+
+@activity.defn
+async def collect_worker_stats() -> dict:
+  """Snapshot of in-process worker metrics (caches etc.) for the bot's metrics command."""
+  return {
+    "lore_cache": server_cache.get_cache_stats(),
+    "tool_caches": tool_cache_stats(),
+    "tools": tool_registry.stats(),
+    "degradation": degradation_policy.stats(),
+  }
@@ -19,8 +19,64 @@ class ChatRequest:
   image_urls: List[str] = field(default_factory=list)
   sticker_urls: List[str] = field(default_factory=list)
   emoji_urls: List[str] = field(default_factory=list)
+  mentioned_ids: List[str] = field(default_factory=list)
   members_list: str = ""
+  lore_version: int = 0
+  # "inline": one activity runs the whole tool loop; "activity": the workflow runs
+  # each model round and tool call as its own activity
+  tool_execution: str = "inline"
   is_reset: bool = False
+  # Earlier messages coalesced into this one (message_id is the latest); all get reactions
+  merged_message_ids: List[str] = field(default_factory=list)
+  # Bot dispatch queue fill (0..1) when this was queued; feeds the worker's degradation policy
+  dispatch_load: float = 0.0
+
+
+@dataclass
+class ConversationContext:
+  """Lore, history, its running summary and memories (author + mentioned users) for one chat turn."""
+
+  lore: str = ""
+  history: List[dict] = field(default_factory=list)
+  memories: List[dict] = field(default_factory=list)
+  summary: str = ""
+
+
+@dataclass
+class ChatSession:
+  """History a GuildSessionWorkflow hands to one chat turn; the session persists it."""
+
+  history: List[dict] = field(default_factory=list)
+  summary: str = ""
+
+
+@dataclass
+class ChatTurnResult:
+  appended_messages: List[dict] = field(default_factory=list)
+
+
+@dataclass
+class GuildSessionState:
+  """
+  Carried across continue-as-new. `history` is None until loaded from the manager;
+  `dirty` marks changes not yet persisted; `evicted` holds turns awaiting compaction.
+  """
+
+  server_id: str
+  history: Optional[List[dict]] = None
+  summary: str = ""
+  dirty: bool = False
+  evicted: List[dict] = field(default_factory=list)
+  pending: List[ChatRequest] = field(default_factory=list)
+
+
+@dataclass
+class HistoryCompactionInput:
+  """Turns evicted from a guild's chat history, to fold into its running summary."""
+
+  server_id: str
+  summary: str
+  messages: List[dict]
 
 
 @dataclass
@@ -35,6 +91,21 @@ class GeneratedImage:
   format: str = "png"
 
 
+@dataclass
+class ToolCall:
+  id: str
+  name: str
+  arguments: str = "{}"
+
+
+@dataclass
+class ToolCallOutcome:
+  call_id: str
+  content: str
+  image: Optional[GeneratedImage] = None
+  memory_stored: bool = False
+
+
 @dataclass
 class ChatResult:
   """Output of the agentic LLM activity."""
@@ -43,6 +114,8 @@ class ChatResult:
   usage: TokenUsage
   generated_images: List[GeneratedImage] = field(default_factory=list)
   appended_messages: List[dict] = field(default_factory=list)
+  # Draft message already showing the streamed reply, if any
+  streamed_message_id: Optional[str] = None
 
 
 @dataclass
@@ -52,6 +125,8 @@ class SendResponseInput:
   content: str
   sticker_ids: List[str] = field(default_factory=list)
   generated_images: List[GeneratedImage] = field(default_factory=list)
+  # Edit this message (a streamed draft) into the final response instead of posting
+  message_id: Optional[str] = None
 
 
 @dataclass
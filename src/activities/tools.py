@@ -0,0 +1,54 @@
+import asyncio
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Optional
+
+from temporalio import activity
+
+from services.llm_service import LLMService
+from activities.models import GeneratedImage, ToolCall, ToolCallOutcome
+
+# Seconds between heartbeats while a tool runs; the workflow's heartbeat timeout
+# must be comfortably larger
+HEARTBEAT_INTERVAL = 5.0
+
+
+@dataclass
+class ToolCallInput:
+  call: ToolCall
+  guild_id: Optional[str] = None
+
+
+@activity.defn
+async def execute_tool_call(payload: ToolCallInput) -> ToolCallOutcome:
+  """
+  Run one model-requested tool call, heartbeating while it runs so a lost worker is
+  detected by the heartbeat timeout instead of the full activity timeout.
+
+  Transient failures (network errors, 429/5xx, a missed tool deadline) fail the
+  activity so the workflow's retry policy runs the call again; anything else comes
+  back as an error result.
+  """
+  call = payload.call
+  tool_call = SimpleNamespace(
+    id=call.id, function=SimpleNamespace(name=call.name, arguments=call.arguments)
+  )
+  task = asyncio.ensure_future(
+    LLMService().execute_tool_call_async(tool_call, payload.guild_id, raise_retryable=True)
+  )
+  try:
+    while True:
+      done, _ = await asyncio.wait({task}, timeout=HEARTBEAT_INTERVAL)
+      if done:
+        break
+      activity.heartbeat(call.name)
+    content, image, memory_stored = task.result()
+  finally:
+    task.cancel()
+
+  return ToolCallOutcome(
+    call_id=call.id,
+    content=content,
+    image=GeneratedImage(data=image["data"], format=image.get("format", "png")) if image else None,
+    memory_stored=memory_stored,
+  )
@@ -1,6 +1,8 @@
 import discord
 from discord.ext import commands
 from utils.config import DISCORD_TOKEN, PREFIX, ADMIN_LIST
+from services.db_service import AsyncDBService
+from utils.message_utils import message_ingest
 
 
 class DiscordBot(commands.Bot):
@@ -35,6 +37,14 @@ class DiscordBot(commands.Bot):
     await self.load_extension("commands.admin")
     await self.load_extension("commands.metrics")
 
+  async def close(self) -> None:
+    """
+    Flush queued writes and close pooled HTTP connections before shutting down.
+    """
+    await message_ingest.stop()
+    await AsyncDBService().aclose()
+    await super().close()
+
   def run(self) -> None:
     """
     Run the bot using the Discord token from configuration.
@@ -1,20 +1,48 @@
 import re
+from typing import Sequence
+
 import discord
 from discord.ext import commands
 
 from utils.logger import logger
 from utils.config import TEMPORAL_TASK_QUEUE
-from utils.emoji_utils import extract_custom_emojis
+from utils.emoji_index import emoji_index
+from utils.emoji_utils import extract_custom_emoji_refs
 from services.temporal_client import get_client
 from workflows.image_workflows import DeleteImageWorkflow
 
 
 class ImageHandlerCog(commands.Cog):
-  """Helpers for sticker/emoji extraction + Meilisearch cleanup on message delete."""
+  """
+  Helpers for sticker/emoji extraction + Meilisearch cleanup on message delete.
+  Also keeps the shared emoji index current from guild events.
+  """
 
   def __init__(self, bot: commands.Bot) -> None:
     self.bot = bot
 
+  async def cog_unload(self) -> None:
+    await emoji_index.close()
+
+  @commands.Cog.listener()
+  async def on_ready(self) -> None:
+    for guild in self.bot.guilds:
+      _index_guild(guild, guild.emojis)
+
+  @commands.Cog.listener()
+  async def on_guild_join(self, guild: discord.Guild) -> None:
+    _index_guild(guild, guild.emojis)
+
+  @commands.Cog.listener()
+  async def on_guild_emojis_update(
+    self, guild: discord.Guild, _before: Sequence[discord.Emoji], after: Sequence[discord.Emoji]
+  ) -> None:
+    _index_guild(guild, after)
+
+  @commands.Cog.listener()
+  async def on_guild_remove(self, guild: discord.Guild) -> None:
+    emoji_index.drop_guild(guild.id)
+
   @commands.Cog.listener()
   async def on_message_delete(self, message: discord.Message) -> None:
     img_attachments = [
@@ -52,26 +80,17 @@ class ImageHandlerCog(commands.Cog):
 
   async def _resolve_custom_emoji_urls(self, message: discord.Message) -> list:
     """Map any <:name:id> in the message to CDN URLs the LLM can ingest."""
-    emoji_ids = extract_custom_emojis(message.content)
-    if not emoji_ids:
+    refs = extract_custom_emoji_refs(message.content)
+    if not refs:
       return []
+    if message.guild is not None and message.guild.id not in emoji_index:
+      # Events arriving before the index was built
+      _index_guild(message.guild, message.guild.emojis)
+    return await emoji_index.resolve(refs)
+
 
-    urls: list = []
-    cache = {emoji.id: emoji for guild in self.bot.guilds for emoji in guild.emojis}
-    for raw_id in emoji_ids:
-      try:
-        eid = int(raw_id)
-      except ValueError:
-        continue
-      if eid in cache:
-        urls.append(cache[eid].url)
-        continue
-      try:
-        resolved = await self.bot.fetch_emoji(eid)
-        urls.append(resolved.url)
-      except Exception as e:
-        logger.warning(f"Could not resolve emoji {eid}: {e}")
-    return urls
+def _index_guild(guild: discord.Guild, emojis: Sequence[discord.Emoji]) -> None:
+  emoji_index.load_guild(guild.id, ((emoji.id, emoji.url) for emoji in emojis))
 
 
 async def setup(bot: commands.Bot) -> None:
@@ -1,14 +1,13 @@
 import discord
 from datetime import datetime
 from discord.ext import commands
-from services.db_service import DBService
-from services.async_caller_service import to_thread
+from services.db_service import AsyncDBService
 
 
 class MemoryManagementCog(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
-        self.db_service = DBService()
+        self.db_service = AsyncDBService()
 
     @commands.hybrid_group(name="memory", description="Manage your memories")
     async def memory_group(self, ctx: commands.Context) -> None:
@@ -33,8 +32,8 @@ class MemoryManagementCog(commands.Cog):
         target_user = user or ctx.author
 
         try:
-            memories = await to_thread(
-                self.db_service.get_memories, str(ctx.guild.id), str(target_user.id)
+            memories = await self.db_service.get_memories(
+                str(ctx.guild.id), str(target_user.id)
             )
 
             if not memories:
@@ -97,7 +96,7 @@ class MemoryManagementCog(commands.Cog):
             return await ctx.send(embed=embed)
 
         try:
-            memory = await to_thread(self.db_service.get_memory_by_id, memory_id)
+            memory = await self.db_service.get_memory_by_id(memory_id)
 
             if not memory:
                 embed = discord.Embed(
@@ -115,7 +114,7 @@ class MemoryManagementCog(commands.Cog):
                 )
                 return await ctx.send(embed=embed)
 
-            success = await to_thread(self.db_service.delete_memory, memory_id)
+            success = await self.db_service.delete_memory(memory_id)
 
             if success:
                 embed = discord.Embed(
@@ -162,7 +161,7 @@ class MemoryManagementCog(commands.Cog):
             return await ctx.send(embed=embed)
 
         try:
-            memory = await to_thread(self.db_service.get_memory_by_id, memory_id)
+            memory = await self.db_service.get_memory_by_id(memory_id)
 
             if not memory:
                 embed = discord.Embed(
@@ -180,7 +179,7 @@ class MemoryManagementCog(commands.Cog):
                 )
                 return await ctx.send(embed=embed)
 
-            success = await to_thread(self.db_service.update_memory, memory_id, new_fact.strip())
+            success = await self.db_service.update_memory(memory_id, new_fact.strip())
 
             if success:
                 embed = discord.Embed(
@@ -232,8 +231,7 @@ class MemoryManagementCog(commands.Cog):
         target_user = user or ctx.author
 
         try:
-            memories = await to_thread(
-                self.db_service.search_memories,
+            memories = await self.db_service.search_memories(
                 str(ctx.guild.id),
                 query.strip(),
                 str(target_user.id),
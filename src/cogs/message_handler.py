@@ -1,7 +1,12 @@
+import asyncio
+from dataclasses import replace
+from typing import Hashable, Iterable, List, Tuple
+
 import discord
 from discord.ext import commands
 
 from utils.logger import logger
+from utils.cache import server_cache
 from utils.message_utils import (
   CHANNEL_NAME,
   log_message,
@@ -11,33 +16,127 @@ from utils.message_utils import (
   send_error_message,
 )
 from services.temporal_client import get_client
-from utils.config import TEMPORAL_TASK_QUEUE
-from activities.models import ChatRequest, ImageIndexInput
+from utils.config import (
+  DEBOUNCE_WINDOW,
+  DISPATCH_QUEUE_SIZE,
+  DISPATCH_WORKERS,
+  GUILD_RATE_LIMIT,
+  GUILD_SESSIONS,
+  MEMBERS_TOP_K,
+  TEMPORAL_TASK_QUEUE,
+  TOOL_EXECUTION_MODE,
+  USER_RATE_LIMIT,
+)
+from utils.debounce import Debouncer
+from utils.dispatch_queue import DispatchQueue
+from utils.rate_limit import RateLimiter, TokenBucket
+from utils.roster import RosterMember, roster_cache
+from activities.models import ChatRequest, GuildSessionState, ImageIndexInput
 from workflows.chat_workflow import BooChatWorkflow
 from workflows.image_workflows import ImageIndexWorkflow
+from workflows.session_workflow import GuildSessionWorkflow
 from .image_handler import ImageHandlerCog
 
+BUSY_REACTION = "⏳"
+
+
+def merge_chat_requests(requests: List[ChatRequest]) -> ChatRequest:
+  """Fold consecutive requests from one author and channel into one, replying to the last."""
+  if len(requests) == 1:
+    return requests[0]
+  # Dispatch tasks can finish out of order; snowflake IDs sort by send time
+  requests = sorted(requests, key=lambda r: int(r.message_id))
+
+  def union(attr: str) -> List[str]:
+    return list(dict.fromkeys(v for r in requests for v in getattr(r, attr)))
+
+  return replace(
+    requests[-1],
+    prompt="\n".join(r.prompt for r in requests if r.prompt),
+    image_urls=union("image_urls"),
+    sticker_urls=union("sticker_urls"),
+    emoji_urls=union("emoji_urls"),
+    mentioned_ids=union("mentioned_ids"),
+    merged_message_ids=[
+      i for r in requests[:-1] for i in [*r.merged_message_ids, r.message_id]
+    ],
+  )
+
 
 class MessageHandlerCog(commands.Cog):
-  """Discord gateway listener. Builds a ChatRequest and starts a Temporal workflow."""
+  """
+  Discord gateway listener. Builds a ChatRequest and starts a Temporal workflow.
+
+  Messages from the same author in the same channel that arrive within
+  DEBOUNCE_WINDOW of each other are merged into one request.
+
+  Messages addressed to the bot are rate limited per user and per guild, then
+  handled by DISPATCH_WORKERS workers from a bounded queue. Whatever is over a
+  limit or doesn't fit in the queue is dropped with a busy reaction.
+  """
 
   def __init__(self, bot: commands.Bot) -> None:
     self.bot = bot
     self.channel_name = CHANNEL_NAME
     self.image_handler = ImageHandlerCog(bot)
+    self.debouncer = Debouncer(
+      self._flush_debounced, window=DEBOUNCE_WINDOW, name="chat-debounce"
+    )
+    self._roster_locks: dict[int, asyncio.Lock] = {}
+    self.queue = DispatchQueue(
+      self._dispatch_queued,
+      workers=DISPATCH_WORKERS,
+      maxsize=DISPATCH_QUEUE_SIZE,
+      name="chat-dispatch",
+    )
+    self.user_limiter = RateLimiter(USER_RATE_LIMIT, name="user-rate-limit")
+    self.guild_limiter = RateLimiter(GUILD_RATE_LIMIT, name="guild-rate-limit")
+    # Shedding must not turn into a flood of reactions of its own
+    self._busy_reactions = TokenBucket(rate=1.0, burst=5)
+
+  async def cog_unload(self) -> None:
+    await self.queue.stop()
+    await self.debouncer.stop()
 
   @commands.Cog.listener()
   async def on_message(self, message: discord.Message) -> None:
+    if message.guild is not None and not message.author.bot:
+      roster_cache.note_activity(
+        str(message.guild.id), str(message.channel.id), str(message.author.id)
+      )
     if message.author.bot and message.author.id != 1413943952524054550:
       return
-    self.bot.loop.create_task(self.dispatch(message))
-
-  async def dispatch(self, message: discord.Message) -> None:
     log_message(message)
     reason = should_ignore(message, self.bot)
     if reason is True:
       return
 
+    if not self.user_limiter.allow(message.author.id):
+      shed = "user rate limit"
+    elif message.guild is not None and not self.guild_limiter.allow(message.guild.id):
+      shed = "guild rate limit"
+    elif not self.queue.offer((message, reason)):
+      shed = "dispatch queue full"
+    else:
+      return
+    logger.info(f"Shedding message {message.id} from {message.author.id}: {shed}")
+    if self._busy_reactions.try_acquire():
+      try:
+        await message.add_reaction(BUSY_REACTION)
+      except discord.HTTPException:
+        pass
+
+  def dispatch_stats(self) -> dict:
+    return {
+      **self.queue.stats(),
+      "user_limited": self.user_limiter.stats()["limited"],
+      "guild_limited": self.guild_limiter.stats()["limited"],
+    }
+
+  async def _dispatch_queued(self, item: Tuple[discord.Message, str]) -> None:
+    await self.dispatch(*item)
+
+  async def dispatch(self, message: discord.Message, reason: str) -> None:
     try:
       if reason in ("reply", "mentioned_reply_other"):
         reply_context = get_reply_context(message)
@@ -64,9 +163,17 @@ class MessageHandlerCog(commands.Cog):
       lower = cleaned_prompt.lower()
       is_reset = "reset" in lower and "reset chat" in lower
 
+      mentioned_ids = [
+        str(m.id) for m in message.mentions if not m.bot and m.id != message.author.id
+      ]
       members_list = ""
       if message.guild is not None:
-        members_list = await self._format_members_list(message.guild)
+        roster_cache.note_conversation(str(message.guild.id), str(message.author.id))
+        members_list = await self._format_members_list(
+          message.guild,
+          str(message.channel.id),
+          [str(message.author.id), *mentioned_ids, *_replied_to_ids([message])],
+        )
 
       req = ChatRequest(
         channel_id=str(message.channel.id),
@@ -82,17 +189,23 @@ class MessageHandlerCog(commands.Cog):
         image_urls=[att.url for att in image_attachments],
         sticker_urls=sticker_urls,
         emoji_urls=emoji_urls,
+        mentioned_ids=mentioned_ids,
         members_list=members_list,
+        lore_version=server_cache.lore_version(server_id),
+        tool_execution=TOOL_EXECUTION_MODE,
         is_reset=is_reset,
+        dispatch_load=self.queue.backlog(),
       )
 
+      key = (req.server_id, req.channel_id, req.author_id)
+      if DEBOUNCE_WINDOW > 0 and not is_reset:
+        self.debouncer.put(key, (message, req))
+      else:
+        # A reset must not be merged, but what came before it goes first
+        await self.debouncer.flush_key(key)
+        await self._start_chat(req)
+
       client = await get_client()
-      await client.start_workflow(
-        BooChatWorkflow.run,
-        req,
-        id=f"chat-{message.id}",
-        task_queue=TEMPORAL_TASK_QUEUE,
-      )
 
       message_url = (
         f"https://discord.com/channels/"
@@ -126,24 +239,110 @@ class MessageHandlerCog(commands.Cog):
       logger.error(f"Failed to dispatch message {message.id}: {e}", exc_info=True)
       await send_error_message(message)
 
-  async def _format_members_list(self, guild: discord.Guild) -> str:
+  async def _flush_debounced(
+    self, _key: Hashable, items: List[Tuple[discord.Message, ChatRequest]]
+  ) -> None:
+    req = merge_chat_requests([req for _, req in items])
+    message = next(m for m, r in items if r.message_id == req.message_id)
     try:
-      await guild.chunk()
-      members = [
-        f"- {m.name} (Display: {m.display_name}) - ID: {m.id}"
-        for m in guild.members
-        if not m.bot
-      ]
-      if not members:
-        return "## Server Members\nNo members found."
-      return (
-        "## Server Members\n"
-        "To ping a member, use <@user_id> format. Available members:\n"
-        + "\n".join(members)
-      )
+      if len(items) > 1 and message.guild is not None:
+        # Cover everyone mentioned or replied to across all the merged messages
+        req = replace(
+          req,
+          members_list=await self._format_members_list(
+            message.guild,
+            req.channel_id,
+            [req.author_id, *req.mentioned_ids, *_replied_to_ids(m for m, _ in items)],
+          ),
+        )
+      await self._start_chat(req)
     except Exception as e:
-      logger.error(f"Failed to chunk guild members: {e}")
-      return ""
+      logger.error(f"Failed to dispatch message {message.id}: {e}", exc_info=True)
+      await send_error_message(message)
+
+  async def _start_chat(self, req: ChatRequest) -> None:
+    if req.merged_message_ids:
+      logger.info(f"Merged {len(req.merged_message_ids) + 1} messages into {req.message_id}")
+    client = await get_client()
+    if GUILD_SESSIONS:
+      # Signal-with-start: queue the turn on the guild's session, starting it if needed
+      await client.start_workflow(
+        GuildSessionWorkflow.run,
+        GuildSessionState(server_id=req.server_id),
+        id=f"guild-session-{req.server_id}",
+        task_queue=TEMPORAL_TASK_QUEUE,
+        start_signal="submit",
+        start_signal_args=[req],
+      )
+    else:
+      await client.start_workflow(
+        BooChatWorkflow.run,
+        req,
+        id=f"chat-{req.message_id}",
+        task_queue=TEMPORAL_TASK_QUEUE,
+      )
+
+  async def _format_members_list(
+    self, guild: discord.Guild, channel_id: str, priority_ids: List[str]
+  ) -> str:
+    """Members list for the prompt, limited to the MEMBERS_TOP_K most relevant."""
+    if str(guild.id) not in roster_cache:
+      await self._load_roster(guild)
+    if MEMBERS_TOP_K:
+      return roster_cache.select(str(guild.id), channel_id, priority_ids, MEMBERS_TOP_K)
+    return roster_cache.render(str(guild.id))
+
+  async def _load_roster(self, guild: discord.Guild) -> None:
+    """Chunk a guild's members once; member events keep the roster current after that."""
+    async with self._roster_locks.setdefault(guild.id, asyncio.Lock()):
+      if str(guild.id) in roster_cache:
+        return
+      try:
+        if not guild.chunked:
+          await guild.chunk()
+        roster_cache.load(str(guild.id), (_roster_member(m) for m in guild.members if not m.bot))
+      except Exception as e:
+        logger.error(f"Failed to chunk guild members: {e}")
+
+  @commands.Cog.listener()
+  async def on_member_join(self, member: discord.Member) -> None:
+    if not member.bot:
+      roster_cache.upsert(str(member.guild.id), _roster_member(member))
+
+  @commands.Cog.listener()
+  async def on_member_remove(self, member: discord.Member) -> None:
+    roster_cache.remove(str(member.guild.id), str(member.id))
+
+  @commands.Cog.listener()
+  async def on_member_update(self, _before: discord.Member, after: discord.Member) -> None:
+    if not after.bot:
+      roster_cache.upsert(str(after.guild.id), _roster_member(after))
+
+  @commands.Cog.listener()
+  async def on_user_update(self, _before: discord.User, after: discord.User) -> None:
+    # Username changes arrive per user, not per guild
+    for guild in after.mutual_guilds:
+      member = guild.get_member(after.id)
+      if member is not None and not member.bot:
+        roster_cache.upsert(str(guild.id), _roster_member(member))
+
+  @commands.Cog.listener()
+  async def on_guild_remove(self, guild: discord.Guild) -> None:
+    roster_cache.drop(str(guild.id))
+    self._roster_locks.pop(guild.id, None)
+
+
+def _replied_to_ids(messages: Iterable[discord.Message]) -> List[str]:
+  ids = []
+  for message in messages:
+    resolved = message.reference.resolved if message.reference else None
+    if isinstance(resolved, discord.Message) and not resolved.author.bot:
+      ids.append(str(resolved.author.id))
+  return ids
+
+
+def _roster_member(member: discord.Member) -> RosterMember:
+  return RosterMember(id=str(member.id), name=member.name, display_name=member.display_name)
 
 
 async def setup(bot: commands.Bot) -> None:
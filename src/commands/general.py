@@ -4,9 +4,10 @@ import discord
 
 from datetime import datetime, timedelta, timezone
 from utils.logger import logger
+from utils.cache import server_cache
 from discord.ext import commands
 from utils.config import OPENROUTER_MODEL
-from services.db_service import DBService
+from services.db_service import AsyncDBService
 from services.llm_service import LLMService
 from services.tenor_service import TenorService
 from services.async_caller_service import to_thread
@@ -23,7 +24,7 @@ class GeneralCommands(commands.Cog):
 
   def __init__(self, bot: commands.Bot) -> None:
     self.bot = bot
-    self.db_service = DBService()
+    self.db_service = AsyncDBService()
     self.llm_service = LLMService()
     self.tenor_service = TenorService()
     self.weather_service = WeatherService()
@@ -101,7 +102,7 @@ class GeneralCommands(commands.Cog):
       return await ctx.send(embed=embed)
 
     try:
-      stats = self.db_service.get_token_stats(
+      stats = await self.db_service.get_token_stats(
         guild_id=str(guild.id), author_id=str(target_user.id), period=period.lower()
       )
 
@@ -280,7 +281,9 @@ class GeneralCommands(commands.Cog):
       return await ctx.send("❌ This command can only be used in a server, no DMs")
 
     try:
-      result = self.db_service.fetch_prompt(str(guild.id))
+      result = await self.db_service.fetch_prompt(str(guild.id))
+      if result is None:
+        return await ctx.send("❌ Failed to fetch system prompt, try again later")
       system_prompt = result.get("system_prompt") if result else "No system prompt set"
       file_content = system_prompt.encode("utf-8")
       filename = f"system_prompt_{guild.id}.md"
@@ -338,9 +341,11 @@ class GeneralCommands(commands.Cog):
       if len(system_prompt) > 50000:
         return await ctx.send("❌ System prompt is too long (max 50,000 characters)")
 
-      success = self.db_service.update_prompt(str(guild.id), system_prompt)
+      success = await self.db_service.update_prompt(str(guild.id), system_prompt)
 
       if success:
+        ### New version stamp makes every worker refetch the lore on the next message
+        server_cache.bump_lore_version(str(guild.id))
         await ctx.send(f"✅ System prompt updated successfully for **{guild.name}**!")
       else:
         await ctx.send("❌ Failed to update system prompt. Please try again later.")
@@ -393,9 +398,11 @@ class GeneralCommands(commands.Cog):
       if len(system_prompt) > 50000:
         return await ctx.send("❌ System prompt is too long (max 50,000 characters)")
 
-      success = self.db_service.add_prompt(str(guild.id), system_prompt)
+      success = await self.db_service.add_prompt(str(guild.id), system_prompt)
 
       if success:
+        ### New version stamp makes every worker refetch the lore on the next message
+        server_cache.bump_lore_version(str(guild.id))
         await ctx.send(f"✅ System prompt added successfully for **{guild.name}**!")
       else:
         await ctx.send(
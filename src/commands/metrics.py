@@ -1,5 +1,13 @@
+from datetime import timedelta
 from discord.ext import commands
+from utils.logger import logger
+from utils.config import TEMPORAL_TASK_QUEUE
+from utils.message_utils import ingest_rejected, message_ingest
+from utils.emoji_index import emoji_index
+from utils.roster import roster_cache
+from services.temporal_client import get_client
 from services.meilisearch_service import MeilisearchService
+from workflows.metrics_workflow import WorkerStatsWorkflow
 
 
 class MetricsCog(commands.Cog):
@@ -18,6 +26,106 @@ class MetricsCog(commands.Cog):
       "-# Background task metrics live in the Temporal UI."
     )
 
+  @commands.hybrid_command(name="boo-metrics", help="Get bot pipeline stats")
+  @commands.is_owner()
+  async def boo_metrics(self, ctx):
+    ingest = message_ingest.stats()
+    lines = [
+      "**Message Ingestion:**",
+      f"- Queue Depth: {ingest['depth']} / {message_ingest.max_items}",
+      f"- Enqueued: {ingest['enqueued']} | Flushed: {ingest['flushed']} "
+      f"({ingest['batches']} batches)",
+      f"- Dropped: {ingest['dropped']} | Failed Flushes: {ingest['failed_flushes']}",
+      f"- Rejected by Manager: {ingest_rejected['messages']} "
+      f"({ingest_rejected['batches']} batches)",
+    ]
+    handler = self.bot.get_cog("MessageHandlerCog")
+    if handler is not None:
+      dispatch = handler.dispatch_stats()
+      lines += [
+        "",
+        "**Chat Dispatch:**",
+        f"- Queue Depth: {dispatch['depth']} / {handler.queue.maxsize} | "
+        f"Busy Workers: {dispatch['busy']} / {handler.queue.workers}",
+        f"- Handled: {dispatch['processed']} | Failed: {dispatch['failed']}",
+        f"- Shed: {dispatch['shed']} queue full | {dispatch['user_limited']} user limit | "
+        f"{dispatch['guild_limited']} guild limit",
+      ]
+    roster = roster_cache.stats()
+    lines += [
+      "",
+      "**Member Rosters:**",
+      f"- Guilds: {roster['guilds']} | Members: {roster['members']}",
+    ]
+    emojis = emoji_index.stats()
+    lines += [
+      "",
+      "**Emoji Index:**",
+      f"- Guilds: {emojis['guilds']} | Emojis: {emojis['emojis']}",
+      f"- Other Servers: {emojis['foreign_found']} found | {emojis['foreign_missing']} missing",
+    ]
+
+    worker = await self._worker_stats(ctx.message.id)
+    if worker is None:
+      lines += ["", "**Worker:** unavailable"]
+    else:
+      lore = worker["lore_cache"]
+      lines += [
+        "",
+        "**Lore Cache (worker):**",
+        f"- Hits: {lore['hits']} | Misses: {lore['misses']} "
+        f"({_hit_rate(lore['hits'], lore['misses'])})",
+        f"- Entries: {lore['active_entries']} active / {lore['total_entries']} total",
+      ]
+
+      degradation = worker.get("degradation")
+      if degradation:
+        lines += [
+          "",
+          "**LLM Load (worker):**",
+          f"- Mode: {degradation['level']} | Pressure: {degradation['pressure']:.0%} | "
+          f"Switches: {degradation['transitions']}",
+        ]
+
+      tool_caches = worker.get("tool_caches", {})
+      if tool_caches:
+        lines += ["", "**Tool Result Caches (worker):**"]
+        for name, stats in sorted(tool_caches.items()):
+          lines.append(
+            f"- {name}: {stats['hits']} hits / {stats['misses']} misses "
+            f"({_hit_rate(stats['hits'], stats['misses'])}), {stats['active']} cached"
+          )
+      tools = worker.get("tools", {})
+      if tools:
+        lines += ["", "**Tool Calls (worker):**"]
+        for name, stats in sorted(tools.items()):
+          lines.append(
+            f"- {name}: {stats['calls']} calls, avg {stats['avg_ms']:.0f} ms, "
+            f"max {stats['max_ms']:.0f} ms | {stats['errors']} errors, {stats['timeouts']} timeouts"
+            + (f", {stats['waiting']} waiting" if stats.get("waiting") else "")
+          )
+      lines.append("-# Worker stats come from whichever worker picked up the query.")
+
+    await ctx.send("\n".join(lines))
+
+  async def _worker_stats(self, request_id: int):
+    try:
+      client = await get_client()
+      return await client.execute_workflow(
+        WorkerStatsWorkflow.run,
+        id=f"worker-stats-{request_id}",
+        task_queue=TEMPORAL_TASK_QUEUE,
+        execution_timeout=timedelta(seconds=15),
+      )
+    except Exception as e:
+      logger.error(f"Failed to fetch worker stats: {e}")
+      return None
+
+
+def _hit_rate(hits: int, misses: int) -> str:
+  total = hits + misses
+  return f"{hits / total:.0%} hit rate" if total else "no lookups yet"
+
 
 async def setup(bot):
   await bot.add_cog(MetricsCog(bot))
@@ -1,61 +1,128 @@
-import requests
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, List, Optional
+
+import httpx
+
 from utils.logger import logger
-from typing import Optional, Dict
 from utils.singleton import Singleton
 from utils.config import DB_SERVICE_BASE_URL, MANAGER_API_TOKEN
 
 
-class DBService(metaclass=Singleton):
+class AsyncDBService(metaclass=Singleton):
   """
-  Service for interacting with the database API.
+  Async client for the manager API.
+
+  Requests go through one pooled, keep-alive httpx.AsyncClient per event loop, so
+  the bot, the worker's async activities and the sync DBService facade each reuse
+  their own warm connections instead of opening a new one per call.
   """
 
   def __init__(self):
     """
-    Initialize the DBService with the base URL for the database API.
+    Initialize the AsyncDBService with the base URL for the database API.
     """
-    self.base_url = DB_SERVICE_BASE_URL
-    self.timeout = 1  ### Timeout of 1s
+    self.base_url = f"http://{DB_SERVICE_BASE_URL}"
+    self.timeout = httpx.Timeout(1.0, pool=5.0)  ### 1s per request, 5s to get a pooled conn
+    self.limits = httpx.Limits(
+      max_connections=32, max_keepalive_connections=16, keepalive_expiry=30.0
+    )
     self.headers = {"Authorization": f"Bearer {MANAGER_API_TOKEN}"}
-
-  def fetch_prompt(self, guild_id: str) -> Dict[str, str]:
+    self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+      weakref.WeakKeyDictionary()
+    )
+
+  def _client(self) -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = self._clients.get(loop)
+    if client is None or client.is_closed:
+      client = httpx.AsyncClient(
+        base_url=self.base_url,
+        headers=self.headers,
+        timeout=self.timeout,
+        limits=self.limits,
+      )
+      self._clients[loop] = client
+    return client
+
+  async def aclose(self) -> None:
+    """Close the pooled client bound to the running event loop."""
+    client = self._clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+      await client.aclose()
+
+  async def _send(
+    self,
+    method: str,
+    path: str,
+    context: str,
+    *,
+    params: Optional[dict] = None,
+    payload: Any = None,
+    fallback: Any = None,
+    on_status: Optional[Dict[int, Any]] = None,
+    parse_json: bool = True,
+  ) -> Any:
     """
-    Fetch a prompt for a given guild ID.
+    Send one request and map the outcome to a return value.
 
     Args:
-      guild_id (str): The ID of the guild to fetch the prompt for.
+      method (str): HTTP method.
+      path (str): Endpoint path on the manager, e.g. "/prompt".
+      context (str): What the call is doing, used in log lines.
+      params (Optional[dict]): Query parameters.
+      payload (Any): JSON body.
+      fallback (Any): Returned when the request fails.
+      on_status (Optional[Dict[int, Any]]): Expected non-2xx statuses and what to return for them.
+      parse_json (bool): Return the decoded body (True) or just True on success (False).
 
     Returns:
-      Optional[Dict[str, str]]: A dictionary containing the guild_id and system_prompt, or None if the request fails.
+      Any: The decoded JSON body, True, a value from on_status, or fallback.
     """
-    endpoint = f"http://{self.base_url}/prompt"
-    params = {"guild_id": guild_id}
-
     try:
-      response = requests.get(
-        endpoint, params=params, timeout=self.timeout, headers=self.headers
+      response = await self._client().request(
+        method, path, params=params, json=payload
       )
-
-      if response.status_code == 404:
-        logger.warning(f"No prompt found for guild {guild_id} (404)")
-        return {"system_prompt": ""}
+      if on_status and response.status_code in on_status:
+        logger.warning(f"Got {response.status_code} while {context}")
+        return on_status[response.status_code]
 
       response.raise_for_status()
-      return response.json()
-    except requests.Timeout:
-      logger.error(f"Timeout occurred while fetching prompt for guild {guild_id}")
-    except requests.ConnectionError:
-      logger.error(
-        f"Connection error occurred while fetching prompt for guild {guild_id}"
-      )
-    except requests.RequestException as e:
-      logger.error(f"Error fetching prompt for guild {guild_id}: {e}")
+      if not parse_json:
+        return True
+      return response.json() if response.content else {}
+    except httpx.TimeoutException:
+      logger.error(f"Timeout occurred while {context}")
+    except httpx.TransportError as e:
+      logger.error(f"Connection error occurred while {context}: {e}")
+    except httpx.HTTPStatusError as e:
+      logger.error(f"Error {e.response.status_code} while {context}")
     except ValueError as e:
-      logger.error(f"Error parsing JSON response for guild {guild_id}: {e}")
+      logger.error(f"Error parsing JSON response while {context}: {e}")
 
-    return {"system_prompt": ""}
+    return fallback
 
-  def update_prompt(self, guild_id: str, system_prompt: str) -> bool:
+  async def fetch_prompt(self, guild_id: str) -> Optional[Dict[str, str]]:
+    """
+    Fetch a prompt for a given guild ID.
+
+    Args:
+      guild_id (str): The ID of the guild to fetch the prompt for.
+
+    Returns:
+      Optional[Dict[str, str]]: A dictionary containing the guild_id and system_prompt.
+      system_prompt is empty if none is set; None if the request fails.
+    """
+    return await self._send(
+      "GET",
+      "/prompt",
+      f"fetching prompt for guild {guild_id}",
+      params={"guild_id": guild_id},
+      on_status={404: {"system_prompt": ""}},
+    )
+
+  async def update_prompt(self, guild_id: str, system_prompt: str) -> bool:
     """
     Update the system prompt for a given guild ID.
 
@@ -66,41 +133,21 @@ class DBService(metaclass=Singleton):
     Returns:
       bool: True if the update was successful, False otherwise.
     """
-    endpoint = f"http://{self.base_url}/prompt"
-    params = {"guild_id": guild_id}
-    payload = {"system_prompt": system_prompt}
-
-    try:
-      response = requests.put(
-        endpoint,
-        params=params,
-        json=payload,
-        timeout=self.timeout,
-        headers=self.headers,
-      )
-      if response.status_code == 404:
-        logger.warning(f"No prompt found to update for guild {guild_id} (404)")
-        return False
-      response.raise_for_status()
+    ok = await self._send(
+      "PUT",
+      "/prompt",
+      f"updating prompt for guild {guild_id}",
+      params={"guild_id": guild_id},
+      payload={"system_prompt": system_prompt},
+      fallback=False,
+      on_status={404: False},
+      parse_json=False,
+    )
+    if ok:
       logger.info(f"Successfully updated prompt for guild {guild_id}")
+    return ok
 
-      return True
-    except requests.Timeout:
-      logger.error(f"Timeout occurred while updating prompt for guild {guild_id}")
-    except requests.ConnectionError:
-      logger.error(
-        f"Connection error occurred while updating prompt for guild {guild_id}"
-      )
-    except requests.RequestException as e:
-      logger.error(f"Error updating prompt for guild {guild_id}: {e}")
-    except ValueError as e:
-      logger.error(
-        f"Error parsing JSON response while updating prompt for guild {guild_id}: {e}"
-      )
-
-    return False
-
-  def add_prompt(self, guild_id: str, system_prompt: str) -> bool:
+  async def add_prompt(self, guild_id: str, system_prompt: str) -> bool:
     """
     Add a new system prompt for a given guild ID.
 
@@ -111,240 +158,287 @@ class DBService(metaclass=Singleton):
     Returns:
       bool: True if the addition was successful, False otherwise.
     """
-    endpoint = f"http://{self.base_url}/prompt"
-    payload = {"guild_id": guild_id, "system_prompt": system_prompt}
-
-    try:
-      response = requests.post(
-        endpoint, json=payload, timeout=self.timeout, headers=self.headers
-      )
-      if response.status_code == 409:
-        logger.warning(f"Prompt already exists for guild {guild_id} (409)")
-        return False
-      response.raise_for_status()
+    ok = await self._send(
+      "POST",
+      "/prompt",
+      f"adding prompt for guild {guild_id}",
+      payload={"guild_id": guild_id, "system_prompt": system_prompt},
+      fallback=False,
+      on_status={409: False},
+      parse_json=False,
+    )
+    if ok:
       logger.info(f"Successfully added prompt for guild {guild_id}")
+    return ok
 
-      return True
-    except requests.Timeout:
-      logger.error(f"Timeout occurred while adding prompt for guild {guild_id}")
-    except requests.ConnectionError:
-      logger.error(
-        f"Connection error occurred while adding prompt for guild {guild_id}"
-      )
-    except requests.RequestException as e:
-      logger.error(f"Error adding prompt for guild {guild_id}: {e}")
-    except ValueError as e:
-      logger.error(
-        f"Error parsing JSON response while adding prompt for guild {guild_id}: {e}"
-      )
-
-    return False
+  async def store_message(self, msg_payload: dict) -> Optional[Dict[str, str]]:
+    return await self._send("POST", "/message", "adding message", payload=msg_payload)
 
-  def store_message(self, msg_payload: dict) -> Optional[Dict[str, str]]:
-    endpoint = f"http://{self.base_url}/message"
+  async def store_messages(self, messages: List[dict]) -> Optional[Dict[str, int]]:
+    """
+    Archive a batch of messages in one request.
 
-    try:
-      response = requests.post(
-        endpoint, json=msg_payload, timeout=self.timeout, headers=self.headers
-      )
-      response.raise_for_status()
-      return response.json()
-    except requests.Timeout:
-      logger.error("Timeout occurred while adding message")
-    except requests.ConnectionError:
-      logger.error("Connection error occurred while adding message")
-    except requests.RequestException as _e:
-      pass
-    except ValueError as e:
-      logger.error(f"Error parsing JSON response after adding message: {e}")
+    Returns:
+      Optional[Dict[str, int]]: {"inserted": n} on success, {"inserted": 0, "rejected": 1}
+      if the manager refused the batch (retrying can't help), or None if the request failed.
+    """
+    return await self._send(
+      "POST",
+      "/messages",
+      f"storing {len(messages)} messages",
+      payload=messages,
+      on_status={400: {"inserted": 0, "rejected": 1}},
+    )
+
+  async def get_token_stats(
+    self, guild_id: str, author_id: str, period: str = "daily"
+  ) -> Optional[list]:
+    return await self._send(
+      "GET",
+      "/token/stats",
+      f"fetching token stats for user {author_id} in guild {guild_id}",
+      params={"guild_id": guild_id, "author_id": author_id, "period": period},
+      on_status={404: []},
+    )
+
+  async def store_token_usage(self, usage: dict) -> Optional[Dict[str, str]]:
+    return await self._send("POST", "/token", "storing token usage", payload=usage)
+
+  async def get_chat_history(self, guild_id: str) -> Optional[list]:
+    return await self._send(
+      "GET",
+      "/chat-history",
+      f"fetching chat history for guild {guild_id}",
+      params={"guild_id": guild_id},
+    )
+
+  async def update_chat_history(self, guild_id: str, messages: list) -> bool:
+    return await self._send(
+      "PUT",
+      "/chat-history",
+      f"updating chat history for guild {guild_id}",
+      params={"guild_id": guild_id},
+      payload=messages,
+      fallback=False,
+      parse_json=False,
+    )
+
+  async def delete_chat_history(self, guild_id: str) -> bool:
+    return await self._send(
+      "DELETE",
+      "/chat-history",
+      f"deleting chat history for guild {guild_id}",
+      params={"guild_id": guild_id},
+      fallback=False,
+      parse_json=False,
+    )
+
+  async def get_chat_summary(self, guild_id: str) -> Optional[str]:
+    result = await self._send(
+      "GET",
+      "/chat-history/summary",
+      f"fetching chat summary for guild {guild_id}",
+      params={"guild_id": guild_id},
+    )
+    return None if result is None else result.get("summary", "")
+
+  async def update_chat_summary(self, guild_id: str, summary: str) -> bool:
+    return await self._send(
+      "PUT",
+      "/chat-history/summary",
+      f"updating chat summary for guild {guild_id}",
+      params={"guild_id": guild_id},
+      payload={"summary": summary},
+      fallback=False,
+      parse_json=False,
+    )
+
+  async def get_conversation_context(
+    self,
+    guild_id: str,
+    author_ids: List[str],
+    include_prompt: bool = True,
+    include_history: bool = True,
+  ) -> Optional[dict]:
+    """
+    Fetch the prompt, chat history and memories for one chat turn in a single request.
 
-    return None
+    Args:
+      guild_id (str): The ID of the guild the conversation belongs to.
+      author_ids (List[str]): The message author followed by any mentioned users.
+      include_prompt (bool): Set to False when the caller already has the prompt cached.
+      include_history (bool): Set to False when the caller already holds the history.
 
-  def get_token_stats(
-    self, guild_id: str, author_id: str, period: str = "daily"
+    Returns:
+      Optional[dict]: {"system_prompt", "chat_history", "summary", "memories": {author_id: [...]}},
+      or None if the request fails.
+    """
+    return await self._send(
+      "GET",
+      "/context",
+      f"fetching conversation context for guild {guild_id}",
+      params={
+        "guild_id": guild_id,
+        "author_ids": ",".join(author_ids),
+        "include_prompt": str(include_prompt).lower(),
+        "include_history": str(include_history).lower(),
+      },
+    )
+
+  async def add_memory(self, memory_payload: dict) -> Optional[Dict[str, int]]:
+    return await self._send("POST", "/memory", "adding memory", payload=memory_payload)
+
+  async def get_memories(self, guild_id: str, author_id: str) -> Optional[list]:
+    return await self._send(
+      "GET",
+      "/memory",
+      "fetching memories",
+      params={"guild_id": guild_id, "author_id": author_id},
+      fallback=[],
+    )
+
+  async def get_recent_memories(self, guild_id: str, limit: int = 50) -> Optional[list]:
+    return await self._send(
+      "GET",
+      "/memory/recent",
+      "fetching recent memories",
+      params={"guild_id": guild_id, "limit": limit},
+      fallback=[],
+    )
+
+  async def delete_memory(self, memory_id: int) -> bool:
+    return await self._send(
+      "DELETE",
+      "/memory",
+      "deleting memory",
+      params={"id": memory_id},
+      fallback=False,
+      parse_json=False,
+    )
+
+  async def update_memory(self, memory_id: int, fact: str) -> bool:
+    return await self._send(
+      "PUT",
+      "/memory",
+      "updating memory",
+      params={"id": memory_id},
+      payload={"fact": fact},
+      fallback=False,
+      parse_json=False,
+    )
+
+  async def search_memories(
+    self, guild_id: str, query: str, author_id: Optional[str] = None
   ) -> Optional[list]:
-    endpoint = f"http://{self.base_url}/token/stats"
-    params = {"guild_id": guild_id, "author_id": author_id, "period": period}
+    params = {"guild_id": guild_id, "q": query}
+    if author_id:
+      params["author_id"] = author_id
+    return await self._send(
+      "GET", "/memory/search", "searching memories", params=params, fallback=[]
+    )
 
-    try:
-      response = requests.get(
-        endpoint, params=params, timeout=self.timeout, headers=self.headers
-      )
+  async def get_memory_by_id(self, memory_id: int) -> Optional[dict]:
+    return await self._send(
+      "GET", "/memory/id", "fetching memory by id", params={"id": memory_id}
+    )
 
-      if response.status_code == 404:
-        logger.warning(f"No token stats found for user {author_id} in guild {guild_id}")
-        return []
 
-      response.raise_for_status()
-      return response.json()
-    except requests.Timeout:
-      logger.error(f"Timeout occurred while fetching token stats for user {author_id}")
-    except requests.ConnectionError:
-      logger.error(
-        f"Connection error occurred while fetching token stats for user {author_id}"
-      )
-    except requests.RequestException as e:
-      logger.error(f"Error fetching token stats for user {author_id}: {e}")
-    except ValueError as e:
-      logger.error(f"Error parsing JSON response for token stats: {e}")
+class DBService(metaclass=Singleton):
+  """
+  Blocking facade over AsyncDBService for sync callers (sync Temporal activities, tool functions).
+
+  Calls are run on a private background event loop, so they share one pooled client.
+  The loop's thread starts on the first call, not when the facade is created.
+  Never call this from async code; await AsyncDBService instead.
+  """
+
+  def __init__(self):
+    self._async = AsyncDBService()
+    self._loop: Optional[asyncio.AbstractEventLoop] = None
+    self._loop_lock = threading.Lock()
+
+  def _run(self, coro):
+    return asyncio.run_coroutine_threadsafe(coro, self._get_loop()).result()
+
+  def _get_loop(self) -> asyncio.AbstractEventLoop:
+    with self._loop_lock:
+      if self._loop is None:
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(
+          target=self._loop.run_forever, name="db-service-loop", daemon=True
+        ).start()
+      return self._loop
+
+  def fetch_prompt(self, guild_id: str) -> Optional[Dict[str, str]]:
+    return self._run(self._async.fetch_prompt(guild_id))
+
+  def update_prompt(self, guild_id: str, system_prompt: str) -> bool:
+    return self._run(self._async.update_prompt(guild_id, system_prompt))
+
+  def add_prompt(self, guild_id: str, system_prompt: str) -> bool:
+    return self._run(self._async.add_prompt(guild_id, system_prompt))
+
+  def store_message(self, msg_payload: dict) -> Optional[Dict[str, str]]:
+    return self._run(self._async.store_message(msg_payload))
+
+  def store_messages(self, messages: List[dict]) -> Optional[Dict[str, int]]:
+    return self._run(self._async.store_messages(messages))
 
-    return None
+  def get_token_stats(
+    self, guild_id: str, author_id: str, period: str = "daily"
+  ) -> Optional[list]:
+    return self._run(self._async.get_token_stats(guild_id, author_id, period))
 
   def store_token_usage(self, usage: dict) -> Optional[Dict[str, str]]:
-    endpoint = f"http://{self.base_url}/token"
-    try:
-      response = requests.post(
-        endpoint, json=usage, timeout=self.timeout, headers=self.headers
-      )
-      response.raise_for_status()
-      print(response.json())
-      return response.json()
-    except requests.Timeout:
-      logger.error("Timeout occurred while storing token usage")
-    except requests.ConnectionError:
-      logger.error("Connection error occurred while storing token usage")
-    except requests.RequestException as _e:
-      pass
-    except ValueError as e:
-      logger.error(f"Error parsing response after storing token usage: {e}")
-    return None
+    return self._run(self._async.store_token_usage(usage))
 
   def get_chat_history(self, guild_id: str) -> Optional[list]:
-    endpoint = f"http://{self.base_url}/chat-history"
-    params = {"guild_id": guild_id}
-
-    try:
-      response = requests.get(
-        endpoint, params=params, timeout=self.timeout, headers=self.headers
-      )
-      response.raise_for_status()
-      return response.json()
-    except requests.RequestException as e:
-      logger.error(f"Error fetching chat history for guild {guild_id}: {e}")
-      return None
+    return self._run(self._async.get_chat_history(guild_id))
 
   def update_chat_history(self, guild_id: str, messages: list) -> bool:
-    endpoint = f"http://{self.base_url}/chat-history"
-    params = {"guild_id": guild_id}
-    payload = messages
-
-    try:
-      response = requests.put(
-        endpoint,
-        params=params,
-        json=payload,
-        timeout=self.timeout,
-        headers=self.headers,
-      )
-      response.raise_for_status()
-      return True
-    except requests.RequestException as e:
-      logger.error(f"Error updating chat history for guild {guild_id}: {e}")
-      return False
+    return self._run(self._async.update_chat_history(guild_id, messages))
 
   def delete_chat_history(self, guild_id: str) -> bool:
-    endpoint = f"http://{self.base_url}/chat-history"
-    params = {"guild_id": guild_id}
-
-    try:
-      response = requests.delete(
-        endpoint, params=params, timeout=self.timeout, headers=self.headers
+    return self._run(self._async.delete_chat_history(guild_id))
+
+  def get_chat_summary(self, guild_id: str) -> Optional[str]:
+    return self._run(self._async.get_chat_summary(guild_id))
+
+  def update_chat_summary(self, guild_id: str, summary: str) -> bool:
+    return self._run(self._async.update_chat_summary(guild_id, summary))
+
+  def get_conversation_context(
+    self,
+    guild_id: str,
+    author_ids: List[str],
+    include_prompt: bool = True,
+    include_history: bool = True,
+  ) -> Optional[dict]:
+    return self._run(
+      self._async.get_conversation_context(
+        guild_id, author_ids, include_prompt, include_history
       )
-      response.raise_for_status()
-      return True
-    except requests.RequestException as e:
-      logger.error(f"Error deleting chat history for guild {guild_id}: {e}")
-      return False
+    )
 
   def add_memory(self, memory_payload: dict) -> Optional[Dict[str, int]]:
-    endpoint = f"http://{self.base_url}/memory"
-    try:
-      response = requests.post(
-        endpoint, json=memory_payload, timeout=self.timeout, headers=self.headers
-      )
-      response.raise_for_status()
-      return response.json()
-    except requests.RequestException as e:
-      logger.error(f"Error adding memory: {e}")
-      return None
+    return self._run(self._async.add_memory(memory_payload))
 
   def get_memories(self, guild_id: str, author_id: str) -> Optional[list]:
-    endpoint = f"http://{self.base_url}/memory"
-    params = {"guild_id": guild_id, "author_id": author_id}
-    try:
-      response = requests.get(
-        endpoint, params=params, timeout=self.timeout, headers=self.headers
-      )
-      response.raise_for_status()
-      return response.json()
-    except requests.RequestException as e:
-      logger.error(f"Error fetching memories: {e}")
-      return []
+    return self._run(self._async.get_memories(guild_id, author_id))
 
   def get_recent_memories(self, guild_id: str, limit: int = 50) -> Optional[list]:
-    endpoint = f"http://{self.base_url}/memory/recent"
-    params = {"guild_id": guild_id, "limit": limit}
-    try:
-      response = requests.get(
-        endpoint, params=params, timeout=self.timeout, headers=self.headers
-      )
-      response.raise_for_status()
-      return response.json()
-    except requests.RequestException as e:
-      logger.error(f"Error fetching recent memories: {e}")
-      return []
+    return self._run(self._async.get_recent_memories(guild_id, limit))
 
   def delete_memory(self, memory_id: int) -> bool:
-    endpoint = f"http://{self.base_url}/memory"
-    params = {"id": memory_id}
-    try:
-      response = requests.delete(
-        endpoint, params=params, timeout=self.timeout, headers=self.headers
-      )
-      response.raise_for_status()
-      return True
-    except requests.RequestException as e:
-      logger.error(f"Error deleting memory: {e}")
-      return False
+    return self._run(self._async.delete_memory(memory_id))
 
   def update_memory(self, memory_id: int, fact: str) -> bool:
-    endpoint = f"http://{self.base_url}/memory"
-    params = {"id": memory_id}
-    payload = {"fact": fact}
-    try:
-      response = requests.put(
-        endpoint, params=params, json=payload, timeout=self.timeout, headers=self.headers
-      )
-      response.raise_for_status()
-      return True
-    except requests.RequestException as e:
-      logger.error(f"Error updating memory: {e}")
-      return False
+    return self._run(self._async.update_memory(memory_id, fact))
 
-  def search_memories(self, guild_id: str, query: str, author_id: Optional[str] = None) -> Optional[list]:
-    endpoint = f"http://{self.base_url}/memory/search"
-    params = {"guild_id": guild_id, "q": query}
-    if author_id:
-      params["author_id"] = author_id
-    try:
-      response = requests.get(
-        endpoint, params=params, timeout=self.timeout, headers=self.headers
-      )
-      response.raise_for_status()
-      return response.json()
-    except requests.RequestException as e:
-      logger.error(f"Error searching memories: {e}")
-      return []
+  def search_memories(
+    self, guild_id: str, query: str, author_id: Optional[str] = None
+  ) -> Optional[list]:
+    return self._run(self._async.search_memories(guild_id, query, author_id))
 
   def get_memory_by_id(self, memory_id: int) -> Optional[dict]:
-    endpoint = f"http://{self.base_url}/memory/id"
-    params = {"id": memory_id}
-    try:
-      response = requests.get(
-        endpoint, params=params, timeout=self.timeout, headers=self.headers
-      )
-      response.raise_for_status()
-      return response.json()
-    except requests.RequestException as e:
-      logger.error(f"Error fetching memory by id: {e}")
-      return None
+    return self._run(self._async.get_memory_by_id(memory_id))
@@ -1,38 +1,69 @@
 import io
 import time
 import json
-from openai import OpenAI
-from typing import List, Dict, Union, Optional
+import asyncio
+from types import SimpleNamespace
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from openai import AsyncOpenAI, OpenAI
+from typing import Awaitable, Callable, List, Dict, Tuple, Union, Optional
 
 from utils.logger import logger
-from utils.config import OPENROUTER_API_KEY, OPENROUTER_MODEL
-from services.tool_calling_service import (
-  hackernews_tool,
-  get_top_hn_stories,
-  exa_search_tool,
-  search_web,
-  sandbox_tool,
-  run_code,
-  generate_image_tool,
-  read_pdf_tool,
-  read_pdf,
-  read_csv_tool,
-  read_csv,
-  github_repo_info_tool,
-  get_github_repo_info,
-  github_search_tool,
-  search_github,
-  github_trending_tool,
-  get_trending_repos,
-  store_memory_tool,
-  store_memory,
-  recall_memory_tool,
-  recall_memories,
-)
+from utils.config import OPENROUTER_API_KEY, OPENROUTER_FALLBACK_MODEL, OPENROUTER_MODEL
+from utils.degradation import FALLBACK_MODEL, REDUCED_TOOLS, degradation_policy
+from services.tool_calling_service import generate_image_tool, is_retryable_tool_error
 from utils.llm_utils import to_base64_data_uri
 from utils.singleton import Singleton
+from utils.tool_registry import ToolSpec, tool_registry
 
 MAX_TOOL_ROUNDS = 5
+# Under load (see DegradationPolicy) only these tools are offered, for fewer rounds
+DEGRADED_TOOLS = ("recall_memories", "store_memory", "lookup_member", "search_web")
+DEGRADED_TOOL_ROUNDS = 2
+
+# Tool calls in one round run concurrently, each with its registry timeout, and the
+# whole round is capped; a call that misses its deadline returns an error to the model
+# (its thread finishes in the background and the result is dropped).
+TOOL_ROUND_TIMEOUT = 60.0
+
+IMAGE_REPLY = "Here's your generated image! 🎨"
+
+
+def tool_round_messages(
+  content: Optional[str], calls: List[Tuple[str, str, str]], results: List[str]
+) -> List[dict]:
+  """Assistant tool-call message plus one tool message per (id, name, arguments) call."""
+  messages = [
+    {
+      "role": "assistant",
+      "content": content or "",
+      "tool_calls": [
+        {
+          "id": call_id,
+          "type": "function",
+          "function": {"name": name, "arguments": arguments},
+        }
+        for call_id, name, arguments in calls
+      ],
+    }
+  ]
+  for (call_id, _, _), result in zip(calls, results):
+    messages.append({"role": "tool", "tool_call_id": call_id, "content": result})
+  return messages
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+  return getattr(getattr(error, "response", None), "status_code", None) == 429
+
+
+class TransientToolError(Exception):
+  """A tool call failed in a way another attempt may fix (see is_retryable_tool_error)."""
+
+
+def final_text(content: Optional[str], memory_stored: bool) -> str:
+  text = (content or "").strip()
+  if memory_stored:
+    text = f"{text}\n\n-# memory saved"
+  return text
 
 
 class LLMService(metaclass=Singleton):
@@ -40,34 +71,18 @@ class LLMService(metaclass=Singleton):
     self.client = OpenAI(
       base_url="https://openrouter.ai/api/v1", api_key=OPENROUTER_API_KEY
     )
+    self.async_client = AsyncOpenAI(
+      base_url="https://openrouter.ai/api/v1", api_key=OPENROUTER_API_KEY
+    )
     self.model = OPENROUTER_MODEL
+    self.fallback_model = OPENROUTER_FALLBACK_MODEL or OPENROUTER_MODEL
 
-    self.tool_functions = {
-      "get_hackernews_stories": get_top_hn_stories,
-      "search_web": search_web,
-      "run_code": run_code,
-      "generate_image": self._generate_image_as_tool,
-      "read_pdf": read_pdf,
-      "read_csv": read_csv,
-      "get_github_repo_info": get_github_repo_info,
-      "search_github": search_github,
-      "get_trending_repos": get_trending_repos,
-      "store_memory": store_memory,
-      "recall_memories": recall_memories,
-    }
-
-    self.tool_definitions = [
-      hackernews_tool,
-      exa_search_tool,
-      sandbox_tool,
-      generate_image_tool,
-      read_pdf_tool,
-      read_csv_tool,
-      github_repo_info_tool,
-      github_search_tool,
-      github_trending_tool,
-      store_memory_tool,
-      recall_memory_tool,
+    tool_registry.register(
+      ToolSpec(generate_image_tool, self._generate_image_as_tool, timeout=60, max_concurrency=4)
+    )
+    self.tool_definitions = tool_registry.definitions()
+    self.degraded_tool_definitions = [
+      d for d in self.tool_definitions if d["function"]["name"] in DEGRADED_TOOLS
     ]
 
   def create_or_edit_image(
@@ -162,104 +177,254 @@ class LLMService(metaclass=Singleton):
   ) -> tuple:
     """
     Main chat completion with multi-round tool calling.
-    The model can chain multiple tool calls across up to MAX_TOOL_ROUNDS rounds.
+    The model can chain multiple tool calls across up to MAX_TOOL_ROUNDS rounds
+    (DEGRADED_TOOL_ROUNDS under load).
     Returns: (response_text, usage, generated_images)
     """
     mock_usage = type("Usage", (), {"prompt_tokens": 0, "total_tokens": 0})()
 
     try:
-      if image:
-        image_url = image if isinstance(image, str) else to_base64_data_uri(image)
-        content = [
-          {"type": "text", "text": prompt or "Describe this image."},
-          {"type": "image_url", "image_url": {"url": image_url}},
-        ]
-        chat_messages = [{"role": "user", "content": content}]
-      elif messages:
-        chat_messages = (
-          [{"role": "user", "content": messages}]
-          if isinstance(messages, str)
-          else messages
-        )
-      elif prompt:
-        chat_messages = [{"role": "user", "content": prompt}]
-      else:
+      chat_messages = self._build_chat_messages(prompt, image, messages)
+      if chat_messages is None:
         return "⚠️ No input provided.", mock_usage, []
 
-      api_params = {
-        "model": self.model,
-        "messages": chat_messages,
-        "max_tokens": max_tokens,
-        "temperature": temperature,
-      }
-
-      if enable_tools:
-        api_params["tools"] = self.tool_definitions
-        api_params["tool_choice"] = "auto"
-
+      api_params = self._build_api_params(chat_messages, temperature, max_tokens, enable_tools)
       all_generated_images = []
       latest_usage = mock_usage
       memory_stored = False
 
-      for _round in range(MAX_TOOL_ROUNDS):
-        response = self.client.chat.completions.create(**api_params)
+      for _round in range(self.max_tool_rounds()):
+        response = self._create(api_params)
         message = response.choices[0].message
         latest_usage = response.usage
 
         if not (hasattr(message, "tool_calls") and message.tool_calls):
-          text = (message.content or "").strip()
-          if memory_stored:
-            text = f"{text}\n\n-# memory saved"
-          return text, latest_usage, all_generated_images
+          return final_text(message.content, memory_stored), latest_usage, all_generated_images
 
         tool_results, generated_images, memory_stored_call = self._execute_tool_calls(message, guild_id)
         all_generated_images.extend(generated_images)
         memory_stored = memory_stored or memory_stored_call
 
         if generated_images:
-          text = "Here's your generated image! 🎨"
-          if memory_stored:
-            text = f"{text}\n\n-# memory saved"
+          text = final_text(IMAGE_REPLY, memory_stored)
           return text, latest_usage, all_generated_images
 
-        chat_messages.append(
-          {
-            "role": "assistant",
-            "content": message.content or "",
-            "tool_calls": [
-              {
-                "id": tr["call"].id,
-                "type": "function",
-                "function": {
-                  "name": tr["call"].function.name,
-                  "arguments": tr["call"].function.arguments,
-                },
-              }
-              for tr in tool_results
-            ],
-          }
+        self._append_tool_round(chat_messages, message, tool_results)
+
+      # Max rounds exhausted -- get a final text response without tools
+      api_params.pop("tools", None)
+      api_params.pop("tool_choice", None)
+      final_response = self._create(api_params)
+      text = final_text(final_response.choices[0].message.content, memory_stored)
+      return text, final_response.usage, all_generated_images
+
+    except Exception as e:
+      logger.error(f"Error in chat_completions: {e}")
+      return self._handle_api_error(e), mock_usage, []
+
+  async def chat_completions_async(
+    self,
+    prompt: Optional[str] = None,
+    image: Optional[Union[io.BytesIO, bytes, str]] = None,
+    messages: Optional[Union[str, List[Dict[str, str]]]] = None,
+    temperature: float = 0.6,
+    max_tokens: int = 4096,
+    enable_tools: bool = False,
+    guild_id: Optional[str] = None,
+    on_text: Optional[Callable[[str], Awaitable[None]]] = None,
+  ) -> tuple:
+    """
+    Async chat_completions on AsyncOpenAI: the event loop is only held while there is
+    work to do, and (sync) tools run in worker threads.
+    With `on_text`, responses are streamed and `on_text` is awaited with the current
+    round's text so far after every delta.
+    Returns: (response_text, usage, generated_images)
+    """
+    mock_usage = type("Usage", (), {"prompt_tokens": 0, "total_tokens": 0})()
+
+    try:
+      chat_messages = self._build_chat_messages(prompt, image, messages)
+      if chat_messages is None:
+        return "⚠️ No input provided.", mock_usage, []
+
+      api_params = self._build_api_params(chat_messages, temperature, max_tokens, enable_tools)
+      all_generated_images = []
+      latest_usage = mock_usage
+      memory_stored = False
+
+      for _round in range(self.max_tool_rounds()):
+        message, usage = await self._complete_async(api_params, on_text)
+        latest_usage = usage or latest_usage
+
+        if not message.tool_calls:
+          return final_text(message.content, memory_stored), latest_usage, all_generated_images
+
+        tool_results, generated_images, memory_stored_call = await self._execute_tool_calls_async(
+          message, guild_id
         )
+        all_generated_images.extend(generated_images)
+        memory_stored = memory_stored or memory_stored_call
 
-        for tr in tool_results:
-          chat_messages.append(
-            {"role": "tool", "tool_call_id": tr["call"].id, "content": tr["result"]}
-          )
+        if generated_images:
+          text = final_text(IMAGE_REPLY, memory_stored)
+          return text, latest_usage, all_generated_images
 
-        api_params["messages"] = chat_messages
+        self._append_tool_round(chat_messages, message, tool_results)
 
       # Max rounds exhausted -- get a final text response without tools
       api_params.pop("tools", None)
       api_params.pop("tool_choice", None)
-      final_response = self.client.chat.completions.create(**api_params)
-      text = (final_response.choices[0].message.content or "").strip()
-      if memory_stored:
-        text = f"{text}\n\n-# memory saved"
-      return text, final_response.usage, all_generated_images
+      message, usage = await self._complete_async(api_params, on_text)
+      text = final_text(message.content, memory_stored)
+      return text, usage or latest_usage, all_generated_images
 
     except Exception as e:
-      logger.error(f"Error in chat_completions: {e}")
+      logger.error(f"Error in chat_completions_async: {e}")
       return self._handle_api_error(e), mock_usage, []
 
+  def _build_chat_messages(
+    self,
+    prompt: Optional[str],
+    image: Optional[Union[io.BytesIO, bytes, str]],
+    messages: Optional[Union[str, List[Dict[str, str]]]],
+  ) -> Optional[list]:
+    """Normalize the prompt/image/messages inputs into a chat message list (None if empty)."""
+    if image:
+      image_url = image if isinstance(image, str) else to_base64_data_uri(image)
+      content = [
+        {"type": "text", "text": prompt or "Describe this image."},
+        {"type": "image_url", "image_url": {"url": image_url}},
+      ]
+      return [{"role": "user", "content": content}]
+    if messages:
+      return (
+        [{"role": "user", "content": messages}]
+        if isinstance(messages, str)
+        else messages
+      )
+    if prompt:
+      return [{"role": "user", "content": prompt}]
+    return None
+
+  def max_tool_rounds(self) -> int:
+    if degradation_policy.level >= REDUCED_TOOLS:
+      return DEGRADED_TOOL_ROUNDS
+    return MAX_TOOL_ROUNDS
+
+  def _build_api_params(
+    self, chat_messages: list, temperature: float, max_tokens: int, enable_tools: bool
+  ) -> dict:
+    level = degradation_policy.level
+    api_params = {
+      "model": self.fallback_model if level >= FALLBACK_MODEL else self.model,
+      "messages": chat_messages,
+      "max_tokens": max_tokens,
+      "temperature": temperature,
+    }
+    if enable_tools:
+      api_params["tools"] = (
+        self.degraded_tool_definitions if level >= REDUCED_TOOLS else self.tool_definitions
+      )
+      api_params["tool_choice"] = "auto"
+    return api_params
+
+  def _create(self, api_params: dict):
+    """Blocking completion request, feeding its outcome to the degradation policy."""
+    try:
+      response = self.client.chat.completions.create(**api_params)
+    except Exception as e:
+      degradation_policy.record(rate_limited=is_rate_limit_error(e))
+      raise
+    degradation_policy.record(rate_limited=False)
+    return response
+
+  def _append_tool_round(self, chat_messages: list, message, tool_results: list) -> None:
+    """Record the assistant's tool calls and their results for the next round."""
+    calls = [
+      (tr["call"].id, tr["call"].function.name, tr["call"].function.arguments)
+      for tr in tool_results
+    ]
+    chat_messages.extend(
+      tool_round_messages(message.content, calls, [tr["result"] for tr in tool_results])
+    )
+
+  async def complete_round_async(
+    self,
+    messages: List[dict],
+    enable_tools: bool = True,
+    on_text: Optional[Callable[[str], Awaitable[None]]] = None,
+    temperature: float = 0.6,
+    max_tokens: int = 4096,
+  ) -> tuple:
+    """
+    A single model round, for callers that drive the tool loop themselves.
+    Errors propagate so the caller can retry just this round.
+    Returns: (message, usage)
+    """
+    api_params = self._build_api_params(messages, temperature, max_tokens, enable_tools)
+    return await self._complete_async(api_params, on_text)
+
+  async def _complete_async(
+    self, api_params: dict, on_text: Optional[Callable[[str], Awaitable[None]]] = None
+  ) -> tuple:
+    """_complete_once, feeding its outcome to the degradation policy."""
+    try:
+      result = await self._complete_once(api_params, on_text)
+    except Exception as e:
+      degradation_policy.record(rate_limited=is_rate_limit_error(e))
+      raise
+    degradation_policy.record(rate_limited=False)
+    return result
+
+  async def _complete_once(
+    self, api_params: dict, on_text: Optional[Callable[[str], Awaitable[None]]] = None
+  ) -> tuple:
+    """
+    One completion request. Returns (message, usage).
+    Without `on_text` this is a plain request; with it the response is streamed and
+    assembled into an equivalent message (content + tool_calls). usage may be None
+    if the provider does not report it for streams.
+    """
+    if on_text is None:
+      response = await self.async_client.chat.completions.create(**api_params)
+      return response.choices[0].message, response.usage
+
+    stream = await self.async_client.chat.completions.create(
+      **api_params, stream=True, stream_options={"include_usage": True}
+    )
+    text = ""
+    calls: Dict[int, dict] = {}
+    usage = None
+    async for chunk in stream:
+      if getattr(chunk, "usage", None):
+        usage = chunk.usage
+      if not chunk.choices:
+        continue
+      delta = chunk.choices[0].delta
+
+      for tc in delta.tool_calls or []:
+        call = calls.setdefault(tc.index, {"id": "", "name": "", "arguments": ""})
+        if tc.id:
+          call["id"] = tc.id
+        if tc.function and tc.function.name:
+          call["name"] += tc.function.name
+        if tc.function and tc.function.arguments:
+          call["arguments"] += tc.function.arguments
+
+      if delta.content:
+        text += delta.content
+        await on_text(text)
+
+    tool_calls = [
+      SimpleNamespace(
+        id=call["id"],
+        type="function",
+        function=SimpleNamespace(name=call["name"], arguments=call["arguments"] or "{}"),
+      )
+      for _, call in sorted(calls.items())
+    ]
+    return SimpleNamespace(content=text, tool_calls=tool_calls or None), usage
+
   def describe_image(
     self,
     image: Union[io.BytesIO, bytes, str],
@@ -296,61 +461,145 @@ class LLMService(metaclass=Singleton):
 
   def _execute_tool_calls(self, message, guild_id: Optional[str] = None) -> tuple:
     """
-    Execute all tool calls from the model's response.
+    Execute all tool calls from the model's response concurrently.
     Returns: (tool_results, generated_images, memory_stored)
     """
-    generated_images = []
-    tool_results = []
-    memory_stored = False
+    started = time.monotonic()
+    dispatched = [self._dispatch_tool_call(tool_call, guild_id) for tool_call in message.tool_calls]
 
-    for tool_call in message.tool_calls:
+    outcomes = []
+    for tool_call, (arguments, future) in zip(message.tool_calls, dispatched):
       function_name = tool_call.function.name
-      logger.info(f"Executing tool: {function_name}")
-
+      timeout = self._tool_timeout(function_name)
+      remaining = max(0.0, started + timeout - time.monotonic())
       try:
-        arguments = json.loads(tool_call.function.arguments)
+        result = future.result(timeout=remaining)
+      except FutureTimeoutError:
+        # Drops the call if it is still queued behind its tool's max_concurrency
+        future.cancel()
+        outcomes.append(self._tool_timeout_outcome(function_name, timeout))
+        continue
+      except Exception as e:
+        outcomes.append(self._tool_error_outcome(function_name, e))
+        continue
+      outcomes.append(self._tool_outcome(function_name, arguments, result))
+    return self._collect_tool_outcomes(message, outcomes)
+
+  async def _execute_tool_calls_async(self, message, guild_id: Optional[str] = None) -> tuple:
+    """Async _execute_tool_calls: tools stay on the registry's pools, only the waiting is async."""
+    outcomes = await asyncio.gather(
+      *(self.execute_tool_call_async(tool_call, guild_id) for tool_call in message.tool_calls)
+    )
+    return self._collect_tool_outcomes(message, outcomes)
 
-        if guild_id and function_name in ("store_memory", "recall_memories"):
-          arguments["guild_id"] = guild_id
+  async def execute_tool_call_async(
+    self, tool_call, guild_id: Optional[str] = None, raise_retryable: bool = False
+  ) -> tuple:
+    """
+    Run one tool call within its deadline.
+    With `raise_retryable`, a missed deadline or a transient failure (raised by the
+    tool, or an error result it flagged "retryable") raises TransientToolError
+    instead of becoming an error result, so the caller can retry the call.
+    Returns: (result_json, generated_image or None, memory_stored)
+    """
+    function_name = tool_call.function.name
+    timeout = self._tool_timeout(function_name)
+    arguments, future = self._dispatch_tool_call(tool_call, guild_id)
+    try:
+      result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+      outcome = self._tool_timeout_outcome(function_name, timeout)
+      if raise_retryable:
+        raise TransientToolError(f"{function_name} timed out after {timeout:g}s")
+      return outcome
+    except Exception as e:
+      if raise_retryable and is_retryable_tool_error(e):
+        logger.warning(f"Transient error executing {function_name}, will retry: {e}")
+        raise TransientToolError(f"{function_name} failed: {e}") from e
+      return self._tool_error_outcome(function_name, e)
+    if raise_retryable and isinstance(result, dict) and result.get("retryable"):
+      error = result.get("error") or result.get("message")
+      logger.warning(f"Transient error executing {function_name}, will retry: {error}")
+      raise TransientToolError(f"{function_name} failed: {error}")
+    return self._tool_outcome(function_name, arguments, result)
+
+  def _dispatch_tool_call(self, tool_call, guild_id: Optional[str] = None) -> tuple:
+    """Parse a tool call and start it on the registry. Returns: (arguments, future)"""
+    function_name = tool_call.function.name
+    logger.info(f"Executing tool: {function_name}")
+
+    future: Future = Future()
+    if function_name not in tool_registry:
+      future.set_result({"error": f"Unknown function: {function_name}"})
+      return {}, future
+    try:
+      arguments = json.loads(tool_call.function.arguments)
+    except ValueError as e:
+      future.set_exception(e)
+      return {}, future
 
-        if function_name in self.tool_functions:
-          result = self.tool_functions[function_name](**arguments)
-        else:
-          result = {"error": f"Unknown function: {function_name}"}
+    if guild_id and function_name in ("store_memory", "recall_memories", "lookup_member"):
+      arguments["guild_id"] = guild_id
+    return arguments, tool_registry.dispatch(function_name, arguments)
 
-        if function_name == "store_memory" and result.get("status") == "success":
-          memory_stored = True
-          username = arguments.get("username", "user")
-          result["message"] = f"Stored memory about {username}"
+  def _tool_timeout(self, function_name: str) -> float:
+    spec = tool_registry.get(function_name)
+    return min(spec.timeout if spec else TOOL_ROUND_TIMEOUT, TOOL_ROUND_TIMEOUT)
 
-        result_str = json.dumps(result)
+  def _tool_timeout_outcome(self, function_name: str, timeout: float) -> tuple:
+    tool_registry.record_timeout(function_name)
+    return json.dumps({"error": f"{function_name} timed out after {timeout:g}s"}), None, False
 
-        if (
-          function_name == "generate_image"
-          and result.get("status") == "success"
-          and "image_data" in result
-        ):
-          generated_images.append(
-            {
-              "data": result["image_data"],
-              "format": result.get("format", "png"),
-            }
-          )
+  def _tool_error_outcome(self, function_name: str, error: Exception) -> tuple:
+    logger.error(f"Error executing {function_name}: {error}")
+    return json.dumps({"error": str(error)}), None, False
 
-        tool_results.append({"call": tool_call, "result": result_str})
+  def _collect_tool_outcomes(self, message, outcomes: list) -> tuple:
+    generated_images = []
+    tool_results = []
+    memory_stored = False
 
-      except Exception as e:
-        logger.error(f"Error executing {function_name}: {e}")
-        error_result = json.dumps({"error": str(e)})
-        tool_results.append({"call": tool_call, "result": error_result})
+    for tool_call, (result_str, image, stored) in zip(message.tool_calls, outcomes):
+      tool_results.append({"call": tool_call, "result": result_str})
+      if image:
+        generated_images.append(image)
+      memory_stored = memory_stored or stored
 
     return tool_results, generated_images, memory_stored
 
+  def _tool_outcome(self, function_name: str, arguments: dict, result) -> tuple:
+    """
+    Post-process one tool result.
+    Returns: (result_json, generated_image or None, memory_stored)
+    """
+    try:
+      memory_stored = False
+      if function_name == "store_memory" and result.get("status") == "success":
+        memory_stored = True
+        username = arguments.get("username", "user")
+        result["message"] = f"Stored memory about {username}"
+
+      result_str = json.dumps(result)
+
+      image = None
+      if (
+        function_name == "generate_image"
+        and result.get("status") == "success"
+        and "image_data" in result
+      ):
+        image = {
+          "data": result["image_data"],
+          "format": result.get("format", "png"),
+        }
+
+      return result_str, image, memory_stored
+
+    except Exception as e:
+      return self._tool_error_outcome(function_name, e)
+
   def _handle_api_error(self, error: Exception) -> str:
     """Handle API errors with user-friendly messages."""
-    if (
-      hasattr(error, "response") and getattr(error.response, "status_code", None) == 429
-    ):
+    if is_rate_limit_error(error):
       headers = getattr(error.response, "headers", {})
       reset_ts = int(headers.get("X-RateLimit-Reset", "0"))
       wait_sec = max(0, reset_ts - int(time.time()))
@@ -1,11 +1,42 @@
 import io
+import time
 import base64
+import hashlib
+import threading
+import multiprocessing
+import httpx
 import requests
-import pandas as pd
-from PyPDF2 import PdfReader
+from urllib.parse import parse_qs, urlparse
 from exa_py import Exa
 from datetime import datetime, timedelta
-from utils.config import EXA_API_KEY, GITHUB_TOKEN
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from utils.cache import TTLCache
+from utils.logger import logger
+from utils.pdf_utils import extract_pdf_pages
+from utils.csv_utils import CappedReader, ColumnProfiler
+from utils.config import DISCORD_TOKEN, EXA_API_KEY, GITHUB_TOKEN
+from utils.tool_cache import normalize_arg
+from utils.tool_registry import ToolSpec, tool_registry
+
+
+def is_retryable_tool_error(error: Exception) -> bool:
+  """Transient tool failures worth another attempt: network trouble, 429 and 5xx responses."""
+  status = getattr(getattr(error, "response", None), "status_code", None)
+  if status is not None:
+    return status == 429 or status >= 500
+  return isinstance(
+    error, (requests.ConnectionError, requests.Timeout, httpx.TransportError, ConnectionError)
+  )
+
+
+def _flag_retryable(result: dict, error: Exception) -> dict:
+  """
+  Tools turn failures into error results for the model; transient ones are marked
+  "retryable" so that when a tool call runs as its own activity, it is retried.
+  """
+  if is_retryable_tool_error(error):
+    result["retryable"] = True
+  return result
 
 ### Hackernews
 hackernews_tool = {
@@ -27,26 +58,78 @@ hackernews_tool = {
 }
 
 
+HN_API_BASE = "https://hacker-news.firebaseio.com/v0"
+HN_TIMEOUT = 5
+HN_FANOUT = 16
+HN_SCAN_LIMIT = 200
+HN_REFRESH_INTERVAL = 120
+HN_PREFETCH = 60
+HN_IDLE_STOP = 60 * 60
+
+_hn_session = requests.Session()
+_hn_pool = ThreadPoolExecutor(max_workers=HN_FANOUT, thread_name_prefix="hn")
+# Items barely change once posted (score/comments drift), so they can live a while
+_hn_items = TTLCache(maxsize=2000, ttl=600, name="hn-items")
+_hn_top = TTLCache(maxsize=1, ttl=HN_REFRESH_INTERVAL * 2, name="hn-top")
+_hn_refresher = {"thread": None, "last_used": 0.0}
+_hn_refresher_lock = threading.Lock()
+
+
+def _hn_get(path: str):
+  response = _hn_session.get(f"{HN_API_BASE}/{path}", timeout=HN_TIMEOUT)
+  response.raise_for_status()
+  return response.json()
+
+
 def fetch_top_stories():
   try:
-    response = requests.get("https://hacker-news.firebaseio.com/v0/topstories.json")
-    response.raise_for_status()
-    return response.json()
+    return _hn_top.get_or_load("top", lambda: _hn_get("topstories.json"))
   except requests.RequestException as e:
-    return {"error": f"Failed to fetch top stories: {str(e)}"}
+    return _flag_retryable({"error": f"Failed to fetch top stories: {str(e)}"}, e)
 
 
 def fetch_story(story_id):
   try:
-    url = f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json"
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json()
+    return _hn_items.get_or_load(story_id, lambda: _hn_get(f"item/{story_id}.json"))
   except requests.RequestException as e:
     return {"error": f"Failed to fetch story {story_id}: {str(e)}"}
 
 
+def _refresh_hn() -> None:
+  """Keep the top list and its first items warm until the tool goes unused."""
+  while time.monotonic() - _hn_refresher["last_used"] < HN_IDLE_STOP:
+    try:
+      story_ids = _hn_get("topstories.json")
+      _hn_top.set("top", story_ids)
+      for story_id, item in zip(story_ids, _hn_pool.map(_hn_fetch_quietly, story_ids[:HN_PREFETCH])):
+        if item is not None:
+          _hn_items.set(story_id, item)
+    except requests.RequestException as e:
+      logger.warning(f"Hacker News refresh failed: {e}")
+    time.sleep(HN_REFRESH_INTERVAL)
+
+  with _hn_refresher_lock:
+    _hn_refresher["thread"] = None
+
+
+def _hn_fetch_quietly(story_id):
+  try:
+    return _hn_get(f"item/{story_id}.json")
+  except requests.RequestException:
+    return None
+
+
+def _ensure_hn_refresher() -> None:
+  with _hn_refresher_lock:
+    _hn_refresher["last_used"] = time.monotonic()
+    if _hn_refresher["thread"] is None:
+      thread = threading.Thread(target=_refresh_hn, name="hn-refresh", daemon=True)
+      _hn_refresher["thread"] = thread
+      thread.start()
+
+
 def get_top_hn_stories(limit=20):
+  _ensure_hn_refresher()
   story_ids = fetch_top_stories()
   if isinstance(story_ids, dict) and "error" in story_ids:
     return story_ids
@@ -54,23 +137,28 @@ def get_top_hn_stories(limit=20):
   stories = []
   last_week = int((datetime.now() - timedelta(days=7)).timestamp())
 
-  for story_id in story_ids:
+  # Fetch in concurrent windows until enough stories pass the filter
+  story_ids = story_ids[:HN_SCAN_LIMIT]
+  for start in range(0, len(story_ids), max(limit, HN_FANOUT)):
     if len(stories) >= limit:
       break
-    story = fetch_story(story_id)
-    if isinstance(story, dict) and "error" not in story:
-      if story.get("time", 0) >= last_week and story.get("type") == "story":
-        stories.append(
-          {
-            "id": story.get("id"),
-            "title": story.get("title", ""),
-            "url": story.get("url", ""),
-            "score": story.get("score", 0),
-            "by": story.get("by", ""),
-            "time": story.get("time", 0),
-            "descendants": story.get("descendants", 0),
-          }
-        )
+    window = story_ids[start : start + max(limit, HN_FANOUT)]
+    for story in _hn_pool.map(fetch_story, window):
+      if len(stories) >= limit:
+        break
+      if isinstance(story, dict) and "error" not in story:
+        if story.get("time", 0) >= last_week and story.get("type") == "story":
+          stories.append(
+            {
+              "id": story.get("id"),
+              "title": story.get("title", ""),
+              "url": story.get("url", ""),
+              "score": story.get("score", 0),
+              "by": story.get("by", ""),
+              "time": story.get("time", 0),
+              "descendants": story.get("descendants", 0),
+            }
+          )
 
   stories.sort(key=lambda x: x["score"], reverse=True)
   return stories[:limit]
@@ -104,11 +192,18 @@ exa_search_tool = {
 
 
 ### PDF Reader
+PDF_TIMEOUT = 15
+PDF_MAX_BYTES = 25 * 1024 * 1024
+PDF_DEFAULT_MAX_CHARS = 20000
+PDF_MAX_CHARS = 50000
+# Documents above this size are extracted in a separate process
+PDF_PROCESS_POOL_BYTES = 2 * 1024 * 1024
+
 read_pdf_tool = {
   "type": "function",
   "function": {
     "name": "read_pdf",
-    "description": "Read and extract text content from a PDF file at a given URL. Use when a PDF link is shared or you need to read a PDF document.",
+    "description": "Read and extract text content from a PDF file at a given URL. Use when a PDF link is shared or you need to read a PDF document. Long documents are returned in parts: if the result has next_page, call again with start_page=next_page to continue.",
     "parameters": {
       "type": "object",
       "properties": {
@@ -116,33 +211,137 @@ read_pdf_tool = {
           "type": "string",
           "description": "The URL of the PDF file to read.",
         },
+        "start_page": {
+          "type": "integer",
+          "description": "First page to read, 1-based (default: 1).",
+          "default": 1,
+        },
+        "end_page": {
+          "type": "integer",
+          "description": "Last page to read, inclusive (default: last page).",
+        },
+        "max_chars": {
+          "type": "integer",
+          "description": f"Maximum characters of text to return (default: {PDF_DEFAULT_MAX_CHARS}, max: {PDF_MAX_CHARS}).",
+          "default": PDF_DEFAULT_MAX_CHARS,
+        },
       },
       "required": ["url"],
     },
   },
 }
 
+# (url, etag or content sha256) -> text of each page
+_pdf_pages = TTLCache(maxsize=64, ttl=60 * 60, name="pdf-pages")
+# url -> ETag of the last download, sent as If-None-Match when the PDF is read again
+_pdf_etags = TTLCache(maxsize=256, ttl=60 * 60, name="pdf-etags")
+_pdf_process_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_process_pool() -> ProcessPoolExecutor:
+  global _pdf_process_pool
+  with _pdf_pool_lock:
+    if _pdf_process_pool is None:
+      # spawn, not fork: the worker process is full of threads
+      _pdf_process_pool = ProcessPoolExecutor(
+        max_workers=2, mp_context=multiprocessing.get_context("spawn")
+      )
+    return _pdf_process_pool
+
+
+def _load_pdf_pages(url: str) -> list:
+  """
+  Download (streamed, capped at PDF_MAX_BYTES) and extract a PDF, with caching.
+  A PDF read before is requested conditionally; a 304 reuses its pages without a body.
+  """
+  etag = _pdf_etags.get(url)
+  cached = _pdf_pages.get((url, etag)) if etag else None
+  headers = {"If-None-Match": etag} if cached is not None else None
+  with requests.get(url, stream=True, timeout=PDF_TIMEOUT, headers=headers) as response:
+    if response.status_code == 304 and cached is not None:
+      return cached
+    response.raise_for_status()
+    etag = response.headers.get("ETag")
+    if etag:
+      _pdf_etags.set(url, etag)
+      # Servers that ignore If-None-Match still let us skip reading the body
+      pages = _pdf_pages.get((url, etag))
+      if pages is not None:
+        return pages
+
+    too_large = f"PDF is larger than {PDF_MAX_BYTES // (1024 * 1024)} MB"
+    if int(response.headers.get("Content-Length") or 0) > PDF_MAX_BYTES:
+      raise ValueError(too_large)
+    data = bytearray()
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+      data.extend(chunk)
+      if len(data) > PDF_MAX_BYTES:
+        raise ValueError(too_large)
+
+  key = (url, etag or hashlib.sha256(data).hexdigest())
+  pages = _pdf_pages.get(key)
+  if pages is None:
+    if len(data) > PDF_PROCESS_POOL_BYTES:
+      pages = _get_pdf_process_pool().submit(extract_pdf_pages, bytes(data)).result()
+    else:
+      pages = extract_pdf_pages(bytes(data))
+    _pdf_pages.set(key, pages)
+  return pages
+
 
-def read_pdf(url: str):
+def read_pdf(url: str, start_page: int = 1, end_page: int = None, max_chars: int = PDF_DEFAULT_MAX_CHARS):
   try:
-    response = requests.get(url)
-    response.raise_for_status()
-    pdf_file = io.BytesIO(response.content)
-    reader = PdfReader(pdf_file)
-    text = ""
-    for page in reader.pages:
-      text += page.extract_text()
-    return {"text": text}
+    pages = _load_pdf_pages(url)
+    total_pages = len(pages)
+    start = max(1, int(start_page))
+    end = min(total_pages, int(end_page)) if end_page else total_pages
+    if start > total_pages:
+      return {"error": f"start_page {start} is past the last page ({total_pages})"}
+    max_chars = min(max(1, int(max_chars)), PDF_MAX_CHARS)
+
+    parts = []
+    used = 0
+    last_page = start
+    truncated = False
+    for number in range(start, end + 1):
+      text = pages[number - 1]
+      last_page = number
+      if used + len(text) > max_chars:
+        parts.append(text[: max_chars - used])
+        truncated = True
+        break
+      parts.append(text)
+      used += len(text)
+
+    result = {
+      "text": "\n".join(parts),
+      "total_pages": total_pages,
+      "pages": [start, last_page],
+      "truncated": truncated,
+    }
+    # A page cut off after others is returned again in full on the next call; a
+    # single page longer than max_chars is skipped past instead of repeated
+    next_page = last_page if truncated and last_page > start else last_page + 1
+    if next_page <= total_pages:
+      result["next_page"] = next_page
+    return result
   except Exception as e:
-    return {"error": f"Failed to read PDF: {str(e)}"}
+    return _flag_retryable({"error": f"Failed to read PDF: {str(e)}"}, e)
 
 
 ### CSV Reader
+CSV_TIMEOUT = 15
+CSV_MAX_BYTES = 50 * 1024 * 1024
+CSV_MAX_ROWS = 500_000
+CSV_CHUNK_ROWS = 10_000
+CSV_MAX_RETURN_ROWS = 50
+
 read_csv_tool = {
   "type": "function",
   "function": {
     "name": "read_csv",
-    "description": "Read and preview a CSV file from a URL. Returns the first few rows. Use when a CSV link is shared or you need to inspect tabular data.",
+    "description": "Read and profile a CSV file from a URL. Returns a slice of rows (the first few by default) plus, per column, its type, null count and numeric min/max/mean/std. Use when a CSV link is shared or you need to inspect tabular data; request specific rows or columns to look further.",
     "parameters": {
       "type": "object",
       "properties": {
@@ -150,6 +349,26 @@ read_csv_tool = {
           "type": "string",
           "description": "The URL of the CSV file to read.",
         },
+        "columns": {
+          "type": "array",
+          "items": {"type": "string"},
+          "description": "Only read these columns (default: all).",
+        },
+        "start_row": {
+          "type": "integer",
+          "description": "First data row to return, 0-based (default: 0).",
+          "default": 0,
+        },
+        "num_rows": {
+          "type": "integer",
+          "description": f"Number of rows to return (default: 5, max: {CSV_MAX_RETURN_ROWS}).",
+          "default": 5,
+        },
+        "profile": {
+          "type": "boolean",
+          "description": "Scan the file for column statistics (default: true). Set false to just fetch rows.",
+          "default": True,
+        },
       },
       "required": ["url"],
     },
@@ -157,12 +376,61 @@ read_csv_tool = {
 }
 
 
-def read_csv(url: str):
+def read_csv(url: str, columns: list = None, start_row: int = 0, num_rows: int = 5, profile: bool = True):
   try:
-    df = pd.read_csv(url)
-    return {"data": df.head().to_string()}
+    # Imported here so processes that never read a CSV don't pay for pandas
+    import pandas as pd
+
+    start_row = max(0, int(start_row))
+    num_rows = min(max(0, int(num_rows)), CSV_MAX_RETURN_ROWS)
+    end_row = start_row + num_rows
+
+    with requests.get(url, stream=True, timeout=CSV_TIMEOUT) as response:
+      response.raise_for_status()
+      response.raw.decode_content = True
+      stream = CappedReader(response.raw, CSV_MAX_BYTES)
+      chunks = pd.read_csv(
+        io.BufferedReader(stream),
+        chunksize=CSV_CHUNK_ROWS,
+        usecols=columns or None,
+        on_bad_lines="skip",
+      )
+
+      profiler = ColumnProfiler()
+      selected = []
+      header = []
+      rows_scanned = 0
+      complete = False
+      for chunk in chunks:
+        header = header or [str(c) for c in chunk.columns]
+        offset = rows_scanned
+        rows_scanned += len(chunk)
+        if offset < end_row and rows_scanned > start_row:
+          selected.append(chunk.iloc[max(0, start_row - offset) : end_row - offset])
+
+        if profile:
+          profiler.update(chunk)
+        elif rows_scanned >= end_row:
+          break
+        if rows_scanned >= CSV_MAX_ROWS:
+          break
+      else:
+        complete = not stream.capped
+
+    rows = pd.concat(selected) if selected else None
+    result = {
+      "data": rows.to_string() if rows is not None else "",
+      "rows": [start_row, start_row + (len(rows) if rows is not None else 0)],
+      "columns": header,
+      "rows_scanned": rows_scanned,
+      # False when the byte/row cap (or an early stop) ended the scan
+      "complete": complete,
+    }
+    if profile:
+      result["profile"] = profiler.summary()
+    return result
   except Exception as e:
-    return {"error": f"Failed to read CSV: {str(e)}"}
+    return _flag_retryable({"error": f"Failed to read CSV: {str(e)}"}, e)
 
 
 def search_web(query, max_results=5):
@@ -194,7 +462,7 @@ def search_web(query, max_results=5):
       "total_results": len(formatted_results),
     }
   except Exception as e:
-    return {"error": f"Failed to search web: {str(e)}"}
+    return _flag_retryable({"error": f"Failed to search web: {str(e)}"}, e)
 
 
 ### Code running sandbox
@@ -219,14 +487,23 @@ sandbox_tool = {
 }
 
 
+# The sandbox enforces the code's own timeout (max 10s); allow for overhead
+SANDBOX_TIMEOUT = 20
+
+
 def run_code(code: str, timeout: int = 5):
   try:
     resp = requests.post(
-      "http://sandbox:8081/run", json={"code": code, "timeout": timeout}
+      "http://sandbox:8081/run",
+      json={"code": code, "timeout": timeout},
+      timeout=SANDBOX_TIMEOUT,
     )
+    # The sandbox answers 200 for every run, failed or not; 5xx means it is unwell
+    if resp.status_code >= 500:
+      resp.raise_for_status()
     return resp.json()
   except Exception as e:
-    return {"error": f"Sandbox service unavailable: {str(e)}"}
+    return _flag_retryable({"error": f"Sandbox service unavailable: {str(e)}"}, e)
 
 
 ### Image Generation Tool
@@ -263,6 +540,57 @@ GITHUB_HEADERS = {
 if GITHUB_TOKEN:
   GITHUB_HEADERS["Authorization"] = f"token {GITHUB_TOKEN}"
 
+GITHUB_TIMEOUT = 10
+_github_session = requests.Session()
+_github_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="github")
+
+# (url, params) -> (etag, response). Lets expired tool results revalidate with
+# If-None-Match; a 304 doesn't count against the GitHub rate limit.
+_github_etags = TTLCache(maxsize=1024, ttl=24 * 60 * 60, name="github-etags")
+
+
+def github_get(url: str, params: dict = None) -> requests.Response:
+  """GET from the GitHub API, reusing the last response when GitHub answers 304."""
+  key = (url, tuple(sorted((params or {}).items())))
+  cached = _github_etags.get(key)
+  headers = GITHUB_HEADERS
+  if cached:
+    headers = {**GITHUB_HEADERS, "If-None-Match": cached[0]}
+
+  response = _github_session.get(url, headers=headers, params=params, timeout=GITHUB_TIMEOUT)
+  if response.status_code == 304 and cached:
+    return cached[1]
+  etag = response.headers.get("ETag")
+  if response.ok and etag:
+    _github_etags.set(key, (etag, response))
+  return response
+
+
+def _count_from_pagination(response: requests.Response) -> int:
+  """Total size of a `per_page=1` listing, read from the Link header's last page."""
+  if not response.ok:
+    return 0
+  last_url = response.links.get("last", {}).get("url")
+  if last_url:
+    return int(parse_qs(urlparse(last_url).query).get("page", ["1"])[0])
+  return len(response.json())
+
+
+def _parse_repo_identifier(repo_identifier: str) -> tuple:
+  if "github.com" in repo_identifier:
+    parts = repo_identifier.rstrip("/").split("/")
+    return parts[-2], parts[-1]
+  owner, repo = repo_identifier.split("/")
+  return owner, repo
+
+
+def _normalize_repo_arg(arg: str, value):
+  try:
+    owner, repo = _parse_repo_identifier(value.strip())
+    return f"{owner}/{repo}".casefold()
+  except ValueError:
+    return normalize_arg(value)
+
 github_repo_info_tool = {
   "type": "function",
   "function": {
@@ -283,23 +611,26 @@ github_repo_info_tool = {
 
 def get_github_repo_info(repo_identifier: str):
   try:
-    if "github.com" in repo_identifier:
-      parts = repo_identifier.rstrip("/").split("/")
-      owner, repo = parts[-2], parts[-1]
-    else:
-      owner, repo = repo_identifier.split("/")
+    owner, repo = _parse_repo_identifier(repo_identifier.strip())
 
+    # All five requests go out together; the repo response decides success
     repo_url = f"{GITHUB_API_BASE}/repos/{owner}/{repo}"
-    repo_response = requests.get(repo_url, headers=GITHUB_HEADERS)
+    pending = {
+      "repo": _github_pool.submit(github_get, repo_url),
+      "languages": _github_pool.submit(github_get, f"{repo_url}/languages"),
+      "commits": _github_pool.submit(github_get, f"{repo_url}/commits", {"per_page": 1}),
+      "branches": _github_pool.submit(github_get, f"{repo_url}/branches", {"per_page": 1}),
+      "readme": _github_pool.submit(github_get, f"{repo_url}/readme"),
+    }
+
+    repo_response = pending["repo"].result()
     repo_response.raise_for_status()
     repo_data = repo_response.json()
 
-    languages_url = f"{GITHUB_API_BASE}/repos/{owner}/{repo}/languages"
-    languages_response = requests.get(languages_url, headers=GITHUB_HEADERS)
+    languages_response = pending["languages"].result()
     languages = languages_response.json() if languages_response.ok else {}
 
-    commits_url = f"{GITHUB_API_BASE}/repos/{owner}/{repo}/commits"
-    commits_response = requests.get(commits_url, headers=GITHUB_HEADERS, params={"per_page": 1})
+    commits_response = pending["commits"].result()
     latest_commit = None
     if commits_response.ok:
       commits = commits_response.json()
@@ -311,12 +642,9 @@ def get_github_repo_info(repo_identifier: str):
           "date": commits[0]["commit"]["author"]["date"],
         }
 
-    branches_url = f"{GITHUB_API_BASE}/repos/{owner}/{repo}/branches"
-    branches_response = requests.get(branches_url, headers=GITHUB_HEADERS)
-    branches_count = len(branches_response.json()) if branches_response.ok else 0
+    branches_count = _count_from_pagination(pending["branches"].result())
 
-    readme_url = f"{GITHUB_API_BASE}/repos/{owner}/{repo}/readme"
-    readme_response = requests.get(readme_url, headers=GITHUB_HEADERS)
+    readme_response = pending["readme"].result()
     readme_excerpt = None
     if readme_response.ok:
       readme_data = readme_response.json()
@@ -353,9 +681,9 @@ def get_github_repo_info(repo_identifier: str):
     elif e.response.status_code == 403:
       return {"error": "GitHub API rate limit exceeded. Try again later or add a GitHub token."}
     else:
-      return {"error": f"GitHub API error: {e.response.status_code}"}
+      return _flag_retryable({"error": f"GitHub API error: {e.response.status_code}"}, e)
   except Exception as e:
-    return {"error": f"Failed to fetch repository info: {str(e)}"}
+    return _flag_retryable({"error": f"Failed to fetch repository info: {str(e)}"}, e)
 
 
 github_search_tool = {
@@ -414,7 +742,7 @@ def search_github(query: str, search_type: str = "repositories", max_results: in
         "per_page": max_results,
       }
 
-    response = requests.get(search_url, headers=GITHUB_HEADERS, params=params)
+    response = github_get(search_url, params=params)
     response.raise_for_status()
     data = response.json()
 
@@ -456,9 +784,9 @@ def search_github(query: str, search_type: str = "repositories", max_results: in
     if e.response.status_code == 403:
       return {"error": "GitHub API rate limit exceeded. Try again later or add a GitHub token."}
     else:
-      return {"error": f"GitHub API error: {e.response.status_code}"}
+      return _flag_retryable({"error": f"GitHub API error: {e.response.status_code}"}, e)
   except Exception as e:
-    return {"error": f"Failed to search GitHub: {str(e)}"}
+    return _flag_retryable({"error": f"Failed to search GitHub: {str(e)}"}, e)
 
 
 github_trending_tool = {
@@ -512,7 +840,7 @@ def get_trending_repos(language: str = "", since: str = "weekly", max_results: i
       "per_page": max_results,
     }
 
-    response = requests.get(search_url, headers=GITHUB_HEADERS, params=params)
+    response = github_get(search_url, params=params)
     response.raise_for_status()
     data = response.json()
 
@@ -541,9 +869,9 @@ def get_trending_repos(language: str = "", since: str = "weekly", max_results: i
     if e.response.status_code == 403:
       return {"error": "GitHub API rate limit exceeded. Try again later or add a GitHub token."}
     else:
-      return {"error": f"GitHub API error: {e.response.status_code}"}
+      return _flag_retryable({"error": f"GitHub API error: {e.response.status_code}"}, e)
   except Exception as e:
-    return {"error": f"Failed to fetch trending repos: {str(e)}"}
+    return _flag_retryable({"error": f"Failed to fetch trending repos: {str(e)}"}, e)
 
 
 ### User Memory Tools
@@ -634,3 +962,95 @@ def recall_memories(guild_id: str, user_id: str):
     return {"status": "success", "facts": facts}
   except Exception as e:
     return {"status": "error", "message": str(e)}
+
+
+### Discord Members
+DISCORD_API_BASE = "https://discord.com/api/v10"
+DISCORD_TIMEOUT = 10
+_discord_session = requests.Session()
+_discord_session.headers["Authorization"] = f"Bot {DISCORD_TOKEN}"
+
+lookup_member_tool = {
+  "type": "function",
+  "function": {
+    "name": "lookup_member",
+    "description": "Find members of this Discord server by username, nickname or user ID. The members list in your instructions may only include people relevant to the conversation; use this to find anyone else (e.g. to ping them).",
+    "parameters": {
+      "type": "object",
+      "properties": {
+        "guild_id": {
+          "type": "string",
+          "description": "The Discord guild/server ID.",
+        },
+        "query": {
+          "type": "string",
+          "description": "A username or nickname prefix, or a user ID.",
+        },
+      },
+      "required": ["guild_id", "query"],
+    },
+  },
+}
+
+
+def _member_summary(member: dict) -> dict:
+  user = member.get("user") or {}
+  name = user.get("username", "")
+  return {
+    "id": user.get("id"),
+    "name": name,
+    "display_name": member.get("nick") or user.get("global_name") or name,
+    "mention": f"<@{user.get('id')}>",
+  }
+
+
+def lookup_member(guild_id: str, query: str):
+  if not guild_id.isdigit():
+    return {"status": "error", "message": "Member lookup only works in a server"}
+  query = query.strip().lstrip("@")
+  try:
+    if query.isdigit():
+      response = _discord_session.get(
+        f"{DISCORD_API_BASE}/guilds/{guild_id}/members/{query}", timeout=DISCORD_TIMEOUT
+      )
+      if response.status_code == 404:
+        return {"status": "success", "members": [], "message": "No member with that ID"}
+      response.raise_for_status()
+      members = [response.json()]
+    else:
+      response = _discord_session.get(
+        f"{DISCORD_API_BASE}/guilds/{guild_id}/members/search",
+        params={"query": query, "limit": 10},
+        timeout=DISCORD_TIMEOUT,
+      )
+      response.raise_for_status()
+      members = response.json()
+  except Exception as e:
+    return _flag_retryable({"status": "error", "message": str(e)}, e)
+
+  found = [_member_summary(m) for m in members if not (m.get("user") or {}).get("bot")]
+  return {"status": "success", "members": found}
+
+
+### Registry
+# generate_image is registered by LLMService, which implements it
+for spec in (
+  ToolSpec(hackernews_tool, get_top_hn_stories, timeout=15, cache_ttl=300),
+  ToolSpec(exa_search_tool, search_web, timeout=20, cache_ttl=600),
+  ToolSpec(sandbox_tool, run_code, timeout=30, max_concurrency=4),
+  ToolSpec(read_pdf_tool, read_pdf, timeout=45, max_concurrency=4, kind="cpu"),
+  ToolSpec(read_csv_tool, read_csv, timeout=45, max_concurrency=2, kind="cpu"),
+  ToolSpec(
+    github_repo_info_tool,
+    get_github_repo_info,
+    timeout=20,
+    cache_ttl=600,
+    normalize=_normalize_repo_arg,
+  ),
+  ToolSpec(github_search_tool, search_github, timeout=15, cache_ttl=600),
+  ToolSpec(github_trending_tool, get_trending_repos, timeout=15, cache_ttl=1800),
+  ToolSpec(store_memory_tool, store_memory, timeout=10),
+  ToolSpec(recall_memory_tool, recall_memories, timeout=10),
+  ToolSpec(lookup_member_tool, lookup_member, timeout=15, cache_ttl=300),
+):
+  tool_registry.register(spec)
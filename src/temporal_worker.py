@@ -6,12 +6,20 @@ from concurrent.futures import ThreadPoolExecutor
 from temporalio.client import Client
 from temporalio.worker import Worker
 
-from utils.config import TEMPORAL_ADDRESS, TEMPORAL_TASK_QUEUE, TEMPORAL_NAMESPACE
+from utils.config import (
+  TEMPORAL_ADDRESS,
+  TEMPORAL_TASK_QUEUE,
+  TEMPORAL_NAMESPACE,
+  WORKER_MAX_CONCURRENT_ACTIVITIES,
+)
 from utils.logger import logger
 
-from activities import discord_rest, llm, manager, meili, image
+from activities import discord_rest, llm, manager, meili, image, metrics, tools
 from workflows.chat_workflow import BooChatWorkflow
 from workflows.image_workflows import ImageIndexWorkflow, DeleteImageWorkflow
+from workflows.history_workflow import HistoryCompactionWorkflow
+from workflows.metrics_workflow import WorkerStatsWorkflow
+from workflows.session_workflow import GuildSessionWorkflow
 
 
 ACTIVITIES = [
@@ -22,17 +30,32 @@ ACTIVITIES = [
   discord_rest.fetch_sticker_ids,
   discord_rest.download_attachment,
   llm.run_agentic_chat,
+  llm.pack_chat_messages,
+  llm.run_chat_round,
+  llm.summarize_history,
+  tools.execute_tool_call,
   manager.fetch_prompt,
   manager.get_chat_history,
+  manager.get_conversation_context,
   manager.update_chat_history,
   manager.delete_chat_history,
+  manager.get_chat_summary,
+  manager.update_chat_summary,
   manager.get_memories,
   manager.store_token_usage,
   meili.delete_document,
   image.process_and_index,
+  metrics.collect_worker_stats,
 ]
 
-WORKFLOWS = [BooChatWorkflow, ImageIndexWorkflow, DeleteImageWorkflow]
+WORKFLOWS = [
+  BooChatWorkflow,
+  GuildSessionWorkflow,
+  HistoryCompactionWorkflow,
+  ImageIndexWorkflow,
+  DeleteImageWorkflow,
+  WorkerStatsWorkflow,
+]
 
 
 async def main() -> None:
@@ -42,16 +65,20 @@ async def main() -> None:
   )
   client = await Client.connect(TEMPORAL_ADDRESS, namespace=TEMPORAL_NAMESPACE)
 
-  with ThreadPoolExecutor(max_workers=32) as executor:
+  # Most activities are async and never touch the pool; it matches the activity limit so
+  # a sync activity holding a slot is never stuck waiting for a thread (threads start lazily)
+  with ThreadPoolExecutor(max_workers=WORKER_MAX_CONCURRENT_ACTIVITIES) as executor:
     worker = Worker(
       client,
       task_queue=TEMPORAL_TASK_QUEUE,
       workflows=WORKFLOWS,
       activities=ACTIVITIES,
       activity_executor=executor,
+      max_concurrent_activities=WORKER_MAX_CONCURRENT_ACTIVITIES,
     )
     logger.info(
-      f"Worker started: {len(WORKFLOWS)} workflows, {len(ACTIVITIES)} activities"
+      f"Worker started: {len(WORKFLOWS)} workflows, {len(ACTIVITIES)} activities, "
+      f"up to {WORKER_MAX_CONCURRENT_ACTIVITIES} concurrent activities"
     )
     await worker.run()
 
@@ -0,0 +1,125 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from utils.logger import logger
+
+
+class BatchQueue:
+  """
+  Bounded write-behind queue that hands items to an async flush callback in batches.
+
+  A batch is flushed as soon as `max_batch` items are waiting, and otherwise every
+  `max_delay` seconds. Memory is bounded by `max_items`: when full, the oldest queued
+  item is dropped. A failed flush puts its batch back at the front of the queue
+  (as far as capacity allows) and retries with exponential backoff.
+  """
+
+  def __init__(
+    self,
+    flush: Callable[[List[Any]], Awaitable[bool]],
+    *,
+    name: str = "batch",
+    max_batch: int = 50,
+    max_delay: float = 2.0,
+    max_items: int = 5000,
+    max_backoff: float = 30.0,
+  ) -> None:
+    self._flush = flush
+    self.name = name
+    self.max_batch = max_batch
+    self.max_delay = max_delay
+    self.max_items = max_items
+    self.max_backoff = max_backoff
+
+    self._items: Deque[Any] = deque()
+    self._wakeup: Optional[asyncio.Event] = None
+    self._closing: Optional[asyncio.Event] = None
+    self._task: Optional[asyncio.Task] = None
+    self._stats = {
+      "enqueued": 0,
+      "flushed": 0,
+      "dropped": 0,
+      "batches": 0,
+      "failed_flushes": 0,
+    }
+
+  def put(self, item: Any) -> bool:
+    """Queue an item without blocking. Returns False if an older item had to be dropped."""
+    self._ensure_started()
+    accepted = True
+    if len(self._items) >= self.max_items:
+      self._items.popleft()
+      self._stats["dropped"] += 1
+      accepted = False
+    self._items.append(item)
+    self._stats["enqueued"] += 1
+    if len(self._items) >= self.max_batch:
+      self._wakeup.set()
+    return accepted
+
+  def stats(self) -> Dict[str, int]:
+    return {"depth": len(self._items), **self._stats}
+
+  async def stop(self) -> None:
+    """Flush whatever is queued (one attempt per batch) and stop the background task."""
+    if self._task is not None:
+      self._closing.set()
+      self._wakeup.set()
+      await self._task
+      self._task = None
+    while self._items:
+      if not await self._flush_once():
+        break
+
+  def _ensure_started(self) -> None:
+    if self._task is not None and not self._task.done():
+      return
+    self._wakeup = asyncio.Event()
+    self._closing = asyncio.Event()
+    self._task = asyncio.get_running_loop().create_task(self._run())
+
+  async def _run(self) -> None:
+    backoff = self.max_delay
+    while not self._closing.is_set():
+      if len(self._items) < self.max_batch:
+        try:
+          await asyncio.wait_for(self._wakeup.wait(), timeout=self.max_delay)
+        except asyncio.TimeoutError:
+          pass
+      self._wakeup.clear()
+      if self._closing.is_set() or not self._items:
+        continue
+
+      if await self._flush_once():
+        backoff = self.max_delay
+        continue
+
+      try:
+        await asyncio.wait_for(self._closing.wait(), timeout=backoff)
+      except asyncio.TimeoutError:
+        pass
+      backoff = min(backoff * 2, self.max_backoff)
+
+  async def _flush_once(self) -> bool:
+    batch = [self._items.popleft() for _ in range(min(self.max_batch, len(self._items)))]
+    try:
+      ok = await self._flush(batch)
+    except Exception as e:
+      logger.error(f"{self.name} queue flush raised: {e}")
+      ok = False
+
+    if ok:
+      self._stats["flushed"] += len(batch)
+      self._stats["batches"] += 1
+      return True
+
+    self._stats["failed_flushes"] += 1
+    room = self.max_items - len(self._items)
+    keep = batch[-room:] if room > 0 else []
+    self._stats["dropped"] += len(batch) - len(keep)
+    self._items.extendleft(reversed(keep))
+    logger.warning(
+      f"{self.name} queue flush failed; requeued {len(keep)}, dropped {len(batch) - len(keep)}"
+    )
+    return False
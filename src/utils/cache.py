@@ -1,14 +1,250 @@
-from typing import Dict, Optional, Tuple
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
 from threading import RLock
-from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
 from utils.logger import logger
 
+_MISSING = object()
+
+
+class TTLCache:
+  """
+  Thread-safe bounded LRU cache with per-entry TTL on a monotonic clock.
+
+  - `maxsize` bounds the number of entries; the least recently used entry is evicted.
+  - `ttl` is the default lifetime in seconds; `set(..., ttl=...)` overrides it per entry.
+  - `get_or_load` / `get_or_load_async` are single-flight: concurrent misses for the
+    same key share one loader call.
+  - With `stale_ttl > 0`, an expired entry is still served for that many seconds while
+    one background reload refreshes it (stale-while-revalidate).
+  """
+
+  def __init__(
+    self,
+    maxsize: int = 1024,
+    ttl: float = 300.0,
+    *,
+    stale_ttl: float = 0.0,
+    name: str = "cache",
+    clock: Callable[[], float] = time.monotonic,
+  ) -> None:
+    self.maxsize = maxsize
+    self.ttl = ttl
+    self.stale_ttl = stale_ttl
+    self.name = name
+    self.clock = clock
+
+    self._lock = RLock()
+    # key -> (value, expires_at)
+    self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+    self._inflight: Dict[Hashable, Future] = {}
+    self._async_inflight: Dict[Hashable, asyncio.Future] = {}
+    self._counters = {
+      "hits": 0,
+      "stale_hits": 0,
+      "misses": 0,
+      "evictions": 0,
+      "expirations": 0,
+      "loads": 0,
+      "load_errors": 0,
+    }
+
+  def __len__(self) -> int:
+    with self._lock:
+      return len(self._data)
+
+  def __contains__(self, key: Hashable) -> bool:
+    return self._lookup(key, count=False)[0] is not _MISSING
+
+  def get(self, key: Hashable, default: Any = None) -> Any:
+    """Return a fresh value, or `default` if the key is missing or expired."""
+    value, stale = self._lookup(key)
+    if value is _MISSING or stale:
+      return default
+    return value
+
+  def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+    with self._lock:
+      self._data[key] = (value, self.clock() + (self.ttl if ttl is None else ttl))
+      self._data.move_to_end(key)
+      while len(self._data) > self.maxsize:
+        self._data.popitem(last=False)
+        self._counters["evictions"] += 1
+
+  def delete(self, key: Hashable) -> bool:
+    with self._lock:
+      return self._data.pop(key, _MISSING) is not _MISSING
+
+  def reject(self, key: Hashable) -> None:
+    """Drop an entry the caller found unusable; the fresh hit that returned it becomes a miss."""
+    with self._lock:
+      if self._data.pop(key, _MISSING) is not _MISSING:
+        self._counters["hits"] -= 1
+        self._counters["misses"] += 1
+
+  def clear(self) -> None:
+    with self._lock:
+      self._data.clear()
+      for name in self._counters:
+        self._counters[name] = 0
+
+  def purge_expired(self) -> int:
+    """Drop every entry past its TTL (and stale window). Returns how many were removed."""
+    with self._lock:
+      cutoff = self.clock() - self.stale_ttl
+      expired = [k for k, (_, expires_at) in self._data.items() if expires_at <= cutoff]
+      for key in expired:
+        del self._data[key]
+      self._counters["expirations"] += len(expired)
+      return len(expired)
+
+  def stats(self) -> Dict[str, Any]:
+    with self._lock:
+      now = self.clock()
+      active = sum(1 for _, expires_at in self._data.values() if expires_at > now)
+      lookups = self._counters["hits"] + self._counters["stale_hits"] + self._counters["misses"]
+      served = self._counters["hits"] + self._counters["stale_hits"]
+      return {
+        "size": len(self._data),
+        "active": active,
+        "maxsize": self.maxsize,
+        **self._counters,
+        "hit_rate": served / lookups if lookups else 0.0,
+      }
+
+  def get_or_load(
+    self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None
+  ) -> Any:
+    """Return the cached value or call `loader()` once for all concurrent misses on `key`."""
+    value, stale = self._lookup(key)
+    if value is not _MISSING:
+      if stale:
+        self._start_load(key, loader, ttl, background=True)
+      return value
+    return self._start_load(key, loader, ttl).result()
+
+  async def get_or_load_async(
+    self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None
+  ) -> Any:
+    """Async variant of get_or_load for coroutine loaders running on one event loop."""
+    value, stale = self._lookup(key)
+    if value is not _MISSING:
+      if stale and key not in self._async_inflight:
+        asyncio.get_running_loop().create_task(self._refresh_async(key, loader, ttl))
+      return value
+
+    pending = self._async_inflight.get(key)
+    if pending is not None:
+      return await asyncio.shield(pending)
+    return await self._load_async(key, loader, ttl)
+
+  def _lookup(self, key: Hashable, count: bool = True) -> Tuple[Any, bool]:
+    """Return (value, is_stale); value is _MISSING when absent or past the stale window."""
+    with self._lock:
+      entry = self._data.get(key)
+      if entry is None:
+        if count:
+          self._counters["misses"] += 1
+        return _MISSING, False
+
+      value, expires_at = entry
+      now = self.clock()
+      if now < expires_at:
+        self._data.move_to_end(key)
+        if count:
+          self._counters["hits"] += 1
+        return value, False
+
+      if now < expires_at + self.stale_ttl:
+        if count:
+          self._counters["stale_hits"] += 1
+        return value, True
+
+      del self._data[key]
+      self._counters["expirations"] += 1
+      if count:
+        self._counters["misses"] += 1
+      return _MISSING, False
+
+  def _start_load(
+    self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float], background: bool = False
+  ) -> Future:
+    with self._lock:
+      future = self._inflight.get(key)
+      if future is not None:
+        return future
+      future = Future()
+      self._inflight[key] = future
+
+    def run() -> None:
+      try:
+        value = loader()
+        self.set(key, value, ttl)
+        self._count("loads")
+        future.set_result(value)
+      except BaseException as e:
+        self._count("load_errors")
+        if background:
+          logger.warning(f"{self.name}: background refresh of {key!r} failed: {e}")
+        future.set_exception(e)
+      finally:
+        with self._lock:
+          self._inflight.pop(key, None)
+
+    if background:
+      threading.Thread(target=run, name=f"{self.name}-refresh", daemon=True).start()
+    else:
+      run()
+    return future
+
+  async def _load_async(
+    self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float]
+  ) -> Any:
+    future = asyncio.get_running_loop().create_future()
+    self._async_inflight[key] = future
+    try:
+      value = await loader()
+      self.set(key, value, ttl)
+      self._count("loads")
+      future.set_result(value)
+      return value
+    except asyncio.CancelledError:
+      future.cancel()
+      raise
+    except Exception as e:
+      self._count("load_errors")
+      future.set_exception(e)
+      future.exception()  # mark retrieved so unawaited failures don't warn
+      raise
+    finally:
+      self._async_inflight.pop(key, None)
+
+  async def _refresh_async(
+    self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float]
+  ) -> None:
+    try:
+      await self._load_async(key, loader, ttl)
+    except Exception as e:
+      logger.warning(f"{self.name}: background refresh of {key!r} failed: {e}")
+
+  def _count(self, counter: str) -> None:
+    with self._lock:
+      self._counters[counter] += 1
+
 
 class ServerCache:
   """
   Thread-safe singleton for caching server-level data with TTL.
 
   Cache entries expire after a configurable TTL to prevent stale data.
+
+  Lore entries also carry a version stamp. The bot bumps a guild's version whenever
+  its prompt is edited and sends the current version with every chat request, so a
+  worker holding an older version treats it as a miss and refetches. Versions start
+  at the process boot time, so a restarted bot never reuses a pre-restart stamp.
   """
 
   _instance: Optional["ServerCache"] = None
@@ -26,76 +262,72 @@ class ServerCache:
     if self._initialized:
       return
 
-    # Store tuples of (value, expiry_time)
-    self._lore_cache: Dict[str, Tuple[str, datetime]] = {}
-    self._ttl = timedelta(minutes=ttl_minutes)
+    # Stores (lore, version) per server
+    self._lore_cache = TTLCache(maxsize=4096, ttl=ttl_minutes * 60, name="lore")
+    self._lore_versions: Dict[str, int] = {}
+    self._boot_version = time.time_ns() // 1_000_000
     self._initialized = True
     logger.debug(f"ServerCache initialized with TTL: {ttl_minutes} minutes")
 
-  def get_lore(self, server_id: str) -> Optional[str]:
-    """Get cached server lore if not expired."""
-    with self._lock:
-      if server_id not in self._lore_cache:
-        return None
+  def get_lore(self, server_id: str, version: int = 0) -> Optional[str]:
+    """Get cached server lore if not expired and cached at the given version."""
+    entry = self._lore_cache.get(server_id)
+    if entry is None:
+      return None
 
-      lore, expiry = self._lore_cache[server_id]
+    lore, cached_version = entry
+    if cached_version != version:
+      logger.debug(f"Cached lore superseded for server: {server_id}")
+      self._lore_cache.reject(server_id)
+      return None
+    return lore
 
-      # Check if expired
-      if datetime.now() > expiry:
-        logger.debug(f"Cache expired for server: {server_id}")
-        del self._lore_cache[server_id]
-        return None
-
-      return lore
-
-  def set_lore(self, server_id: str, lore: str) -> None:
+  def set_lore(self, server_id: str, lore: str, version: int = 0) -> None:
     """Cache server lore with expiry time."""
-    with self._lock:
-      expiry = datetime.now() + self._ttl
-      self._lore_cache[server_id] = (lore, expiry)
-      logger.debug(f"Cached lore for server: {server_id}, expires at: {expiry}")
+    self._lore_cache.set(server_id, (lore, version))
+    logger.debug(f"Cached lore for server: {server_id}")
 
   def invalidate_lore(self, server_id: str) -> None:
     """Remove server lore from cache."""
+    if self._lore_cache.delete(server_id):
+      logger.debug(f"Invalidated lore cache for server: {server_id}")
+
+  def lore_version(self, server_id: str) -> int:
+    """Current lore version stamp for a server."""
     with self._lock:
-      if server_id in self._lore_cache:
-        del self._lore_cache[server_id]
-        logger.debug(f"Invalidated lore cache for server: {server_id}")
+      return self._lore_versions.get(server_id, self._boot_version)
+
+  def bump_lore_version(self, server_id: str) -> int:
+    """Mark a server's lore as changed: drop the local entry and return the new version."""
+    with self._lock:
+      version = max(time.time_ns() // 1_000_000, self.lore_version(server_id) + 1)
+      self._lore_versions[server_id] = version
+      self.invalidate_lore(server_id)
+      return version
 
   def clear_all(self) -> None:
     """Clear all cached data."""
-    with self._lock:
-      self._lore_cache.clear()
-      logger.info("Cleared all server cache")
+    self._lore_cache.clear()
+    logger.info("Cleared all server cache")
 
   def cleanup_expired(self) -> int:
     """Remove all expired entries. Returns number of entries removed."""
-    with self._lock:
-      now = datetime.now()
-      expired_keys = [
-        server_id for server_id, (_, expiry) in self._lore_cache.items() if now > expiry
-      ]
-
-      for key in expired_keys:
-        del self._lore_cache[key]
-
-      if expired_keys:
-        logger.debug(f"Cleaned up {len(expired_keys)} expired cache entries")
-
-      return len(expired_keys)
+    removed = self._lore_cache.purge_expired()
+    if removed:
+      logger.debug(f"Cleaned up {removed} expired cache entries")
+    return removed
 
   def get_cache_stats(self) -> Dict[str, int]:
     """Get statistics about cache usage."""
-    with self._lock:
-      now = datetime.now()
-      active_entries = sum(
-        1 for _, expiry in self._lore_cache.values() if now <= expiry
-      )
-      return {
-        "total_entries": len(self._lore_cache),
-        "active_entries": active_entries,
-        "expired_entries": len(self._lore_cache) - active_entries,
-      }
+    stats = self._lore_cache.stats()
+    return {
+      "total_entries": stats["size"],
+      "active_entries": stats["active"],
+      "expired_entries": stats["size"] - stats["active"],
+      "hits": stats["hits"],
+      "misses": stats["misses"],
+      "evictions": stats["evictions"],
+    }
 
 
 # Export singleton instance with 5 minute TTL
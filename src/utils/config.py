@@ -20,6 +20,8 @@ TENOR_API_KEY: str = os.getenv("TENOR_API_KEY", "")
 TOMORROW_IO_API_KEY: Optional[str] = os.getenv("TOMORROW_IO_API_KEY")
 OPENROUTER_API_KEY: str = os.getenv("OPENROUTER_API_KEY", "")
 OPENROUTER_MODEL: str = os.getenv("OPENROUTER_MODEL", "")
+# Cheaper model used under sustained load; defaults to OPENROUTER_MODEL
+OPENROUTER_FALLBACK_MODEL: str = os.getenv("OPENROUTER_FALLBACK_MODEL", "")
 MEILI_MASTER_KEY: str = os.getenv("MEILI_MASTER_KEY", "")
 EXA_API_KEY: str = os.getenv("EXA_API_KEY", "")
 VOYAGEAI_API_KEY: str = os.getenv("VOYAGEAI_API_KEY", "")
@@ -29,6 +31,9 @@ MANAGER_API_TOKEN: str = os.getenv("MANAGER_API_TOKEN", "")
 TEMPORAL_ADDRESS: str = os.getenv("TEMPORAL_ADDRESS", "temporal:7233")
 TEMPORAL_TASK_QUEUE: str = os.getenv("TEMPORAL_TASK_QUEUE", "boo-tasks")
 TEMPORAL_NAMESPACE: str = os.getenv("TEMPORAL_NAMESPACE", "default")
+STREAM_REPLIES: bool = os.getenv("STREAM_REPLIES", "true").lower() in ("1", "true", "yes")
+# Route chat turns through one long-lived session workflow per guild
+GUILD_SESSIONS: bool = os.getenv("GUILD_SESSIONS", "true").lower() in ("1", "true", "yes")
 
 
 def _parse_admin_list() -> List[int]:
@@ -64,6 +69,90 @@ def _parse_context_limit() -> int:
     return 30
 
 
+def _parse_context_token_budget() -> int:
+  """Parse CONTEXT_TOKEN_BUDGET (prompt tokens for lore, memories, members and history)."""
+  budget_str = os.getenv("CONTEXT_TOKEN_BUDGET", "12000")
+  try:
+    budget = int(budget_str)
+  except ValueError:
+    logger.warning(
+      f"CONTEXT_TOKEN_BUDGET must be an integer. Got: {budget_str}. Using default: 12000"
+    )
+    return 12000
+  if budget < 1000:
+    logger.warning(f"CONTEXT_TOKEN_BUDGET must be at least 1000. Got: {budget}. Using: 1000")
+    return 1000
+  return budget
+
+
+def _parse_stream_edit_interval() -> float:
+  """Parse STREAM_EDIT_INTERVAL (seconds between edits of a streamed reply)."""
+  interval_str = os.getenv("STREAM_EDIT_INTERVAL", "1.5")
+  try:
+    interval = float(interval_str)
+  except ValueError:
+    logger.warning(
+      f"STREAM_EDIT_INTERVAL must be a number. Got: {interval_str}. Using default: 1.5"
+    )
+    return 1.5
+  # Discord allows roughly five edits per five seconds per channel
+  if interval < 1.0:
+    logger.warning(f"STREAM_EDIT_INTERVAL below 1s risks rate limits. Got: {interval}. Using 1.0")
+    return 1.0
+  return interval
+
+
+def _parse_debounce_window() -> float:
+  """Parse DEBOUNCE_WINDOW (seconds to wait for follow-up messages before replying; 0 = off)."""
+  window_str = os.getenv("DEBOUNCE_WINDOW", "0")
+  try:
+    window = float(window_str)
+  except ValueError:
+    logger.warning(f"DEBOUNCE_WINDOW must be a number. Got: {window_str}. Using default: 0")
+    return 0.0
+  if window < 0:
+    logger.warning(f"DEBOUNCE_WINDOW must not be negative. Got: {window}. Using: 0")
+    return 0.0
+  return window
+
+
+def _parse_members_top_k() -> int:
+  """Parse MEMBERS_TOP_K (members listed in the prompt per turn; 0 = everyone)."""
+  top_k_str = os.getenv("MEMBERS_TOP_K", "25")
+  try:
+    top_k = int(top_k_str)
+  except ValueError:
+    logger.warning(f"MEMBERS_TOP_K must be an integer. Got: {top_k_str}. Using default: 25")
+    return 25
+  if top_k < 0:
+    logger.warning(f"MEMBERS_TOP_K must not be negative. Got: {top_k}. Using: 0")
+    return 0
+  return top_k
+
+
+def _parse_int(name: str, default: int, minimum: int) -> int:
+  """Parse an integer setting, falling back to `default` and clamping to `minimum`."""
+  value_str = os.getenv(name, str(default))
+  try:
+    value = int(value_str)
+  except ValueError:
+    logger.warning(f"{name} must be an integer. Got: {value_str}. Using default: {default}")
+    return default
+  if value < minimum:
+    logger.warning(f"{name} must be at least {minimum}. Got: {value}. Using: {minimum}")
+    return minimum
+  return value
+
+
+def _parse_tool_execution_mode() -> str:
+  """Parse TOOL_EXECUTION_MODE: "inline" (default) or "activity"."""
+  mode = os.getenv("TOOL_EXECUTION_MODE", "inline").strip().lower()
+  if mode not in ("inline", "activity"):
+    logger.warning(f"TOOL_EXECUTION_MODE must be inline or activity. Got: {mode}. Using: inline")
+    return "inline"
+  return mode
+
+
 def _validate_required_env_vars() -> None:
   """Validate that all required environment variables are set."""
   required_vars = {
@@ -105,6 +194,18 @@ def get_time_based_greeting() -> str:
 # Initialize parsed values
 ADMIN_LIST: List[int] = _parse_admin_list()
 CONTEXT_LIMIT: int = _parse_context_limit()
+CONTEXT_TOKEN_BUDGET: int = _parse_context_token_budget()
+STREAM_EDIT_INTERVAL: float = _parse_stream_edit_interval()
+TOOL_EXECUTION_MODE: str = _parse_tool_execution_mode()
+DEBOUNCE_WINDOW: float = _parse_debounce_window()
+MEMBERS_TOP_K: int = _parse_members_top_k()
+DISPATCH_WORKERS: int = _parse_int("DISPATCH_WORKERS", 8, 1)
+DISPATCH_QUEUE_SIZE: int = _parse_int("DISPATCH_QUEUE_SIZE", 100, 1)
+# Messages per minute that may reach the bot, 0 = unlimited
+USER_RATE_LIMIT: int = _parse_int("USER_RATE_LIMIT", 6, 0)
+GUILD_RATE_LIMIT: int = _parse_int("GUILD_RATE_LIMIT", 60, 0)
+# Activities one Temporal worker runs at once (async ones on its event loop, sync ones on threads)
+WORKER_MAX_CONCURRENT_ACTIVITIES: int = _parse_int("WORKER_MAX_CONCURRENT_ACTIVITIES", 200, 1)
 
 # Validate all required environment variables
 _validate_required_env_vars()
@@ -0,0 +1,113 @@
+import io
+import math
+from typing import Any, Dict, Optional
+
+
+class CappedReader(io.RawIOBase):
+  """Binary stream over `raw` that reports EOF after `limit` bytes and sets `capped`."""
+
+  def __init__(self, raw, limit: int) -> None:
+    self.raw = raw
+    self.limit = limit
+    self.bytes_read = 0
+    self.capped = False
+
+  def readable(self) -> bool:
+    return True
+
+  def readinto(self, buffer) -> int:
+    remaining = self.limit - self.bytes_read
+    if remaining <= 0:
+      # Only a cap if there was more to read
+      self.capped = self.capped or bool(self.raw.read(1))
+      return 0
+    view = memoryview(buffer)[:remaining]
+    data = self.raw.read(len(view))
+    view[: len(data)] = data
+    self.bytes_read += len(data)
+    return len(data)
+
+
+class ColumnProfiler:
+  """
+  Column types, null counts and numeric summaries, merged chunk by chunk so a
+  large CSV can be profiled without holding it in memory.
+  """
+
+  def __init__(self) -> None:
+    self.rows = 0
+    self._columns: Dict[str, Dict[str, Any]] = {}
+
+  def update(self, chunk) -> None:
+    """Fold one pandas DataFrame chunk into the running stats."""
+    self.rows += len(chunk)
+    for name in chunk.columns:
+      series = chunk[name]
+      col = self._columns.setdefault(
+        str(name),
+        {
+          "dtype": None,
+          "non_null": 0,
+          "nulls": 0,
+          "numeric": True,
+          "n": 0,
+          "mean": 0.0,
+          "m2": 0.0,
+          "min": None,
+          "max": None,
+        },
+      )
+      nulls = int(series.isna().sum())
+      col["nulls"] += nulls
+      col["non_null"] += len(series) - nulls
+      if nulls == len(series):
+        # An all-empty chunk reads as float and says nothing about the type
+        continue
+
+      col["dtype"] = _merge_dtype(col["dtype"], str(series.dtype))
+      if series.dtype.kind in "iuf":
+        self._merge_numeric(col, series.dropna())
+      else:
+        col["numeric"] = False
+
+  def summary(self) -> Dict[str, Dict[str, Any]]:
+    result = {}
+    for name, col in self._columns.items():
+      entry: Dict[str, Any] = {
+        "dtype": col["dtype"] or "empty",
+        "non_null": col["non_null"],
+        "nulls": col["nulls"],
+      }
+      if col["numeric"] and col["n"]:
+        entry.update(
+          min=col["min"],
+          max=col["max"],
+          mean=col["mean"],
+          std=math.sqrt(col["m2"] / (col["n"] - 1)) if col["n"] > 1 else 0.0,
+        )
+      result[name] = entry
+    return result
+
+  def _merge_numeric(self, col: Dict[str, Any], values) -> None:
+    # Chan et al. parallel mean/variance merge
+    n_b = len(values)
+    mean_b = float(values.mean())
+    m2_b = float(((values - mean_b) ** 2).sum())
+    n_a = col["n"]
+    n = n_a + n_b
+    delta = mean_b - col["mean"]
+    col["mean"] += delta * n_b / n
+    col["m2"] += m2_b + delta * delta * n_a * n_b / n
+    col["n"] = n
+
+    low, high = float(values.min()), float(values.max())
+    col["min"] = low if col["min"] is None else min(col["min"], low)
+    col["max"] = high if col["max"] is None else max(col["max"], high)
+
+
+def _merge_dtype(current: Optional[str], name: str) -> str:
+  if current is None or current == name:
+    return name
+  if {current, name} <= {"int64", "float64"}:
+    return "float64"
+  return "object"
@@ -0,0 +1,81 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from utils.logger import logger
+
+
+@dataclass
+class _Group:
+  items: List[Any]
+  first_at: float
+  task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+
+class Debouncer:
+  """
+  Collects items per key and hands each group to an async flush callback once no
+  new item has arrived for `window` seconds, or `max_wait` seconds after the group's
+  first item, whichever comes first (so a steady stream can't hold a group forever).
+  """
+
+  def __init__(
+    self,
+    flush: Callable[[Hashable, List[Any]], Awaitable[None]],
+    *,
+    window: float,
+    max_wait: Optional[float] = None,
+    name: str = "debounce",
+  ) -> None:
+    self._flush = flush
+    self.window = window
+    self.max_wait = max_wait if max_wait is not None else window * 3
+    self.name = name
+    self._groups: Dict[Hashable, _Group] = {}
+    self._stats = {"items": 0, "flushes": 0, "merged": 0}
+
+  def put(self, key: Hashable, item: Any) -> None:
+    loop = asyncio.get_running_loop()
+    group = self._groups.get(key)
+    if group is None:
+      group = _Group(items=[], first_at=loop.time())
+      self._groups[key] = group
+    elif group.task is not None:
+      group.task.cancel()
+
+    group.items.append(item)
+    self._stats["items"] += 1
+    delay = min(self.window, group.first_at + self.max_wait - loop.time())
+    group.task = loop.create_task(self._fire_after(key, group, max(delay, 0.0)))
+
+  async def flush_key(self, key: Hashable) -> None:
+    """Flush `key`'s pending group now, e.g. before an item that must not be merged."""
+    group = self._groups.pop(key, None)
+    if group is None:
+      return
+    if group.task is not None:
+      group.task.cancel()
+    await self._run_flush(key, group)
+
+  async def stop(self) -> None:
+    for key in list(self._groups):
+      await self.flush_key(key)
+
+  def stats(self) -> Dict[str, int]:
+    return {"pending": sum(len(g.items) for g in self._groups.values()), **self._stats}
+
+  async def _fire_after(self, key: Hashable, group: _Group, delay: float) -> None:
+    await asyncio.sleep(delay)
+    # Detach before flushing: a put() during the flush starts a new group rather
+    # than cancelling this one mid-flush
+    if self._groups.get(key) is group:
+      del self._groups[key]
+      await self._run_flush(key, group)
+
+  async def _run_flush(self, key: Hashable, group: _Group) -> None:
+    self._stats["flushes"] += 1
+    self._stats["merged"] += len(group.items) - 1
+    try:
+      await self._flush(key, group.items)
+    except Exception as e:
+      logger.error(f"{self.name} flush for {key!r} raised: {e}", exc_info=True)
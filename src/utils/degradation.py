@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Tuple
+
+from utils.logger import logger
+
+# Each level keeps the degradations of the levels below it
+NORMAL, REDUCED_TOOLS, FALLBACK_MODEL, SHORT_CONTEXT = range(4)
+LEVEL_NAMES = ("normal", "reduced tools", "fallback model", "short context")
+
+
+class DegradationPolicy:
+  """
+  Load-aware degradation ladder: normal -> fewer tools -> fallback model -> shorter
+  context, one step at a time.
+
+  Pressure is the worse of the share of recent completions that were rate limited
+  (429) and the latest dispatch backlog reported by the bot (0..1). The level steps
+  up when pressure reaches `raise_at`, and down once it is below `lower_at`; the gap
+  and the minimum time between steps (`step_up_after`, `step_down_after`) stop it
+  flapping around a threshold. Every switch is logged.
+  """
+
+  def __init__(
+    self,
+    *,
+    raise_at: float = 0.5,
+    lower_at: float = 0.2,
+    window: float = 60.0,
+    min_samples: int = 4,
+    step_up_after: float = 15.0,
+    step_down_after: float = 60.0,
+    clock: Callable[[], float] = time.monotonic,
+  ) -> None:
+    self.raise_at = raise_at
+    self.lower_at = lower_at
+    self.window = window
+    self.min_samples = min_samples
+    self.step_up_after = step_up_after
+    self.step_down_after = step_down_after
+    self.clock = clock
+
+    self._lock = threading.Lock()
+    # (time, rate_limited) per completion
+    self._outcomes: Deque[Tuple[float, bool]] = deque()
+    self._backlog = (0.0, float("-inf"))
+    self._level = NORMAL
+    self._changed_at = float("-inf")
+    self._transitions = 0
+
+  def record(self, rate_limited: bool) -> None:
+    with self._lock:
+      self._outcomes.append((self.clock(), rate_limited))
+
+  def observe_backlog(self, load: float) -> None:
+    with self._lock:
+      self._backlog = (min(max(load, 0.0), 1.0), self.clock())
+
+  @property
+  def level(self) -> int:
+    with self._lock:
+      self._update()
+      return self._level
+
+  def stats(self) -> Dict[str, object]:
+    with self._lock:
+      self._update()
+      return {
+        "level": LEVEL_NAMES[self._level],
+        "pressure": round(self._pressure(), 2),
+        "transitions": self._transitions,
+      }
+
+  def _pressure(self) -> float:
+    now = self.clock()
+    while self._outcomes and self._outcomes[0][0] < now - self.window:
+      self._outcomes.popleft()
+    limited = 0.0
+    if len(self._outcomes) >= self.min_samples:
+      limited = sum(1 for _, hit in self._outcomes if hit) / len(self._outcomes)
+    load, observed_at = self._backlog
+    backlog = load if observed_at >= now - self.window else 0.0
+    return max(limited, backlog)
+
+  def _update(self) -> None:
+    pressure = self._pressure()
+    held = self.clock() - self._changed_at
+    if pressure >= self.raise_at and self._level < SHORT_CONTEXT and held >= self.step_up_after:
+      self._switch(self._level + 1, pressure)
+    elif pressure < self.lower_at and self._level > NORMAL and held >= self.step_down_after:
+      self._switch(self._level - 1, pressure)
+
+  def _switch(self, level: int, pressure: float) -> None:
+    logger.warning(
+      f"LLM degradation {LEVEL_NAMES[self._level]} -> {LEVEL_NAMES[level]} "
+      f"(pressure {pressure:.2f})"
+    )
+    self._level = level
+    self._changed_at = self.clock()
+    self._transitions += 1
+
+
+# Shared by LLMService and the chat activities in a worker process
+degradation_policy = DegradationPolicy()
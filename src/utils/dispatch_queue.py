@@ -0,0 +1,76 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List
+
+from utils.logger import logger
+
+
+class DispatchQueue:
+  """
+  Bounded queue drained by a fixed number of worker tasks, so at most `workers`
+  items are handled at once and at most `maxsize` wait. `offer` never blocks: when
+  the queue is full it refuses the item and the caller sheds it.
+  """
+
+  def __init__(
+    self,
+    handler: Callable[[Any], Awaitable[None]],
+    *,
+    workers: int,
+    maxsize: int,
+    name: str = "dispatch",
+  ) -> None:
+    self._handler = handler
+    self.workers = workers
+    self.maxsize = maxsize
+    self.name = name
+    self._queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=maxsize)
+    self._tasks: List[asyncio.Task] = []
+    self._busy = 0
+    self._stats = {"accepted": 0, "processed": 0, "failed": 0, "shed": 0}
+
+  def offer(self, item: Any) -> bool:
+    """Queue an item without blocking. Returns False (and counts it shed) when full."""
+    self._ensure_started()
+    try:
+      self._queue.put_nowait(item)
+    except asyncio.QueueFull:
+      self._stats["shed"] += 1
+      return False
+    self._stats["accepted"] += 1
+    return True
+
+  def backlog(self) -> float:
+    """How full the queue is, 0..1."""
+    return self._queue.qsize() / self.maxsize
+
+  def stats(self) -> Dict[str, int]:
+    return {"depth": self._queue.qsize(), "busy": self._busy, **self._stats}
+
+  async def stop(self) -> None:
+    """Cancel the workers; anything still queued is dropped."""
+    for task in self._tasks:
+      task.cancel()
+    await asyncio.gather(*self._tasks, return_exceptions=True)
+    self._tasks = []
+
+  def _ensure_started(self) -> None:
+    if self._tasks:
+      return
+    loop = asyncio.get_running_loop()
+    self._tasks = [
+      loop.create_task(self._work(), name=f"{self.name}-{i}") for i in range(self.workers)
+    ]
+
+  async def _work(self) -> None:
+    while True:
+      item = await self._queue.get()
+      self._busy += 1
+      try:
+        await self._handler(item)
+        self._stats["processed"] += 1
+      except Exception as e:
+        self._stats["failed"] += 1
+        logger.error(f"{self.name} handler raised: {e}", exc_info=True)
+      finally:
+        self._busy -= 1
+        self._queue.task_done()
@@ -0,0 +1,99 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.cache import TTLCache
+from utils.emoji_utils import get_emoji_cdn_url
+from utils.logger import logger
+
+PROBE_TIMEOUT = 5
+# Emoji images are immutable once uploaded; a deleted one rarely comes back
+FOUND_TTL = 24 * 60 * 60
+MISSING_TTL = 60 * 60
+
+
+class EmojiIndex:
+  """
+  Emoji ID -> image URL for every guild the bot is in, replaced per guild from
+  guild and emoji-update events so a lookup is one dict access.
+
+  Emojis from other servers are resolved straight to their CDN URL, checked once
+  with a HEAD request; both outcomes are cached so repeats cost nothing.
+  """
+
+  def __init__(self, maxsize: int = 2048) -> None:
+    self._urls: Dict[int, str] = {}
+    self._guilds: Dict[int, Set[int]] = {}
+    self._found = TTLCache(maxsize=maxsize, ttl=FOUND_TTL, name="emoji-found")
+    self._missing = TTLCache(maxsize=maxsize, ttl=MISSING_TTL, name="emoji-missing")
+    self._session: Any = None
+
+  def __contains__(self, guild_id: int) -> bool:
+    return guild_id in self._guilds
+
+  def load_guild(self, guild_id: int, emojis: Iterable[Tuple[int, str]]) -> None:
+    """Replace a guild's emojis with `(emoji_id, url)` pairs."""
+    self.drop_guild(guild_id)
+    ids = set()
+    for emoji_id, url in emojis:
+      self._urls[emoji_id] = url
+      ids.add(emoji_id)
+    self._guilds[guild_id] = ids
+
+  def drop_guild(self, guild_id: int) -> None:
+    for emoji_id in self._guilds.pop(guild_id, ()):
+      self._urls.pop(emoji_id, None)
+
+  def get(self, emoji_id: int) -> Optional[str]:
+    return self._urls.get(emoji_id)
+
+  async def resolve(self, refs: Iterable[Tuple[str, bool]]) -> List[str]:
+    """URLs for `(emoji_id, animated)` refs, skipping any that don't exist."""
+    urls = []
+    for raw_id, animated in refs:
+      try:
+        emoji_id = int(raw_id)
+      except ValueError:
+        continue
+      url = self._urls.get(emoji_id) or await self._resolve_foreign(emoji_id, animated)
+      if url:
+        urls.append(url)
+    return urls
+
+  async def _resolve_foreign(self, emoji_id: int, animated: bool) -> Optional[str]:
+    key = (emoji_id, animated)
+    if key in self._missing:
+      return None
+    url = get_emoji_cdn_url(str(emoji_id), animated)
+    try:
+      return await self._found.get_or_load_async(key, lambda: self._probe(url))
+    except LookupError:
+      self._missing.set(key, True)
+    except Exception as e:
+      logger.warning(f"Could not check emoji {emoji_id}: {e}")
+    return None
+
+  async def _probe(self, url: str) -> str:
+    import aiohttp
+
+    if self._session is None or self._session.closed:
+      self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=PROBE_TIMEOUT))
+    async with self._session.head(url) as response:
+      if response.status == 404:
+        raise LookupError(url)
+      response.raise_for_status()
+    return url
+
+  async def close(self) -> None:
+    if self._session is not None:
+      await self._session.close()
+      self._session = None
+
+  def stats(self) -> Dict[str, int]:
+    return {
+      "guilds": len(self._guilds),
+      "emojis": len(self._urls),
+      "foreign_found": len(self._found),
+      "foreign_missing": len(self._missing),
+    }
+
+
+emoji_index = EmojiIndex()
@@ -8,6 +8,12 @@ def extract_custom_emojis(text: str) -> List[str]:
     return re.findall(pattern, text)
 
 
+def extract_custom_emoji_refs(text: str) -> List[Tuple[str, bool]]:
+    """Extract (emoji ID, animated) pairs from '<:name:id>' and '<a:name:id>'"""
+    pattern = r"<(a?):[a-zA-Z0-9_]+:([0-9]+)>"
+    return [(emoji_id, bool(animated)) for animated, emoji_id in re.findall(pattern, text)]
+
+
 def get_emoji_cdn_url(emoji_id: str, animated: bool = False) -> str:
     """Get CDN URL for a Discord emoji"""
     ext = "gif" if animated else "png"
@@ -5,13 +5,42 @@ import discord
 import logging
 from typing import List
 from discord.ext import commands
-from services.db_service import DBService
+from services.db_service import AsyncDBService
+from utils.batch_queue import BatchQueue
 from discord import Message, Member, File
 
 CHANNEL_NAME = "chat"
 
 logger = logging.getLogger(__name__)
-db_service = DBService()
+db_service = AsyncDBService()
+
+
+# Batches the manager refused outright; dropped rather than retried forever
+ingest_rejected = {"batches": 0, "messages": 0}
+
+
+async def _flush_messages(batch: list) -> bool:
+  result = await db_service.store_messages(batch)
+  if result is None:
+    return False
+  if result.get("rejected"):
+    ingest_rejected["batches"] += 1
+    ingest_rejected["messages"] += len(batch)
+    logger.error(
+      f"Manager rejected {len(batch)} archived messages "
+      f"({batch[0].get('message_id')}..{batch[-1].get('message_id')}); dropping them"
+    )
+  return True
+
+
+### Archived messages are written behind in batches instead of one POST per message
+message_ingest = BatchQueue(
+  _flush_messages,
+  name="message-ingest",
+  max_batch=100,
+  max_delay=5.0,
+  max_items=10000,
+)
 
 
 def should_ignore(message: Message, bot: commands.Bot) -> str | bool:
@@ -94,7 +123,7 @@ def store_persistent_messages(message: Message):
     "message_content": message.content,
     "timestamp": message.created_at.isoformat(),
   }
-  db_service.store_message(message_data)
+  message_ingest.put(message_data)
 
 
 def log_message(message: Message) -> None:
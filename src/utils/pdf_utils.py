@@ -0,0 +1,10 @@
+import io
+from typing import List
+
+from PyPDF2 import PdfReader
+
+
+def extract_pdf_pages(data: bytes) -> List[str]:
+  """Text of every page of a PDF. Module-level (and light on imports) so it can run in a process pool."""
+  reader = PdfReader(io.BytesIO(data))
+  return [page.extract_text() or "" for page in reader.pages]
@@ -0,0 +1,69 @@
+import threading
+import time
+from typing import Callable, Dict, Hashable
+
+from utils.cache import TTLCache
+
+
+class TokenBucket:
+  """
+  Allows bursts of up to `burst` events, refilling at `rate` tokens per second.
+  """
+
+  def __init__(
+    self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic
+  ) -> None:
+    self.rate = rate
+    self.burst = burst
+    self.clock = clock
+    self._tokens = burst
+    self._updated = clock()
+    self._lock = threading.Lock()
+
+  def try_acquire(self, tokens: float = 1.0) -> bool:
+    with self._lock:
+      now = self.clock()
+      self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+      self._updated = now
+      if self._tokens < tokens:
+        return False
+      self._tokens -= tokens
+      return True
+
+
+class RateLimiter:
+  """
+  One TokenBucket per key (user, guild, ...), allowing `per_minute` events with
+  bursts of the same size. A bucket idle long enough to refill completely is
+  equivalent to a new one, so buckets expire after that and memory stays bounded.
+  """
+
+  def __init__(
+    self,
+    per_minute: int,
+    *,
+    maxsize: int = 10000,
+    name: str = "rate-limit",
+    clock: Callable[[], float] = time.monotonic,
+  ) -> None:
+    self.per_minute = per_minute
+    self.clock = clock
+    self._buckets = TTLCache(maxsize=maxsize, ttl=60.0, name=name, clock=clock)
+    self._limited = 0
+
+  def allow(self, key: Hashable) -> bool:
+    """Take a token for `key`; always True when the limit is 0 (disabled)."""
+    if self.per_minute <= 0:
+      return True
+    bucket = self._buckets.get(key)
+    if bucket is None:
+      bucket = TokenBucket(self.per_minute / 60.0, self.per_minute, clock=self.clock)
+    # Re-set on every use so the TTL counts from the last event, not the first
+    self._buckets.set(key, bucket)
+    if bucket.try_acquire():
+      return True
+    self._limited += 1
+    return False
+
+  def stats(self) -> Dict[str, int]:
+    return {"keys": len(self._buckets), "limited": self._limited}
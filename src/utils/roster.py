@@ -0,0 +1,162 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MEMBERS_HEADER = "## Server Members"
+# Recent speakers remembered per channel, and bot conversation partners per guild
+RECENT_PER_CHANNEL = 50
+
+
+@dataclass
+class RosterMember:
+  id: str
+  name: str
+  display_name: str
+
+  def render(self) -> str:
+    return f"- {self.name} (Display: {self.display_name}) - ID: {self.id}"
+
+
+@dataclass
+class _GuildRoster:
+  members: Dict[str, RosterMember] = field(default_factory=dict)
+  version: int = 0
+  # (version, text) of the last render
+  rendered: Optional[Tuple[int, str]] = None
+
+
+class RosterCache:
+  """
+  Per-guild member rosters, loaded once and then kept current from member events,
+  so a chat turn reuses a pre-rendered members list instead of rebuilding it.
+
+  Every change bumps the guild's version; `render` only rebuilds the text when the
+  version has moved since the last render. The version stays internal: the text
+  itself travels in the ChatRequest, so the worker has nothing to cache by it.
+  """
+
+  def __init__(self) -> None:
+    self._guilds: Dict[str, _GuildRoster] = {}
+    self._lock = threading.Lock()
+    # Most recent last; kept even before a guild's roster is loaded
+    self._channel_activity: Dict[Tuple[str, str], "OrderedDict[str, None]"] = {}
+    self._conversation: Dict[str, "OrderedDict[str, None]"] = {}
+
+  def __contains__(self, guild_id: str) -> bool:
+    return guild_id in self._guilds
+
+  def load(self, guild_id: str, members: Iterable[RosterMember]) -> None:
+    """Replace a guild's roster wholesale (after a full member chunk)."""
+    with self._lock:
+      previous = self._guilds.get(guild_id)
+      self._guilds[guild_id] = _GuildRoster(
+        members={m.id: m for m in members},
+        version=(previous.version + 1) if previous else 1,
+      )
+
+  def upsert(self, guild_id: str, member: RosterMember) -> None:
+    with self._lock:
+      roster = self._guilds.get(guild_id)
+      if roster is None or roster.members.get(member.id) == member:
+        return
+      roster.members[member.id] = member
+      roster.version += 1
+
+  def remove(self, guild_id: str, member_id: str) -> None:
+    with self._lock:
+      roster = self._guilds.get(guild_id)
+      if roster is not None and roster.members.pop(member_id, None) is not None:
+        roster.version += 1
+
+  def drop(self, guild_id: str) -> None:
+    with self._lock:
+      self._guilds.pop(guild_id, None)
+      self._conversation.pop(guild_id, None)
+      for key in [k for k in self._channel_activity if k[0] == guild_id]:
+        del self._channel_activity[key]
+
+  def note_activity(self, guild_id: str, channel_id: str, member_id: str) -> None:
+    """Record that a member just spoke in a channel."""
+    with self._lock:
+      _touch(self._channel_activity.setdefault((guild_id, channel_id), OrderedDict()), member_id)
+
+  def note_conversation(self, guild_id: str, member_id: str) -> None:
+    """Record that a member just talked to the bot (so appears in its chat history)."""
+    with self._lock:
+      _touch(self._conversation.setdefault(guild_id, OrderedDict()), member_id)
+
+  def select(
+    self, guild_id: str, channel_id: str, priority_ids: List[str], limit: int
+  ) -> str:
+    """
+    Members list text limited to `limit` members relevant to a turn:
+    `priority_ids` (author, mentioned, replied to) first, then people who recently
+    talked to the bot, then people recently active in the channel. Guilds with at
+    most `limit` members get the full (cached) list.
+    """
+    with self._lock:
+      roster = self._guilds.get(guild_id)
+      if roster is None:
+        return ""
+      if len(roster.members) > limit:
+        candidates = [
+          *priority_ids,
+          *reversed(self._conversation.get(guild_id, {})),
+          *reversed(self._channel_activity.get((guild_id, channel_id), {})),
+        ]
+        chosen: Dict[str, RosterMember] = {}
+        for member_id in candidates:
+          member = roster.members.get(member_id)
+          if member is not None:
+            chosen.setdefault(member_id, member)
+            if len(chosen) >= limit:
+              break
+        return _render(chosen.values(), total=len(roster.members))
+    return self.render(guild_id)
+
+  def render(self, guild_id: str) -> str:
+    """Full members list text for a loaded guild; "" if not loaded."""
+    with self._lock:
+      roster = self._guilds.get(guild_id)
+      if roster is None:
+        return ""
+      if roster.rendered is None or roster.rendered[0] != roster.version:
+        roster.rendered = (roster.version, _render(roster.members.values()))
+      return roster.rendered[1]
+
+  def stats(self) -> Dict[str, int]:
+    with self._lock:
+      return {
+        "guilds": len(self._guilds),
+        "members": sum(len(r.members) for r in self._guilds.values()),
+      }
+
+
+def _touch(recent: "OrderedDict[str, None]", member_id: str) -> None:
+  recent[member_id] = None
+  recent.move_to_end(member_id)
+  while len(recent) > RECENT_PER_CHANNEL:
+    recent.popitem(last=False)
+
+
+def _render(members: Iterable[RosterMember], total: Optional[int] = None) -> str:
+  """Full list, or with `total` a subset that points the model at lookup_member."""
+  lines = [m.render() for m in sorted(members, key=lambda m: (m.name.casefold(), m.id))]
+  if total is not None:
+    return (
+      f"{MEMBERS_HEADER}\n"
+      f"To ping a member, use <@user_id> format. Members relevant to this conversation "
+      f"({len(lines)} of {total}); use the lookup_member tool to find anyone else:\n"
+      + "\n".join(lines)
+    )
+  if not lines:
+    return f"{MEMBERS_HEADER}\nNo members found."
+  return (
+    f"{MEMBERS_HEADER}\n"
+    "To ping a member, use <@user_id> format. Available members:\n"
+    + "\n".join(lines)
+  )
+
+
+roster_cache = RosterCache()
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from utils.cache import TTLCache
+from utils.logger import logger
+
+# Per-message framing the chat format adds on top of the content
+MESSAGE_OVERHEAD = 4
+# Flat estimate for an attached image (low-detail tile)
+IMAGE_TOKENS = 85
+
+
+class TokenCounter:
+  """
+  Counts tokens with tiktoken, caching counts by content hash so a conversation's
+  history is only encoded once. Falls back to ~4 characters per token if tiktoken
+  or its encoding file is unavailable.
+  """
+
+  def __init__(self, encoding: str = "o200k_base", maxsize: int = 8192) -> None:
+    self.encoding_name = encoding
+    self._encoding: Any = None
+    self._loaded = False
+    self._lock = threading.Lock()
+    self._counts = TTLCache(maxsize=maxsize, ttl=3600, name="token-counts")
+
+  def _get_encoding(self):
+    if not self._loaded:
+      with self._lock:
+        if not self._loaded:
+          try:
+            import tiktoken
+
+            self._encoding = tiktoken.get_encoding(self.encoding_name)
+          except Exception as e:
+            logger.warning(f"tiktoken unavailable, estimating tokens from length: {e}")
+          self._loaded = True
+    return self._encoding
+
+  def count(self, text: str) -> int:
+    if not text:
+      return 0
+    key = hashlib.sha1(text.encode("utf-8")).digest()
+    return self._counts.get_or_load(key, lambda: self._encode_length(text))
+
+  def _encode_length(self, text: str) -> int:
+    encoding = self._get_encoding()
+    if encoding is None:
+      return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+  def count_message(self, message: dict) -> int:
+    """Tokens for one chat message: text parts, a flat cost per image, and framing."""
+    content = message.get("content")
+    if isinstance(content, list):
+      tokens = 0
+      for part in content:
+        if part.get("type") == "text":
+          tokens += self.count(part.get("text", ""))
+        elif part.get("type") == "image_url":
+          tokens += IMAGE_TOKENS
+    else:
+      tokens = self.count(content or "")
+    if message.get("tool_calls"):
+      tokens += self.count(json.dumps(message["tool_calls"]))
+    return tokens + MESSAGE_OVERHEAD
+
+  def truncate(self, text: str, max_tokens: int) -> str:
+    """Longest prefix of `text` within `max_tokens`."""
+    if max_tokens <= 0:
+      return ""
+    if self.count(text) <= max_tokens:
+      return text
+    encoding = self._get_encoding()
+    if encoding is None:
+      return text[: max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+  def stats(self):
+    return self._counts.stats()
+
+
+@dataclass
+class PackedContext:
+  lore: str
+  summary: str = ""
+  memories: List[dict] = field(default_factory=list)
+  members_list: str = ""
+  history: List[dict] = field(default_factory=list)
+  tokens: int = 0
+  dropped_history: int = 0
+
+
+def pack_context(
+  counter: TokenCounter,
+  budget: int,
+  lore: str,
+  memories: List[dict],
+  members_list: str,
+  history: List[dict],
+  reserved: int = 0,
+  summary: str = "",
+) -> PackedContext:
+  """
+  Fit prompt context into `budget` tokens, in priority order:
+
+  1. lore (truncated if it alone exceeds the budget)
+  2. summary of compacted older history (truncated to what is left)
+  3. memories, in the given order, skipping any that don't fit
+  4. history, newest first, stopping at the first message that doesn't fit so the
+     kept history stays contiguous
+  5. members list, cut at a line boundary if only part of it fits
+
+  `reserved` is taken off the top for content that is always sent (the new message).
+  """
+  remaining = max(budget - reserved, 0)
+
+  lore = counter.truncate(lore, remaining)
+  remaining -= counter.count(lore)
+
+  summary = counter.truncate(summary, remaining)
+  remaining -= counter.count(summary)
+
+  kept_memories = []
+  for memory in memories:
+    cost = counter.count(memory.get("fact") or "") + MESSAGE_OVERHEAD
+    if cost <= remaining:
+      kept_memories.append(memory)
+      remaining -= cost
+
+  kept_history: List[dict] = []
+  for message in reversed(history):
+    cost = counter.count_message(message)
+    if cost > remaining:
+      break
+    kept_history.append(message)
+    remaining -= cost
+  kept_history.reverse()
+  # A tool result is meaningless without the assistant call before it
+  while kept_history and kept_history[0].get("role") == "tool":
+    remaining += counter.count_message(kept_history.pop(0))
+
+  members = _truncate_lines(counter, members_list, remaining)
+  remaining -= counter.count(members)
+
+  return PackedContext(
+    lore=lore,
+    summary=summary,
+    memories=kept_memories,
+    members_list=members,
+    history=kept_history,
+    tokens=max(budget - reserved, 0) - remaining,
+    dropped_history=len(history) - len(kept_history),
+  )
+
+
+def _truncate_lines(counter: TokenCounter, text: Optional[str], max_tokens: int) -> str:
+  if not text or counter.count(text) <= max_tokens:
+    return text or ""
+  prefix = counter.truncate(text, max_tokens)
+  cut = prefix.rfind("\n")
+  return prefix[:cut] if cut > 0 else ""
+
+
+# Shared by the chat activities
+token_counter = TokenCounter()
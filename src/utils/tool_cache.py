@@ -0,0 +1,77 @@
+import inspect
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+from utils.cache import TTLCache
+
+# tool name -> its result cache, for metrics
+_tool_caches: Dict[str, TTLCache] = {}
+
+
+class _Uncacheable(Exception):
+  """Carries a result out of the loader without storing it (e.g. an error dict)."""
+
+  def __init__(self, result: Any) -> None:
+    super().__init__("uncacheable tool result")
+    self.result = result
+
+
+def normalize_arg(value: Any) -> Any:
+  """Default argument normalization: trim, collapse whitespace and casefold strings."""
+  if isinstance(value, str):
+    return " ".join(value.split()).casefold()
+  return value
+
+
+def cached_tool(
+  name: str,
+  ttl: float,
+  maxsize: int = 256,
+  normalize: Optional[Callable[[str, Any], Any]] = None,
+  registry: Optional[Dict[str, TTLCache]] = None,
+) -> Callable:
+  """
+  Cache a tool's results for `ttl` seconds, keyed on its normalized arguments.
+
+  Defaults are applied before keying, so `f(x)` and `f(x, limit=20)` share an entry.
+  `normalize(arg_name, value)` overrides the default per-argument normalization.
+  Results containing an "error" key are returned but never cached. Concurrent calls
+  with the same key share one upstream call. Cached results are shared between
+  callers and must not be mutated. The cache is listed in `tool_cache_stats` unless
+  another `registry` dict is given (tests use their own).
+  """
+
+  def decorator(fn: Callable) -> Callable:
+    signature = inspect.signature(fn)
+    cache = TTLCache(maxsize=maxsize, ttl=ttl, name=f"tool:{name}")
+    (_tool_caches if registry is None else registry)[name] = cache
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+      bound = signature.bind(*args, **kwargs)
+      bound.apply_defaults()
+      key = tuple(
+        (arg, normalize(arg, value) if normalize else normalize_arg(value))
+        for arg, value in bound.arguments.items()
+      )
+
+      def load():
+        result = fn(*bound.args, **bound.kwargs)
+        if isinstance(result, dict) and "error" in result:
+          raise _Uncacheable(result)
+        return result
+
+      try:
+        return cache.get_or_load(key, load)
+      except _Uncacheable as e:
+        return e.result
+
+    wrapper.cache = cache
+    return wrapper
+
+  return decorator
+
+
+def tool_cache_stats() -> Dict[str, Dict[str, Any]]:
+  """Per-tool cache counters and hit rate."""
+  return {name: cache.stats() for name, cache in _tool_caches.items()}
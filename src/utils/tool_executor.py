@@ -1,13 +1,27 @@
 import json
-from typing import Dict
+from typing import Dict, Optional, Union
 from utils.logger import logger
+from utils.tool_registry import ToolRegistry, ToolSpec, tool_registry
 
 
 class ToolExecutor:
   """Handles tool call execution and result processing."""
 
-  def __init__(self, available_tools: Dict):
-    self.available_tools = available_tools
+  def __init__(self, available_tools: Optional[Union[ToolRegistry, Dict]] = None):
+    """
+    Args:
+      available_tools: a ToolRegistry (default: the shared one), or a plain
+        {"name": {"function": callable, ...}} map, wrapped in a private registry
+    """
+    if available_tools is None:
+      available_tools = tool_registry
+    if not isinstance(available_tools, ToolRegistry):
+      registry = ToolRegistry()
+      for name, entry in available_tools.items():
+        schema = entry.get("schema") or {"type": "function", "function": {"name": name}}
+        registry.register(ToolSpec(schema, entry["function"]))
+      available_tools = registry
+    self.registry = available_tools
 
   def execute_tool_call(self, call_dict: dict) -> str:
     """
@@ -36,11 +50,13 @@ class ToolExecutor:
         name = call_dict.get("name")
         args = call_dict.get("parameters") or call_dict.get("arguments") or {}
 
-      if not name or name not in self.available_tools:
+      if not name or name not in self.registry:
         return json.dumps({"error": f"Unknown function name: {name}"})
 
-      function = self.available_tools[name]["function"]
-      result = function(**args)
+      try:
+        result = self.registry.call(name, args)
+      except TimeoutError:
+        return json.dumps({"error": f"{name} timed out after {self.registry.timeout(name):g}s"})
       return json.dumps(result)
 
     except Exception as e:
@@ -0,0 +1,178 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from utils.logger import logger
+from utils.tool_cache import cached_tool
+
+
+@dataclass
+class ToolSpec:
+  """
+  Everything the dispatcher needs to know about one tool.
+
+  - `schema`: OpenAI tool definition ({"type": "function", "function": {...}})
+  - `timeout`: seconds a caller waits for the result
+  - `max_concurrency`: calls of this tool allowed to run at once (per process);
+    further calls wait in the tool's own queue, not on a pool thread
+  - `cache_ttl`: cache results for this many seconds (0 = no caching)
+  - `kind`: "io" or "cpu"; CPU-bound tools get a pool sized to the cores so they
+    can't crowd out IO-bound ones
+  """
+
+  schema: dict
+  function: Callable[..., Any]
+  timeout: float = 20.0
+  max_concurrency: int = 8
+  cache_ttl: float = 0.0
+  kind: str = "io"
+  normalize: Optional[Callable[[str, Any], Any]] = None
+
+  @property
+  def name(self) -> str:
+    return self.schema["function"]["name"]
+
+
+class ToolRegistry:
+  """
+  Single place tools are declared, dispatched, limited and measured.
+
+  A call only reaches the shared pool once its tool has a free slot, so a busy
+  tool queues its own calls instead of tying up threads other tools need. A
+  queued call whose future is cancelled (its caller gave up) never runs.
+  """
+
+  def __init__(self) -> None:
+    self._specs: Dict[str, ToolSpec] = {}
+    self._functions: Dict[str, Callable[..., Any]] = {}
+    # Free slots, and calls waiting for one, per tool
+    self._free: Dict[str, int] = {}
+    self._waiting: Dict[str, Deque[Tuple[Future, dict]]] = {}
+    self._stats: Dict[str, Dict[str, float]] = {}
+    self._lock = threading.Lock()
+    self._pools = {
+      "io": ThreadPoolExecutor(max_workers=32, thread_name_prefix="tool-io"),
+      "cpu": ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix="tool-cpu"),
+    }
+
+  def register(self, spec: ToolSpec) -> None:
+    if spec.kind not in self._pools:
+      raise ValueError(f"Unknown tool kind for {spec.name}: {spec.kind}")
+    function = spec.function
+    if spec.cache_ttl > 0:
+      function = cached_tool(spec.name, ttl=spec.cache_ttl, normalize=spec.normalize)(function)
+
+    with self._lock:
+      self._specs[spec.name] = spec
+      self._functions[spec.name] = function
+      self._free[spec.name] = spec.max_concurrency
+      self._waiting[spec.name] = deque()
+      self._stats.setdefault(
+        spec.name, {"calls": 0, "errors": 0, "timeouts": 0, "total_ms": 0.0, "max_ms": 0.0}
+      )
+
+  def __contains__(self, name: str) -> bool:
+    return name in self._specs
+
+  def get(self, name: str) -> Optional[ToolSpec]:
+    return self._specs.get(name)
+
+  def definitions(self) -> List[dict]:
+    """Tool schemas in registration order, for the chat completions `tools` param."""
+    return [spec.schema for spec in self._specs.values()]
+
+  def timeout(self, name: str) -> float:
+    return self._specs[name].timeout
+
+  def dispatch(self, name: str, arguments: dict) -> Future:
+    """
+    Run a tool on its pool, or queue it while the tool is at max_concurrency.
+    The future raises KeyError for unknown tools; cancel it to drop a queued call.
+    """
+    future: Future = Future()
+    if name not in self._specs:
+      future.set_exception(KeyError(name))
+      return future
+    with self._lock:
+      if not self._free[name]:
+        self._waiting[name].append((future, arguments))
+        return future
+      self._free[name] -= 1
+    future.set_running_or_notify_cancel()
+    self._submit(name, future, arguments)
+    return future
+
+  def call(self, name: str, arguments: dict) -> Any:
+    """Dispatch and wait up to the tool's timeout (raises TimeoutError past it)."""
+    future = self.dispatch(name, arguments)
+    try:
+      return future.result(timeout=self.timeout(name) if name in self else None)
+    except TimeoutError:
+      future.cancel()
+      self.record_timeout(name)
+      raise
+
+  def record_timeout(self, name: str) -> None:
+    logger.warning(f"Tool {name} timed out after {self.timeout(name):g}s")
+    with self._lock:
+      self._stats[name]["timeouts"] += 1
+
+  def stats(self) -> Dict[str, Dict[str, Any]]:
+    """Per-tool call counts and latency (ms) for tools that have been called."""
+    with self._lock:
+      return {
+        name: {
+          "calls": int(s["calls"]),
+          "errors": int(s["errors"]),
+          "timeouts": int(s["timeouts"]),
+          "avg_ms": s["total_ms"] / s["calls"] if s["calls"] else 0.0,
+          "max_ms": s["max_ms"],
+          "waiting": len(self._waiting[name]),
+        }
+        for name, s in self._stats.items()
+        if s["calls"] or s["timeouts"] or self._waiting[name]
+      }
+
+  def _submit(self, name: str, future: Future, arguments: dict) -> None:
+    """Start a call that holds one of its tool's slots."""
+    self._pools[self._specs[name].kind].submit(self._run, name, future, arguments)
+
+  def _release(self, name: str) -> None:
+    """Hand a finished call's slot to the next live queued call, or free it."""
+    while True:
+      with self._lock:
+        if not self._waiting[name]:
+          self._free[name] += 1
+          return
+        future, arguments = self._waiting[name].popleft()
+      if future.set_running_or_notify_cancel():
+        self._submit(name, future, arguments)
+        return
+
+  def _run(self, name: str, future: Future, arguments: dict) -> None:
+    started = time.monotonic()
+    failed = False
+    try:
+      result = self._functions[name](**arguments)
+      failed = isinstance(result, dict) and "error" in result
+      future.set_result(result)
+    except Exception as e:
+      failed = True
+      future.set_exception(e)
+    finally:
+      elapsed_ms = (time.monotonic() - started) * 1000
+      with self._lock:
+        s = self._stats[name]
+        s["calls"] += 1
+        s["errors"] += failed
+        s["total_ms"] += elapsed_ms
+        s["max_ms"] = max(s["max_ms"], elapsed_ms)
+      self._release(name)
+
+
+# Tools register themselves here (services/tool_calling_service.py, LLMService)
+tool_registry = ToolRegistry()
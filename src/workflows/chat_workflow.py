@@ -1,16 +1,34 @@
+import json
+import asyncio
 from datetime import timedelta
+from typing import Optional
 
 from temporalio import workflow
 from temporalio.common import RetryPolicy
+from temporalio.exceptions import WorkflowAlreadyStartedError
 
 with workflow.unsafe.imports_passed_through():
-  from activities import discord_rest, llm, manager
+  from activities import discord_rest, llm, manager, tools
   from activities.models import (
     ChatRequest,
+    ChatResult,
+    ChatSession,
+    ChatTurnResult,
+    HistoryCompactionInput,
     SendResponseInput,
+    TokenUsage,
     TokenUsageInput,
+    ToolCall,
+    ToolCallOutcome,
+  )
+  from services.llm_service import (
+    IMAGE_REPLY,
+    MAX_TOOL_ROUNDS,
+    final_text,
+    tool_round_messages,
   )
   from utils.config import CONTEXT_LIMIT
+  from workflows.history_workflow import HistoryCompactionWorkflow
 
 
 EYES = "\U0001f440"
@@ -30,13 +48,59 @@ _llm_retry = RetryPolicy(
   maximum_attempts=4,
 )
 
+# Context comes from one bulk manager call. If that fails, the sources are fetched
+# concurrently, each with its own budget: a slow or failing source falls back to an
+# empty value instead of holding up the reply.
+_context_retry = RetryPolicy(
+  initial_interval=timedelta(milliseconds=500),
+  backoff_coefficient=2.0,
+  maximum_interval=timedelta(seconds=2),
+  maximum_attempts=3,
+)
+_BULK_CONTEXT_BUDGET = (timedelta(seconds=3), timedelta(seconds=5))
+_LORE_BUDGET = (timedelta(seconds=3), timedelta(seconds=8))
+_HISTORY_BUDGET = (timedelta(seconds=3), timedelta(seconds=8))
+_MEMORY_BUDGET = (timedelta(seconds=2), timedelta(seconds=3))
+
+# Workflow-driven tool loop: each tool call is its own activity, retried on its own
+# and heartbeating so a dead worker is noticed within the heartbeat timeout
+_tool_retry = RetryPolicy(
+  initial_interval=timedelta(seconds=1),
+  backoff_coefficient=2.0,
+  maximum_interval=timedelta(seconds=5),
+  maximum_attempts=3,
+)
+_TOOL_ACTIVITY_TIMEOUT = timedelta(seconds=75)
+_TOOL_HEARTBEAT_TIMEOUT = timedelta(seconds=15)
+
+
+def split_history(history: list, limit: int = CONTEXT_LIMIT) -> tuple[list, list]:
+  """
+  (evicted, kept). `limit` (CONTEXT_LIMIT) caps what is stored; what is sent is packed
+  by token budget. Past the cap the older half is evicted to be folded into the running
+  summary, so compaction runs once every few turns, not every turn.
+  """
+  if len(history) <= limit:
+    return [], history
+  keep = max(limit // 2, 1)
+  return history[:-keep], history[-keep:]
+
 
 @workflow.defn
 class BooChatWorkflow:
-  """End-to-end Discord message handler. Replaces the old in-bot blocking flow."""
+  """
+  End-to-end Discord message handler. Replaces the old in-bot blocking flow.
+
+  Started on its own it loads and stores the guild's history itself. Run as a turn
+  of a GuildSessionWorkflow it is given the history (`session`) and returns the
+  messages to append, leaving persistence to the session.
+  """
 
   @workflow.run
-  async def run(self, req: ChatRequest) -> None:
+  async def run(
+    self, req: ChatRequest, session: Optional[ChatSession] = None
+  ) -> Optional[ChatTurnResult]:
+    turn = ChatTurnResult()
     await self._safe_react(req, EYES)
 
     try:
@@ -53,22 +117,32 @@ class BooChatWorkflow:
           start_to_close_timeout=timedelta(seconds=15),
           retry_policy=_short_retry,
         )
-        return
+        return turn if session else None
 
-      lore, history, memories = await self._gather_context(req)
+      if session is not None:
+        lore, _, memories, _ = await self._gather_context(req, include_history=False)
+        history, summary = session.history, session.summary
+      else:
+        lore, history, memories, summary = await self._gather_context(req)
+      history_loaded = history is not None
+      history = history or []
 
       llm_input = llm.AgenticChatInput(
         request=req,
         lore=lore,
         history=history,
         memories=memories,
+        summary=summary or "",
       )
-      result = await workflow.execute_activity(
-        llm.run_agentic_chat,
-        llm_input,
-        start_to_close_timeout=timedelta(minutes=5),
-        retry_policy=_llm_retry,
-      )
+      if req.tool_execution == "activity":
+        result = await self._run_tool_loop(req, llm_input)
+      else:
+        result = await workflow.execute_activity(
+          llm.run_agentic_chat,
+          llm_input,
+          start_to_close_timeout=timedelta(minutes=5),
+          retry_policy=_llm_retry,
+        )
 
       await workflow.execute_activity(
         discord_rest.send_response,
@@ -78,21 +152,29 @@ class BooChatWorkflow:
           content=result.response_text,
           sticker_ids=[],
           generated_images=result.generated_images,
+          message_id=result.streamed_message_id,
         ),
         start_to_close_timeout=timedelta(minutes=2),
         retry_policy=_short_retry,
       )
 
-      new_history = history + result.appended_messages
-      if len(new_history) > CONTEXT_LIMIT:
-        new_history = new_history[-CONTEXT_LIMIT:]
-
-      await workflow.execute_activity(
-        manager.update_chat_history,
-        args=[req.server_id, new_history],
-        start_to_close_timeout=timedelta(seconds=10),
-        retry_policy=_short_retry,
-      )
+      # A session persists its own history
+      turn.appended_messages = result.appended_messages
+      if session is None and history_loaded:
+        evicted, new_history = split_history(history + result.appended_messages)
+        await workflow.execute_activity(
+          manager.update_chat_history,
+          args=[req.server_id, new_history],
+          start_to_close_timeout=timedelta(seconds=10),
+          retry_policy=_short_retry,
+        )
+        if evicted:
+          await self._start_compaction(req, evicted)
+      elif session is None:
+        # Writing back only this turn would wipe the stored conversation.
+        workflow.logger.warning(
+          f"Skipping chat history update for {req.server_id}: history was unavailable"
+        )
 
       await workflow.execute_activity(
         manager.store_token_usage,
@@ -124,45 +206,199 @@ class BooChatWorkflow:
     finally:
       await self._safe_unreact(req, EYES)
 
-  async def _gather_context(self, req: ChatRequest) -> tuple[str, list, list]:
-    lore = await workflow.execute_activity(
-      manager.fetch_prompt,
-      req.server_id,
-      start_to_close_timeout=timedelta(seconds=10),
+    return turn if session else None
+
+  async def _run_tool_loop(self, req: ChatRequest, llm_input: "llm.AgenticChatInput") -> ChatResult:
+    """
+    The agentic loop of run_agentic_chat, driven from the workflow: every model round
+    and every tool call is a separate activity, so a failure retries only that step.
+    """
+    messages = await workflow.execute_activity(
+      llm.pack_chat_messages,
+      llm_input,
+      start_to_close_timeout=timedelta(seconds=30),
       retry_policy=_short_retry,
     )
-    history = await workflow.execute_activity(
-      manager.get_chat_history,
-      req.server_id,
-      start_to_close_timeout=timedelta(seconds=10),
-      retry_policy=_short_retry,
+    stream_message_id: Optional[str] = None
+    memory_stored = False
+    usage = TokenUsage()
+    text = ""
+
+    # MAX_TOOL_ROUNDS rounds with tools, then one without to force a text answer
+    for round_number in range(MAX_TOOL_ROUNDS + 1):
+      round_result = await workflow.execute_activity(
+        llm.run_chat_round,
+        llm.ChatRoundInput(
+          request=req,
+          messages=messages,
+          enable_tools=round_number < MAX_TOOL_ROUNDS,
+          stream_message_id=stream_message_id,
+        ),
+        start_to_close_timeout=timedelta(minutes=2),
+        retry_policy=_llm_retry,
+      )
+      stream_message_id = round_result.stream_message_id
+      # Every round is billed, so the turn's usage is the sum over rounds
+      usage = TokenUsage(
+        prompt_tokens=usage.prompt_tokens + round_result.usage.prompt_tokens,
+        total_tokens=usage.total_tokens + round_result.usage.total_tokens,
+      )
+
+      if not round_result.tool_calls:
+        text = final_text(round_result.content, memory_stored)
+        break
+
+      outcomes = await asyncio.gather(
+        *(self._run_tool(call, req.server_id) for call in round_result.tool_calls)
+      )
+      memory_stored = memory_stored or any(o.memory_stored for o in outcomes)
+      images = [o.image for o in outcomes if o.image]
+      if images:
+        return llm.build_chat_result(
+          req, final_text(IMAGE_REPLY, memory_stored), usage, images, stream_message_id
+        )
+
+      messages = messages + tool_round_messages(
+        round_result.content,
+        [(call.id, call.name, call.arguments) for call in round_result.tool_calls],
+        [o.content for o in outcomes],
+      )
+
+    return llm.build_chat_result(req, text, usage, [], stream_message_id)
+
+  async def _run_tool(self, call: ToolCall, guild_id: str) -> ToolCallOutcome:
+    """
+    Run one tool call activity. The activity only fails on transient errors, which
+    are retried; a call still failing after that becomes an error result.
+    """
+    try:
+      return await workflow.execute_activity(
+        tools.execute_tool_call,
+        tools.ToolCallInput(call=call, guild_id=guild_id),
+        start_to_close_timeout=_TOOL_ACTIVITY_TIMEOUT,
+        heartbeat_timeout=_TOOL_HEARTBEAT_TIMEOUT,
+        retry_policy=_tool_retry,
+      )
+    except Exception as e:
+      workflow.logger.warning(f"Tool call {call.name} failed: {e}")
+      return ToolCallOutcome(
+        call_id=call.id, content=json.dumps({"error": f"{call.name} failed: {e}"})
+      )
+
+  async def _start_compaction(self, req: ChatRequest, evicted: list) -> None:
+    """
+    Hand evicted turns to the guild's compaction workflow, which outlives this one.
+    There is one per guild at a time: if it is already running the batch is
+    signalled to it, so summary updates never overlap.
+    """
+    workflow_id = f"compact-history-{req.server_id}"
+    # Two tries: the running one can finish between a failed start and the signal
+    for _ in range(2):
+      try:
+        await workflow.start_child_workflow(
+          HistoryCompactionWorkflow.run,
+          HistoryCompactionInput(server_id=req.server_id, summary="", messages=evicted),
+          id=workflow_id,
+          parent_close_policy=workflow.ParentClosePolicy.ABANDON,
+        )
+        return
+      except WorkflowAlreadyStartedError:
+        pass
+      except Exception as e:
+        workflow.logger.warning(f"Could not start history compaction for {req.server_id}: {e}")
+        return
+      try:
+        await workflow.get_external_workflow_handle(workflow_id).signal(
+          HistoryCompactionWorkflow.add, evicted
+        )
+        return
+      except Exception as e:
+        workflow.logger.info(f"Compaction for {req.server_id} finished before signal: {e}")
+    workflow.logger.warning(
+      f"Dropping {len(evicted)} evicted messages for {req.server_id}: compaction unavailable"
     )
-    memories = await workflow.execute_activity(
-      manager.get_memories,
-      args=[req.server_id, req.author_id],
-      start_to_close_timeout=timedelta(seconds=10),
-      retry_policy=_short_retry,
+
+  async def _gather_context(
+    self, req: ChatRequest, include_history: bool = True
+  ) -> tuple[str, Optional[list], list, Optional[str]]:
+    """
+    Fetch lore, history, memories and the history summary. History and summary are
+    None if they could not be loaded (or were not asked for).
+    """
+    author_ids = [req.author_id] + [i for i in req.mentioned_ids if i != req.author_id]
+    context = await self._fetch_context(
+      manager.get_conversation_context,
+      [req.server_id, author_ids, req.lore_version, include_history],
+      None,
+      _BULK_CONTEXT_BUDGET,
     )
-    return lore, history, memories
+    if context is not None:
+      if not include_history:
+        return context.lore, None, context.memories, None
+      return context.lore, context.history, context.memories, context.summary
 
-  async def _safe_react(self, req: ChatRequest, emoji: str) -> None:
+    if not include_history:
+      lore, memories = await asyncio.gather(
+        self._fetch_context(
+          manager.fetch_prompt, [req.server_id, req.lore_version], "", _LORE_BUDGET
+        ),
+        self._fetch_context(
+          manager.get_memories, [req.server_id, req.author_id], [], _MEMORY_BUDGET
+        ),
+      )
+      return lore, None, memories, None
+
+    return await asyncio.gather(
+      self._fetch_context(
+        manager.fetch_prompt, [req.server_id, req.lore_version], "", _LORE_BUDGET
+      ),
+      self._fetch_context(manager.get_chat_history, [req.server_id], None, _HISTORY_BUDGET),
+      self._fetch_context(
+        manager.get_memories, [req.server_id, req.author_id], [], _MEMORY_BUDGET
+      ),
+      self._fetch_context(manager.get_chat_summary, [req.server_id], None, _HISTORY_BUDGET),
+    )
+
+  async def _fetch_context(
+    self, activity_fn, args: list, default, budget: tuple[timedelta, timedelta]
+  ):
+    start_to_close, schedule_to_close = budget
     try:
-      await workflow.execute_activity(
-        discord_rest.add_reaction,
-        args=[req.channel_id, req.message_id, emoji],
-        start_to_close_timeout=timedelta(seconds=10),
-        retry_policy=RetryPolicy(maximum_attempts=2),
+      return await workflow.execute_activity(
+        activity_fn,
+        args=args,
+        start_to_close_timeout=start_to_close,
+        schedule_to_close_timeout=schedule_to_close,
+        retry_policy=_context_retry,
       )
     except Exception as e:
-      workflow.logger.warning(f"Could not add reaction {emoji}: {e}")
+      workflow.logger.warning(f"{activity_fn.__name__} unavailable, using fallback: {e}")
+      return default
+
+  async def _safe_react(self, req: ChatRequest, emoji: str) -> None:
+    # Merged messages are acknowledged along with the one being replied to
+    await asyncio.gather(
+      *(
+        self._safe_reaction(discord_rest.add_reaction, req.channel_id, message_id, emoji)
+        for message_id in [*req.merged_message_ids, req.message_id]
+      )
+    )
 
   async def _safe_unreact(self, req: ChatRequest, emoji: str) -> None:
+    await asyncio.gather(
+      *(
+        self._safe_reaction(discord_rest.remove_reaction, req.channel_id, message_id, emoji)
+        for message_id in [*req.merged_message_ids, req.message_id]
+      )
+    )
+
+  async def _safe_reaction(self, activity_fn, channel_id: str, message_id: str, emoji: str) -> None:
     try:
       await workflow.execute_activity(
-        discord_rest.remove_reaction,
-        args=[req.channel_id, req.message_id, emoji],
+        activity_fn,
+        args=[channel_id, message_id, emoji],
         start_to_close_timeout=timedelta(seconds=10),
         retry_policy=RetryPolicy(maximum_attempts=2),
       )
     except Exception as e:
-      workflow.logger.warning(f"Could not remove reaction {emoji}: {e}")
+      workflow.logger.warning(f"Could not update reaction {emoji} on {message_id}: {e}")
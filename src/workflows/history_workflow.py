@@ -0,0 +1,68 @@
+from datetime import timedelta
+from typing import List
+
+from temporalio import workflow
+from temporalio.common import RetryPolicy
+
+with workflow.unsafe.imports_passed_through():
+  from activities import llm, manager
+  from activities.models import HistoryCompactionInput
+
+
+_compaction_retry = RetryPolicy(
+  initial_interval=timedelta(seconds=5),
+  backoff_coefficient=2.0,
+  maximum_interval=timedelta(minutes=1),
+  maximum_attempts=5,
+)
+
+
+@workflow.defn
+class HistoryCompactionWorkflow:
+  """
+  Summarize turns evicted from a guild's chat history into its running summary.
+
+  Runs as `compact-history-<server_id>`, one per guild at a time. Batches evicted
+  while it is running arrive through the `add` signal and are folded in after the
+  current one, and each pass reads the stored summary fresh, so no update is lost
+  to another. `payload.summary` is ignored.
+  """
+
+  def __init__(self) -> None:
+    self._pending: List[dict] = []
+
+  @workflow.signal
+  def add(self, messages: List[dict]) -> None:
+    self._pending.extend(messages)
+
+  @workflow.run
+  async def run(self, payload: HistoryCompactionInput) -> None:
+    self._pending = payload.messages + self._pending
+    while self._pending:
+      batch, self._pending = self._pending, []
+      try:
+        await self._compact(payload.server_id, batch)
+      except Exception as e:
+        workflow.logger.warning(
+          f"Dropping {len(batch)} evicted messages for {payload.server_id}: {e}"
+        )
+
+  async def _compact(self, server_id: str, messages: List[dict]) -> None:
+    summary = await workflow.execute_activity(
+      manager.get_chat_summary,
+      server_id,
+      start_to_close_timeout=timedelta(seconds=10),
+      retry_policy=_compaction_retry,
+    )
+    summary = await workflow.execute_activity(
+      llm.summarize_history,
+      HistoryCompactionInput(server_id=server_id, summary=summary, messages=messages),
+      start_to_close_timeout=timedelta(minutes=2),
+      retry_policy=_compaction_retry,
+    )
+    await workflow.execute_activity(
+      manager.update_chat_summary,
+      args=[server_id, summary],
+      start_to_close_timeout=timedelta(seconds=10),
+      retry_policy=_compaction_retry,
+    )
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from temporalio import workflow
+from temporalio.common import RetryPolicy
+
+with workflow.unsafe.imports_passed_through():
+  from activities import metrics
+
+
+@workflow.defn
+class WorkerStatsWorkflow:
+  """Fetch in-memory metrics from whichever worker picks up the activity."""
+
+  @workflow.run
+  async def run(self) -> dict:
+    return await workflow.execute_activity(
+      metrics.collect_worker_stats,
+      start_to_close_timeout=timedelta(seconds=5),
+      retry_policy=RetryPolicy(maximum_attempts=1),
+    )
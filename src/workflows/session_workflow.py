@@ -0,0 +1,216 @@
+import asyncio
+from datetime import timedelta
+from typing import List, Optional
+
+from temporalio import workflow
+from temporalio.common import RetryPolicy
+
+with workflow.unsafe.imports_passed_through():
+  from activities import llm, manager
+  from activities.models import (
+    ChatRequest,
+    ChatSession,
+    GuildSessionState,
+    HistoryCompactionInput,
+  )
+  from workflows.chat_workflow import BooChatWorkflow, split_history
+
+
+# Persist once the guild has been quiet this long, or every few turns when busy
+_PERSIST_DELAY = timedelta(seconds=30)
+_PERSIST_EVERY_TURNS = 10
+# Close the session after this long without messages (it restarts on the next one)
+_IDLE_TIMEOUT = timedelta(minutes=30)
+# Keep the event history bounded
+_MAX_TURNS_PER_RUN = 200
+
+_session_retry = RetryPolicy(
+  initial_interval=timedelta(seconds=1),
+  backoff_coefficient=2.0,
+  maximum_interval=timedelta(seconds=10),
+  maximum_attempts=3,
+)
+
+
+@workflow.defn
+class GuildSessionWorkflow:
+  """
+  One long-lived workflow per guild (id `guild-session-<server_id>`), fed by
+  signal-with-start. It runs the guild's chat turns one at a time as BooChatWorkflow
+  children, so concurrent messages can no longer overwrite each other's history. It
+  holds recent history in memory, writes it to the manager only when it has changed
+  (after a quiet period, every few turns, and before continue-as-new or closing),
+  and folds evicted turns into the running summary in the background.
+  """
+
+  def __init__(self) -> None:
+    self._pending: List[ChatRequest] = []
+    self._turns_since_persist = 0
+    self._compaction: Optional[asyncio.Task] = None
+    # Bumped on reset so a compaction started before it is discarded
+    self._generation = 0
+    # Bumped on every change, so a persist racing a compaction doesn't mark it saved
+    self._changes = 0
+
+  @workflow.signal
+  def submit(self, req: ChatRequest) -> None:
+    self._pending.append(req)
+
+  @workflow.run
+  async def run(self, state: GuildSessionState) -> None:
+    self._state = state
+    self._pending = state.pending + self._pending
+    state.pending = []
+    if state.evicted:
+      self._start_compaction()
+
+    turns = 0
+    while True:
+      try:
+        await workflow.wait_condition(
+          lambda: bool(self._pending),
+          timeout=_PERSIST_DELAY if state.dirty else _IDLE_TIMEOUT,
+        )
+      except asyncio.TimeoutError:
+        if state.dirty:
+          await self._persist()
+          continue
+        await self._drain_compaction()
+        if state.dirty:
+          await self._persist()
+        # A failed persist leaves it dirty: retry after the persist delay, don't lose it
+        if not self._pending and not state.dirty:
+          return
+        continue
+
+      await self._run_turn(self._pending.pop(0))
+      turns += 1
+      if self._turns_since_persist >= _PERSIST_EVERY_TURNS:
+        await self._persist()
+
+      if turns >= _MAX_TURNS_PER_RUN or workflow.info().is_continue_as_new_suggested():
+        await self._drain_compaction()
+        await self._persist()
+        await workflow.wait_condition(workflow.all_handlers_finished)
+        state.pending = self._pending
+        workflow.continue_as_new(state)
+
+  async def _run_turn(self, req: ChatRequest) -> None:
+    state = self._state
+    if req.is_reset:
+      # The turn deletes the stored history; drop ours to match
+      state.history, state.summary, state.evicted = [], "", []
+      state.dirty = False
+      self._generation += 1
+    elif state.history is None:
+      await self._load()
+
+    session = None
+    if state.history is not None:
+      session = ChatSession(history=state.history, summary=state.summary)
+    try:
+      result = await workflow.execute_child_workflow(
+        BooChatWorkflow.run,
+        args=[req, session],
+        id=f"chat-{req.message_id}",
+      )
+    except Exception as e:
+      workflow.logger.error(
+        f"Chat turn {req.message_id} failed in session {state.server_id}: {e}"
+      )
+      return
+
+    if session is None or not result or not result.appended_messages:
+      # Without a loaded history the turn stored its own
+      return
+    evicted, state.history = split_history(state.history + result.appended_messages)
+    self._mark_dirty()
+    self._turns_since_persist += 1
+    if evicted:
+      state.evicted.extend(evicted)
+      self._start_compaction()
+
+  async def _load(self) -> None:
+    state = self._state
+    try:
+      history, summary = await asyncio.gather(
+        workflow.execute_activity(
+          manager.get_chat_history,
+          state.server_id,
+          start_to_close_timeout=timedelta(seconds=10),
+          retry_policy=_session_retry,
+        ),
+        workflow.execute_activity(
+          manager.get_chat_summary,
+          state.server_id,
+          start_to_close_timeout=timedelta(seconds=10),
+          retry_policy=_session_retry,
+        ),
+      )
+    except Exception as e:
+      # Left unloaded: the next turn stores its own history and we try again after
+      workflow.logger.warning(f"Could not load history for session {state.server_id}: {e}")
+      return
+    state.history, state.summary = history, summary
+
+  async def _persist(self) -> None:
+    state = self._state
+    if not state.dirty or state.history is None:
+      return
+    changes = self._changes
+    try:
+      await workflow.execute_activity(
+        manager.update_chat_history,
+        args=[state.server_id, state.history],
+        start_to_close_timeout=timedelta(seconds=10),
+        retry_policy=_session_retry,
+      )
+      await workflow.execute_activity(
+        manager.update_chat_summary,
+        args=[state.server_id, state.summary],
+        start_to_close_timeout=timedelta(seconds=10),
+        retry_policy=_session_retry,
+      )
+    except Exception as e:
+      # Still dirty, so the next quiet period tries again
+      workflow.logger.warning(f"Could not persist session {state.server_id}: {e}")
+      return
+    if changes == self._changes:
+      state.dirty = False
+    self._turns_since_persist = 0
+
+  def _mark_dirty(self) -> None:
+    self._state.dirty = True
+    self._changes += 1
+
+  def _start_compaction(self) -> None:
+    if self._compaction is None or self._compaction.done():
+      self._compaction = asyncio.create_task(self._compact())
+
+  async def _compact(self) -> None:
+    """Summarize evicted turns one batch at a time, so updates never race."""
+    state = self._state
+    while state.evicted:
+      batch, state.evicted = state.evicted, []
+      generation = self._generation
+      try:
+        summary = await workflow.execute_activity(
+          llm.summarize_history,
+          HistoryCompactionInput(
+            server_id=state.server_id, summary=state.summary, messages=batch
+          ),
+          start_to_close_timeout=timedelta(minutes=2),
+          retry_policy=_session_retry,
+        )
+      except Exception as e:
+        workflow.logger.warning(
+          f"Dropping {len(batch)} evicted messages for {state.server_id}: {e}"
+        )
+        continue
+      if generation == self._generation:
+        state.summary = summary
+        self._mark_dirty()
+
+  async def _drain_compaction(self) -> None:
+    if self._compaction is not None:
+      await self._compaction
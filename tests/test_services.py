@@ -0,0 +1,488 @@
+import base64
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from functools import partial
+from unittest import mock
+
+SRC_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if SRC_PATH not in sys.path:
+  sys.path.insert(0, SRC_PATH)
+
+# utils.config exits on missing settings; the services only need them to be present
+for _name in (
+  "ENVIRONMENT",
+  "DISCORD_TOKEN",
+  "TENOR_API_KEY",
+  "MANAGER_API_TOKEN",
+  "OPENROUTER_API_KEY",
+  "OPENROUTER_MODEL",
+  "EXA_API_KEY",
+  "VOYAGEAI_API_KEY",
+  "MEILI_MASTER_KEY",
+  "GITHUB_TOKEN",
+):
+  os.environ.setdefault(_name, "test")
+os.environ.setdefault("ADMIN_LIST", "1")
+
+
+def _installed(name: str) -> bool:
+  # A spec-less stub another test module put in sys.modules doesn't count, and
+  # find_spec would reject it with ValueError
+  if name in sys.modules:
+    return getattr(sys.modules[name], "__spec__", None) is not None
+  return importlib.util.find_spec(name) is not None
+
+
+HAS_SERVICE_DEPS = all(_installed(name) for name in ("httpx", "temporalio"))
+HAS_TOOL_DEPS = all(_installed(name) for name in ("httpx", "requests", "exa_py", "PyPDF2"))
+
+if HAS_SERVICE_DEPS:
+  import httpx
+
+  from activities import manager
+  from services import db_service
+  from services.db_service import AsyncDBService, DBService
+  from utils.cache import server_cache
+  from utils.singleton import Singleton
+
+if HAS_TOOL_DEPS:
+  from services import tool_calling_service
+
+
+class _ManagerStub:
+  """Answers AsyncDBService requests from `routes` ((method, path) -> response or exception)."""
+
+  def __init__(self, test: unittest.TestCase):
+    self.routes = {}
+    self.requests = []
+    client = partial(httpx.AsyncClient, transport=httpx.MockTransport(self._handle))
+    patcher = mock.patch.object(db_service.httpx, "AsyncClient", client)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+
+  def _handle(self, request: "httpx.Request") -> "httpx.Response":
+    self.requests.append(request)
+    response = self.routes[(request.method, request.url.path)]
+    if isinstance(response, Exception):
+      raise response
+    return response
+
+
+@unittest.skipUnless(HAS_SERVICE_DEPS, "service dependencies not installed")
+class TestAsyncDBService(unittest.IsolatedAsyncioTestCase):
+  def setUp(self):
+    self.manager = _ManagerStub(self)
+    self.addAsyncCleanup(AsyncDBService().aclose)
+    self.db = AsyncDBService()
+
+  async def send(self, response, **kwargs):
+    self.manager.routes[("GET", "/thing")] = response
+    return await self.db._send("GET", "/thing", "testing", **kwargs)
+
+  async def test_success(self):
+    self.assertEqual(await self.send(httpx.Response(200, json={"a": 1})), {"a": 1})
+    self.assertEqual(await self.send(httpx.Response(200)), {})
+    self.assertIs(await self.send(httpx.Response(204), parse_json=False), True)
+
+  async def test_failures_return_the_fallback(self):
+    for failure in (
+      httpx.Response(500),
+      httpx.Response(404),
+      httpx.Response(200, content=b"not json"),
+      httpx.ReadTimeout("slow"),
+      httpx.ConnectError("refused"),
+    ):
+      self.assertEqual(await self.send(failure, fallback="fallback"), "fallback", failure)
+      self.assertIsNone(await self.send(failure))
+
+  async def test_expected_statuses_map_to_values(self):
+    on_status = {404: "missing"}
+    self.assertEqual(await self.send(httpx.Response(404), on_status=on_status), "missing")
+    self.assertIsNone(await self.send(httpx.Response(409), on_status=on_status))
+
+  async def test_store_messages(self):
+    route = ("POST", "/messages")
+    self.manager.routes[route] = httpx.Response(201, json={"inserted": 2})
+    self.assertEqual(await self.db.store_messages([{}, {}]), {"inserted": 2})
+    self.assertEqual(self.manager.requests[-1].content, b"[{},{}]")
+    # A batch the manager refuses is reported, not retried like a failed request
+    self.manager.routes[route] = httpx.Response(400, json={"error": "batch too large"})
+    self.assertEqual(await self.db.store_messages([{}]), {"inserted": 0, "rejected": 1})
+    self.manager.routes[route] = httpx.Response(503)
+    self.assertIsNone(await self.db.store_messages([{}]))
+
+  async def test_requests_share_one_client_per_loop(self):
+    self.manager.routes[("GET", "/thing")] = httpx.Response(200, json={})
+    client = self.db._client()
+    await self.db._send("GET", "/thing", "testing")
+    self.assertIs(self.db._client(), client)
+    self.assertEqual(
+      self.manager.requests[-1].headers["Authorization"], f"Bearer {os.environ['MANAGER_API_TOKEN']}"
+    )
+
+
+@unittest.skipUnless(HAS_SERVICE_DEPS, "service dependencies not installed")
+class TestDBService(unittest.TestCase):
+  def setUp(self):
+    self.manager = _ManagerStub(self)
+    # A fresh facade rather than the process-wide one
+    patcher = mock.patch.dict(Singleton._instances)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    Singleton._instances.pop(DBService, None)
+
+  def test_loop_thread_starts_on_first_call(self):
+    facade = DBService()
+    self.assertIsNone(facade._loop)
+    self.manager.routes[("GET", "/prompt")] = httpx.Response(200, json={"system_prompt": "lore"})
+    self.assertEqual(facade.fetch_prompt("g"), {"system_prompt": "lore"})
+    loop = facade._loop
+    self.addCleanup(loop.call_soon_threadsafe, loop.stop)
+    self.assertTrue(any(t.name == "db-service-loop" for t in threading.enumerate()))
+    self.assertEqual(facade.fetch_prompt("g"), {"system_prompt": "lore"})
+    self.assertIs(facade._loop, loop)
+
+
+@unittest.skipUnless(HAS_SERVICE_DEPS, "service dependencies not installed")
+class TestFetchPrompt(unittest.IsolatedAsyncioTestCase):
+  def setUp(self):
+    self.manager = _ManagerStub(self)
+    self.addAsyncCleanup(AsyncDBService().aclose)
+    server_cache.invalidate_lore("g")
+    self.addCleanup(server_cache.invalidate_lore, "g")
+
+  async def test_missing_prompt_is_cached_as_empty(self):
+    self.manager.routes[("GET", "/prompt")] = httpx.Response(404)
+    self.assertEqual(await AsyncDBService().fetch_prompt("g"), {"system_prompt": ""})
+    self.assertEqual(await manager.fetch_prompt("g", 1), "")
+    self.assertEqual(server_cache.get_lore("g", 1), "")
+
+  async def test_failed_fetch_is_not_cached(self):
+    for failure in (httpx.Response(503), httpx.ConnectError("refused")):
+      self.manager.routes[("GET", "/prompt")] = failure
+      self.assertIsNone(await AsyncDBService().fetch_prompt("g"))
+      with self.assertRaises(RuntimeError):
+        await manager.fetch_prompt("g", 1)
+      self.assertIsNone(server_cache.get_lore("g", 1))
+
+    self.manager.routes[("GET", "/prompt")] = httpx.Response(200, json={"system_prompt": "lore"})
+    self.assertEqual(await manager.fetch_prompt("g", 1), "lore")
+    self.assertEqual(server_cache.get_lore("g", 1), "lore")
+
+
+class _FakeDownload:
+  """A streamed `requests` response: status, headers and body chunks."""
+
+  def __init__(self, status_code=200, body=b"", headers=None):
+    self.status_code = status_code
+    self.headers = headers or {}
+    self.body = body
+    self.read = False
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    return False
+
+  def raise_for_status(self):
+    if self.status_code >= 400:
+      raise tool_calling_service.requests.HTTPError(f"{self.status_code} Error", response=self)
+
+  def iter_content(self, chunk_size):
+    self.read = True
+    for start in range(0, len(self.body), chunk_size):
+      yield self.body[start : start + chunk_size]
+
+
+@unittest.skipUnless(HAS_TOOL_DEPS, "tool dependencies not installed")
+class TestReadPdf(unittest.TestCase):
+  URL = "https://example.com/paper.pdf"
+
+  def setUp(self):
+    for cache in (tool_calling_service._pdf_pages, tool_calling_service._pdf_etags):
+      cache.clear()
+      self.addCleanup(cache.clear)
+    self.downloads = []
+    self.pages = ["aaaa", "bbbb", "cccc"]
+    get = mock.patch.object(tool_calling_service.requests, "get", side_effect=self._get)
+    self.get = get.start()
+    self.addCleanup(get.stop)
+    extract = mock.patch.object(
+      tool_calling_service, "extract_pdf_pages", side_effect=lambda data: list(self.pages)
+    )
+    self.extract = extract.start()
+    self.addCleanup(extract.stop)
+
+  def _get(self, url, **kwargs):
+    return self.downloads.pop(0)
+
+  def test_unchanged_pdf_is_revalidated_without_a_download(self):
+    self.downloads = [_FakeDownload(body=b"%PDF", headers={"ETag": '"v1"'}), _FakeDownload(304)]
+    first = tool_calling_service.read_pdf(self.URL)
+    self.assertIsNone(self.get.call_args.kwargs["headers"])
+    self.assertEqual(tool_calling_service.read_pdf(self.URL), first)
+    self.assertEqual(self.get.call_args.kwargs["headers"], {"If-None-Match": '"v1"'})
+    self.extract.assert_called_once()
+
+  def test_changed_etag_is_extracted_again(self):
+    self.downloads = [
+      _FakeDownload(body=b"%PDF-1", headers={"ETag": '"v1"'}),
+      _FakeDownload(body=b"%PDF-2", headers={"ETag": '"v2"'}),
+    ]
+    tool_calling_service.read_pdf(self.URL)
+    self.pages = ["new"]
+    self.assertEqual(tool_calling_service.read_pdf(self.URL)["text"], "new")
+    self.assertEqual(self.extract.call_count, 2)
+
+  def test_server_ignoring_if_none_match_skips_the_body(self):
+    self.downloads = [
+      _FakeDownload(body=b"%PDF", headers={"ETag": '"v1"'}),
+      _FakeDownload(body=b"%PDF", headers={"ETag": '"v1"'}),
+    ]
+    repeat = self.downloads[1]
+    tool_calling_service.read_pdf(self.URL)
+    tool_calling_service.read_pdf(self.URL)
+    self.assertFalse(repeat.read)
+    self.extract.assert_called_once()
+
+  def test_without_etag_identical_content_is_extracted_once(self):
+    self.downloads = [_FakeDownload(body=b"%PDF"), _FakeDownload(body=b"%PDF")]
+    tool_calling_service.read_pdf(self.URL)
+    tool_calling_service.read_pdf(self.URL)
+    self.assertIsNone(self.get.call_args.kwargs["headers"])
+    self.extract.assert_called_once()
+
+  def test_pages_are_returned_up_to_max_chars(self):
+    self.downloads = [_FakeDownload(body=b"%PDF")]
+    result = tool_calling_service.read_pdf(self.URL, max_chars=6)
+    self.assertEqual(result["text"], "aaaa\nbb")
+    self.assertEqual(result["pages"], [1, 2])
+    self.assertTrue(result["truncated"])
+    # The page cut off is read again in full
+    self.assertEqual(result["next_page"], 2)
+
+    self.downloads = [_FakeDownload(body=b"%PDF")]
+    result = tool_calling_service.read_pdf(self.URL, start_page=2, end_page=2)
+    self.assertEqual(result, {"text": "bbbb", "total_pages": 3, "pages": [2, 2], "truncated": False, "next_page": 3})
+
+    self.downloads = [_FakeDownload(body=b"%PDF")]
+    result = tool_calling_service.read_pdf(self.URL, start_page=3)
+    self.assertNotIn("next_page", result)
+
+  def test_single_long_page_is_skipped_past(self):
+    self.downloads = [_FakeDownload(body=b"%PDF")]
+    result = tool_calling_service.read_pdf(self.URL, start_page=2, max_chars=2)
+    self.assertEqual((result["text"], result["pages"], result["next_page"]), ("bb", [2, 2], 3))
+
+  def test_bad_arguments(self):
+    self.downloads = [_FakeDownload(body=b"%PDF")]
+    self.assertIn("past the last page", tool_calling_service.read_pdf(self.URL, start_page=4)["error"])
+
+    self.pages = ["x" * (tool_calling_service.PDF_MAX_CHARS + 10)]
+    self.downloads = [_FakeDownload(body=b"%PDF-big")]
+    result = tool_calling_service.read_pdf(self.URL, max_chars=10**9)
+    self.assertEqual(len(result["text"]), tool_calling_service.PDF_MAX_CHARS)
+
+  def test_download_failures(self):
+    self.downloads = [_FakeDownload(503)]
+    self.assertTrue(tool_calling_service.read_pdf(self.URL)["retryable"])
+    self.downloads = [_FakeDownload(404)]
+    self.assertNotIn("retryable", tool_calling_service.read_pdf(self.URL))
+    self.downloads = [_FakeDownload(body=b"%PDF", headers={"Content-Length": str(10**9)})]
+    self.assertIn("larger than", tool_calling_service.read_pdf(self.URL)["error"])
+
+
+def _json_response(status_code=200, payload=None, headers=None) -> "requests.Response":
+  response = tool_calling_service.requests.Response()
+  response.status_code = status_code
+  response._content = json.dumps(payload).encode() if payload is not None else b""
+  response.headers.update(headers or {})
+  return response
+
+
+class _FakeSession:
+  """A `requests.Session` answering GETs from `routes` (url suffix -> response or exception)."""
+
+  def __init__(self):
+    self.routes = {}
+    self.calls = []
+    self.lock = threading.Lock()
+
+  def get(self, url, **kwargs):
+    with self.lock:
+      self.calls.append((url, kwargs))
+    for suffix, response in self.routes.items():
+      if url.endswith(suffix):
+        if callable(response):
+          response = response()
+        if isinstance(response, Exception):
+          raise response
+        return response
+    raise AssertionError(f"unexpected GET {url}")
+
+  def count(self, suffix):
+    return sum(url.endswith(suffix) for url, _ in self.calls)
+
+
+@unittest.skipUnless(HAS_TOOL_DEPS, "tool dependencies not installed")
+class TestHackerNews(unittest.TestCase):
+  def setUp(self):
+    self.session = _FakeSession()
+    self.ensure_refresher = tool_calling_service._ensure_hn_refresher
+    for target, value in (
+      ("_hn_session", self.session),
+      ("_ensure_hn_refresher", lambda: None),
+    ):
+      patcher = mock.patch.object(tool_calling_service, target, value)
+      patcher.start()
+      self.addCleanup(patcher.stop)
+    for cache in (tool_calling_service._hn_items, tool_calling_service._hn_top):
+      cache.clear()
+      self.addCleanup(cache.clear)
+    self.now = int(time.time())
+
+  def story(self, story_id, **fields):
+    item = {"id": story_id, "type": "story", "title": f"s{story_id}", "score": story_id, "time": self.now}
+    item.update(fields)
+    self.session.routes[f"/item/{story_id}.json"] = lambda: _json_response(payload=item)
+
+  def test_concurrent_misses_share_one_request(self):
+    release = threading.Event()
+
+    def slow_top():
+      release.wait(5)
+      return _json_response(payload=[1, 2])
+
+    self.session.routes["/topstories.json"] = slow_top
+    results = []
+    threads = [
+      threading.Thread(target=lambda: results.append(tool_calling_service.fetch_top_stories()))
+      for _ in range(4)
+    ]
+    for thread in threads:
+      thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+      thread.join(5)
+    self.assertEqual(results, [[1, 2]] * 4)
+    self.assertEqual(self.session.count("/topstories.json"), 1)
+
+  def test_stories_are_filtered_sorted_and_cached(self):
+    self.session.routes["/topstories.json"] = lambda: _json_response(payload=[1, 2, 3, 4, 5])
+    self.story(1)
+    self.story(2, score=50)
+    self.story(3, type="job")
+    self.story(4, time=self.now - 8 * 24 * 60 * 60)
+    self.session.routes["/item/5.json"] = tool_calling_service.requests.ConnectionError("reset")
+
+    stories = tool_calling_service.get_top_hn_stories(limit=5)
+    self.assertEqual([story["id"] for story in stories], [2, 1])
+    self.assertEqual(stories[0]["score"], 50)
+
+    self.assertEqual(tool_calling_service.get_top_hn_stories(limit=2), stories)
+    self.assertEqual(self.session.count("/topstories.json"), 1)
+    self.assertEqual(self.session.count("/item/1.json"), 1)
+
+  def test_failed_top_list_is_a_retryable_error(self):
+    self.session.routes["/topstories.json"] = tool_calling_service.requests.ConnectionError("down")
+    result = tool_calling_service.get_top_hn_stories()
+    self.assertIn("Failed to fetch top stories", result["error"])
+    self.assertTrue(result["retryable"])
+
+    self.session.routes["/topstories.json"] = lambda: _json_response(404)
+    self.assertNotIn("retryable", tool_calling_service.get_top_hn_stories())
+
+  def test_refresher_thread_starts_once(self):
+    stop = threading.Event()
+    self.addCleanup(stop.set)
+    self.addCleanup(tool_calling_service._hn_refresher.update, thread=None)
+    with mock.patch.object(tool_calling_service, "_refresh_hn", stop.wait):
+      for _ in range(3):
+        self.ensure_refresher()
+      thread = tool_calling_service._hn_refresher["thread"]
+      self.assertTrue(thread.is_alive())
+      self.assertEqual(sum(t.name == "hn-refresh" for t in threading.enumerate()), 1)
+
+
+@unittest.skipUnless(HAS_TOOL_DEPS, "tool dependencies not installed")
+class TestGitHub(unittest.TestCase):
+  REPO = "https://api.github.com/repos/octo/demo"
+
+  def setUp(self):
+    self.session = _FakeSession()
+    patcher = mock.patch.object(tool_calling_service, "_github_session", self.session)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    tool_calling_service._github_etags.clear()
+    self.addCleanup(tool_calling_service._github_etags.clear)
+
+  def test_not_modified_reuses_the_cached_response(self):
+    self.session.routes["/demo"] = _json_response(payload={"stars": 1}, headers={"ETag": '"abc"'})
+    first = tool_calling_service.github_get(self.REPO)
+    self.assertNotIn("If-None-Match", self.session.calls[-1][1]["headers"])
+
+    self.session.routes["/demo"] = _json_response(304)
+    again = tool_calling_service.github_get(self.REPO)
+    self.assertIs(again, first)
+    self.assertEqual(self.session.calls[-1][1]["headers"]["If-None-Match"], '"abc"')
+
+    # Different params are a different resource
+    tool_calling_service.github_get(self.REPO, {"per_page": 1})
+    self.assertNotIn("If-None-Match", self.session.calls[-1][1]["headers"])
+
+  def test_errors_are_not_cached(self):
+    self.session.routes["/demo"] = _json_response(502, headers={"ETag": '"abc"'})
+    self.assertEqual(tool_calling_service.github_get(self.REPO).status_code, 502)
+    tool_calling_service.github_get(self.REPO)
+    self.assertNotIn("If-None-Match", self.session.calls[-1][1]["headers"])
+
+  def test_count_from_pagination(self):
+    last = (
+      '<https://api.github.com/repositories/1/branches?per_page=1&page=2>; rel="next", '
+      '<https://api.github.com/repositories/1/branches?per_page=1&page=37>; rel="last"'
+    )
+    count = tool_calling_service._count_from_pagination
+    self.assertEqual(count(_json_response(payload=[{}], headers={"Link": last})), 37)
+    # A single page has no Link header
+    self.assertEqual(count(_json_response(payload=[{}])), 1)
+    self.assertEqual(count(_json_response(payload=[])), 0)
+    self.assertEqual(count(_json_response(404, payload={"message": "Not Found"})), 0)
+
+  def test_repo_info_fans_out_once(self):
+    readme = base64.b64encode(b"# demo").decode()
+    self.session.routes.update(
+      {
+        "/demo": _json_response(payload={"name": "demo", "stargazers_count": 5}),
+        "/languages": _json_response(payload={"Python": 100}),
+        "/commits": _json_response(404),
+        "/branches": _json_response(
+          payload=[{}], headers={"Link": f'<{self.REPO}/branches?per_page=1&page=4>; rel="last"'}
+        ),
+        "/readme": _json_response(payload={"content": readme}),
+      }
+    )
+    info = tool_calling_service.get_github_repo_info("octo/demo")
+    self.assertEqual(
+      (info["stars"], info["languages"], info["latest_commit"], info["branches_count"], info["readme_excerpt"]),
+      (5, {"Python": 100}, None, 4, "# demo"),
+    )
+    self.assertEqual(len(self.session.calls), 5)
+
+  def test_repo_info_errors(self):
+    for suffix in ("/languages", "/commits", "/branches", "/readme"):
+      self.session.routes[suffix] = _json_response(404)
+    self.session.routes["/demo"] = _json_response(404)
+    self.assertEqual(tool_calling_service.get_github_repo_info("octo/demo"), {"error": "Repository not found: octo/demo"})
+    self.session.routes["/demo"] = _json_response(503)
+    self.assertTrue(tool_calling_service.get_github_repo_info("octo/demo")["retryable"])
+
+
+if __name__ == "__main__":
+  unittest.main()
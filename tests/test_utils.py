@@ -1,15 +1,21 @@
+import asyncio
+import importlib.util
+import io
 import json
 import os
 import sys
 import types
 import unittest
-from datetime import datetime, timedelta
+import threading
+import time
 
 SRC_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
 if SRC_PATH not in sys.path:
   sys.path.insert(0, SRC_PATH)
 
-if "discord" not in sys.modules:
+# Only stub discord where it isn't installed, so test modules that need the real
+# one can run in the same process
+if "discord" not in sys.modules and importlib.util.find_spec("discord") is None:
   discord_stub = types.ModuleType("discord")
 
   class Emoji:
@@ -18,12 +24,29 @@ if "discord" not in sys.modules:
   discord_stub.Emoji = Emoji
   sys.modules["discord"] = discord_stub
 
-from utils.cache import ServerCache
-from utils.emoji_utils import replace_emojis, replace_stickers, extract_custom_emojis, get_emoji_cdn_url
+from utils.batch_queue import BatchQueue
+from utils.cache import ServerCache, TTLCache
+from utils.debounce import Debouncer
+from utils.dispatch_queue import DispatchQueue
+from utils.csv_utils import CappedReader, ColumnProfiler
+from utils.degradation import FALLBACK_MODEL, NORMAL, REDUCED_TOOLS, DegradationPolicy
+from utils.emoji_index import EmojiIndex
+from utils.emoji_utils import (
+  replace_emojis,
+  replace_stickers,
+  extract_custom_emojis,
+  extract_custom_emoji_refs,
+  get_emoji_cdn_url,
+)
 from utils.llm_utils import has_vision_content, to_base64_data_uri
 from utils.message_handler import prepare_chat_messages
+from utils.rate_limit import RateLimiter, TokenBucket
+from utils.roster import RosterCache, RosterMember
 from utils.singleton import Singleton
+from utils.token_budget import MESSAGE_OVERHEAD, TokenCounter, pack_context
+from utils.tool_cache import cached_tool, tool_cache_stats
 from utils.tool_executor import ToolExecutor
+from utils.tool_registry import ToolRegistry, ToolSpec
 
 
 class TestLLMUtils(unittest.TestCase):
@@ -108,10 +131,90 @@ class TestToolExecutor(unittest.TestCase):
     )
 
 
+def _schema(name):
+  return {"type": "function", "function": {"name": name}}
+
+
+class TestToolRegistry(unittest.TestCase):
+  def test_call_times_out_and_records_stats(self):
+    registry = ToolRegistry()
+    registry.register(ToolSpec(_schema("fast"), lambda: {"ok": True}))
+    registry.register(ToolSpec(_schema("slow"), lambda: time.sleep(0.5), timeout=0.05))
+    self.assertEqual(registry.call("fast", {}), {"ok": True})
+    with self.assertRaises(TimeoutError):
+      registry.call("slow", {})
+    stats = registry.stats()
+    self.assertEqual(stats["fast"]["calls"], 1)
+    self.assertEqual(stats["slow"]["timeouts"], 1)
+    self.assertEqual([d["function"]["name"] for d in registry.definitions()], ["fast", "slow"])
+
+  def test_max_concurrency(self):
+    registry = ToolRegistry()
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def work():
+      with lock:
+        running.append(1)
+        peak.append(len(running))
+      time.sleep(0.05)
+      with lock:
+        running.pop()
+
+    registry.register(ToolSpec(_schema("work"), work, max_concurrency=2))
+    futures = [registry.dispatch("work", {}) for _ in range(6)]
+    for future in futures:
+      future.result(1)
+    self.assertEqual(max(peak), 2)
+
+  def test_busy_tool_does_not_starve_others(self):
+    registry = ToolRegistry()
+    release = threading.Event()
+    ran = []
+    registry.register(
+      ToolSpec(_schema("busy"), lambda: ran.append(1) or release.wait(1), max_concurrency=1)
+    )
+    registry.register(ToolSpec(_schema("other"), lambda: {"ok": True}))
+    # More queued calls than the shared pool has threads
+    busy = [registry.dispatch("busy", {}) for _ in range(40)]
+    try:
+      self.assertEqual(registry.dispatch("other", {}).result(0.5), {"ok": True})
+      self.assertEqual(registry.stats()["busy"]["waiting"], 39)
+    finally:
+      release.set()
+    for future in busy:
+      future.result(1)
+    self.assertEqual(len(ran), 40)
+
+  def test_cancelled_queued_call_never_runs(self):
+    registry = ToolRegistry()
+    release = threading.Event()
+    ran = []
+
+    def work(n):
+      ran.append(n)
+      release.wait(1)
+
+    registry.register(ToolSpec(_schema("work"), work, max_concurrency=1))
+    first, second, third = (registry.dispatch("work", {"n": n}) for n in range(3))
+    self.assertTrue(second.cancel())
+    release.set()
+    first.result(1)
+    third.result(1)
+    self.assertEqual(ran, [0, 2])
+
+
 class TestServerCache(unittest.TestCase):
   def setUp(self):
     self.cache = ServerCache()
     self.cache.clear_all()
+    self.now = 1000.0
+    self._clock = self.cache._lore_cache.clock
+    self.cache._lore_cache.clock = lambda: self.now
+
+  def tearDown(self):
+    self.cache._lore_cache.clock = self._clock
 
   def test_set_get_and_invalidate(self):
     self.cache.set_lore("guild", "lore")
@@ -119,32 +222,295 @@ class TestServerCache(unittest.TestCase):
     self.cache.invalidate_lore("guild")
     self.assertIsNone(self.cache.get_lore("guild"))
 
+  def test_version_mismatch_is_a_miss(self):
+    self.cache.set_lore("guild", "old lore", version=1)
+    self.assertEqual(self.cache.get_lore("guild", version=1), "old lore")
+    self.assertIsNone(self.cache.get_lore("guild", version=2))
+
+  def test_bump_lore_version(self):
+    before = self.cache.lore_version("guild")
+    self.cache.set_lore("guild", "lore", version=before)
+    after = self.cache.bump_lore_version("guild")
+    self.assertGreater(after, before)
+    self.assertEqual(self.cache.lore_version("guild"), after)
+    self.assertIsNone(self.cache.get_lore("guild", version=before))
+
+  def test_hit_miss_counters(self):
+    self.cache.get_lore("guild")
+    self.cache.set_lore("guild", "lore")
+    self.cache.get_lore("guild")
+    stats = self.cache.get_cache_stats()
+    self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
   def test_cleanup_expired_entries(self):
-    expired_time = datetime.now() - timedelta(minutes=5)
-    self.cache._lore_cache["expired"] = ("old", expired_time)
-    self.cache._lore_cache["active"] = (
-      "new",
-      datetime.now() + timedelta(minutes=5),
-    )
+    self.cache.set_lore("expired", "old")
+    self.now += 301
+    self.cache.set_lore("active", "new")
     removed = self.cache.cleanup_expired()
     self.assertEqual(removed, 1)
     self.assertNotIn("expired", self.cache._lore_cache)
 
   def test_cache_stats(self):
-    self.cache._lore_cache["active"] = (
-      "new",
-      datetime.now() + timedelta(minutes=5),
-    )
-    self.cache._lore_cache["expired"] = (
-      "old",
-      datetime.now() - timedelta(minutes=5),
-    )
+    self.cache.set_lore("expired", "old")
+    self.now += 301
+    self.cache.set_lore("active", "new")
     stats = self.cache.get_cache_stats()
     self.assertEqual(stats["total_entries"], 2)
     self.assertEqual(stats["active_entries"], 1)
     self.assertEqual(stats["expired_entries"], 1)
 
 
+class FakeClock:
+  def __init__(self):
+    self.now = 1000.0
+
+  def __call__(self):
+    return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+  def setUp(self):
+    self.clock = FakeClock()
+
+  def test_evicts_least_recently_used(self):
+    cache = TTLCache(maxsize=2, clock=self.clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    self.assertEqual(cache.get("a"), 1)
+    self.assertIsNone(cache.get("b"))
+    self.assertEqual(cache.stats()["evictions"], 1)
+
+  def test_per_entry_ttl(self):
+    cache = TTLCache(ttl=10, clock=self.clock)
+    cache.set("short", 1, ttl=1)
+    cache.set("long", 2)
+    self.clock.now += 5
+    self.assertIsNone(cache.get("short"))
+    self.assertEqual(cache.get("long"), 2)
+
+  def test_get_or_load_is_single_flight(self):
+    cache = TTLCache()
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def loader():
+      calls.append(1)
+      started.set()
+      release.wait(1)
+      return "value"
+
+    results = []
+    threads = [
+      threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader)))
+      for _ in range(5)
+    ]
+    threads[0].start()
+    started.wait(1)
+    for thread in threads[1:]:
+      thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+      thread.join(1)
+    self.assertEqual(results, ["value"] * 5)
+    self.assertEqual(len(calls), 1)
+
+  def test_serves_stale_while_revalidating(self):
+    cache = TTLCache(ttl=10, stale_ttl=30, clock=self.clock)
+    cache.set("k", "old")
+    self.clock.now += 15
+    refreshed = threading.Event()
+
+    def loader():
+      refreshed.set()
+      return "new"
+
+    self.assertEqual(cache.get_or_load("k", loader), "old")
+    self.assertTrue(refreshed.wait(1))
+    for _ in range(100):
+      if cache.get("k") == "new":
+        break
+      time.sleep(0.01)
+    self.assertEqual(cache.get("k"), "new")
+    self.assertEqual(cache.stats()["stale_hits"], 1)
+
+  def test_get_or_load_async_is_single_flight(self):
+    cache = TTLCache()
+    calls = []
+
+    async def loader():
+      calls.append(1)
+      await asyncio.sleep(0.01)
+      return "value"
+
+    async def main():
+      return await asyncio.gather(*(cache.get_or_load_async("k", loader) for _ in range(5)))
+
+    self.assertEqual(asyncio.run(main()), ["value"] * 5)
+    self.assertEqual(len(calls), 1)
+
+
+class TestToolCache(unittest.TestCase):
+  def setUp(self):
+    # Keep test caches out of the global registry the metrics command reports
+    self.registry = {}
+
+  def test_normalized_arguments_share_an_entry(self):
+    calls = []
+
+    @cached_tool("test_search", ttl=60, registry=self.registry)
+    def search(query, max_results=5):
+      calls.append(query)
+      return {"query": query, "results": []}
+
+    search("Rust  async")
+    search(" rust async ", max_results=5)
+    search("rust async", max_results=3)
+    self.assertEqual(len(calls), 2)
+    stats = self.registry["test_search"].stats()
+    self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+    self.assertNotIn("test_search", tool_cache_stats())
+
+  def test_errors_are_not_cached(self):
+    calls = []
+
+    @cached_tool("test_flaky", ttl=60, registry=self.registry)
+    def flaky(repo):
+      calls.append(repo)
+      return {"error": "rate limited"} if len(calls) == 1 else {"name": repo}
+
+    self.assertIn("error", flaky("a/b"))
+    self.assertEqual(flaky("a/b"), {"name": "a/b"})
+    self.assertEqual(flaky("a/b"), {"name": "a/b"})
+    self.assertEqual(len(calls), 2)
+
+
+class TestCsvUtils(unittest.TestCase):
+  def test_capped_reader_stops_at_limit(self):
+    reader = CappedReader(io.BytesIO(b"a,b\n1,2\n3,4\n"), limit=8)
+    self.assertEqual(reader.read(), b"a,b\n1,2\n")
+    self.assertTrue(reader.capped)
+
+  def test_capped_reader_not_capped_when_file_fits(self):
+    reader = CappedReader(io.BytesIO(b"a,b\n"), limit=8)
+    self.assertEqual(reader.read(), b"a,b\n")
+    self.assertFalse(reader.capped)
+
+  @unittest.skipUnless(importlib.util.find_spec("pandas"), "pandas not installed")
+  def test_profiler_merges_chunks(self):
+    import pandas as pd
+
+    profiler = ColumnProfiler()
+    profiler.update(pd.DataFrame({"n": [1, 2, None], "s": ["a", None, "c"]}))
+    profiler.update(pd.DataFrame({"n": [3.5, 4.5], "s": ["d", "e"]}))
+    summary = profiler.summary()
+    self.assertEqual(summary["n"]["dtype"], "float64")
+    self.assertEqual((summary["n"]["non_null"], summary["n"]["nulls"]), (4, 1))
+    self.assertAlmostEqual(summary["n"]["mean"], 2.75)
+    self.assertAlmostEqual(summary["n"]["std"], pd.Series([1, 2, 3.5, 4.5]).std())
+    self.assertNotIn("mean", summary["s"])
+    self.assertEqual(summary["s"]["nulls"], 1)
+
+
+def _length_counter():
+  # Skip tiktoken so counts are the deterministic ~4 chars/token estimate
+  counter = TokenCounter()
+  counter._loaded = True
+  return counter
+
+
+class TestTokenBudget(unittest.TestCase):
+  def test_counts_are_cached_per_text(self):
+    counter = _length_counter()
+    message = {"role": "user", "content": "x" * 40}
+    self.assertEqual(counter.count_message(message), 10 + MESSAGE_OVERHEAD)
+    counter.count_message(message)
+    self.assertEqual(counter.stats()["hits"], 1)
+
+  def test_keeps_newest_contiguous_history(self):
+    counter = _length_counter()
+    history = [{"role": "user", "content": f"{i}" * 40} for i in range(5)]
+    packed = pack_context(counter, 50, lore="", memories=[], members_list="", history=history)
+    self.assertEqual([m["content"][0] for m in packed.history], ["2", "3", "4"])
+    self.assertEqual(packed.dropped_history, 2)
+
+  def test_priority_order_and_truncation(self):
+    counter = _length_counter()
+    packed = pack_context(
+      counter,
+      40,
+      lore="l" * 80,
+      memories=[{"fact": "f" * 200}, {"fact": "m" * 8}],
+      members_list="## Members\n" + "a" * 40 + "\n" + "b" * 40,
+      history=[{"role": "user", "content": "h" * 400}],
+      reserved=4,
+    )
+    self.assertEqual(packed.lore, "l" * 80)
+    self.assertEqual([m["fact"][0] for m in packed.memories], ["m"])
+    self.assertEqual(packed.history, [])
+    self.assertEqual(packed.members_list, "## Members")
+    self.assertLessEqual(packed.tokens, 36)
+
+  def test_summary_ranks_after_lore(self):
+    counter = _length_counter()
+    packed = pack_context(
+      counter,
+      30,
+      lore="l" * 80,
+      memories=[{"fact": "m" * 8}],
+      members_list="",
+      history=[],
+      summary="s" * 80,
+    )
+    self.assertEqual(packed.summary, "s" * 40)
+    self.assertEqual(packed.memories, [])
+
+
+class TestRosterCache(unittest.TestCase):
+  def test_render_is_cached_until_the_roster_changes(self):
+    roster = RosterCache()
+    self.assertEqual(roster.render("g"), "")
+    roster.load("g", [RosterMember("2", "zed", "Zed"), RosterMember("1", "amy", "Amy")])
+    text = roster.render("g")
+    self.assertLess(text.index("amy"), text.index("zed"))
+    self.assertIs(roster.render("g"), text)
+
+    # An unchanged member does not invalidate the cached text
+    roster.upsert("g", RosterMember("1", "amy", "Amy"))
+    self.assertIs(roster.render("g"), text)
+    roster.upsert("g", RosterMember("1", "amy", "Ames"))
+    roster.remove("g", "2")
+    text = roster.render("g")
+    self.assertIn("(Display: Ames)", text)
+    self.assertNotIn("zed", text)
+
+  def test_events_for_unloaded_guilds_are_ignored(self):
+    roster = RosterCache()
+    roster.upsert("g", RosterMember("1", "amy", "Amy"))
+    self.assertNotIn("g", roster)
+
+  def test_select_prefers_priority_then_recent_members(self):
+    roster = RosterCache()
+    roster.load("g", [RosterMember(str(i), f"user{i}", f"User {i}") for i in range(10)])
+    roster.note_activity("g", "c", "5")
+    roster.note_activity("g", "c", "6")
+    roster.note_activity("g", "other", "7")
+    roster.note_conversation("g", "4")
+
+    text = roster.select("g", "c", ["1", "missing", "2"], limit=4)
+    self.assertIn("(4 of 10)", text)
+    for member_id in ("1", "2", "4", "6"):
+      self.assertIn(f"ID: {member_id}\n", text + "\n")
+    self.assertNotIn("ID: 5\n", text + "\n")
+    self.assertNotIn("ID: 7\n", text + "\n")
+
+    # Small guilds get everyone
+    self.assertEqual(roster.select("g", "c", [], limit=10), roster.render("g"))
+
+
 class ExampleSingleton(metaclass=Singleton):
   def __init__(self, value):
     self.value = value
@@ -185,6 +551,10 @@ class TestEmojiUtils(unittest.TestCase):
     result = extract_custom_emojis("Hello world! No emojis here.")
     self.assertEqual(result, [])
 
+  def test_extract_custom_emoji_refs(self):
+    result = extract_custom_emoji_refs("Hi <:wave:123> <a:dance:456>")
+    self.assertEqual(result, [("123", False), ("456", True)])
+
   def test_get_emoji_cdn_url(self):
     url = get_emoji_cdn_url("123456789", animated=False)
     self.assertEqual(url, "https://cdn.discordapp.com/emojis/123456789.png")
@@ -194,5 +564,206 @@ class TestEmojiUtils(unittest.TestCase):
     self.assertEqual(url, "https://cdn.discordapp.com/emojis/123456789.gif")
 
 
+class TestEmojiIndex(unittest.IsolatedAsyncioTestCase):
+  async def test_guild_emojis_resolve_without_probing(self):
+    index = EmojiIndex()
+    index.load_guild(1, [(10, "https://cdn/10.png"), (11, "https://cdn/11.gif")])
+    index.load_guild(1, [(11, "https://cdn/11.gif")])
+    self.assertIsNone(index.get(10))
+
+    async def probe(url):
+      raise AssertionError("guild emoji was probed")
+
+    index._probe = probe
+    self.assertEqual(await index.resolve([("11", True), ("x", False)]), ["https://cdn/11.gif"])
+
+  async def test_foreign_emojis_are_probed_once(self):
+    index = EmojiIndex()
+    probed = []
+
+    async def probe(url):
+      probed.append(url)
+      if "404" in url:
+        raise LookupError(url)
+      return url
+
+    index._probe = probe
+    for _ in range(2):
+      urls = await index.resolve([("200", False), ("404", True)])
+      self.assertEqual(urls, ["https://cdn.discordapp.com/emojis/200.png"])
+    self.assertEqual(len(probed), 2)
+    self.assertEqual(index.stats()["foreign_missing"], 1)
+
+
+class TestBatchQueue(unittest.IsolatedAsyncioTestCase):
+  async def asyncSetUp(self):
+    self.batches = []
+    self.fail = False
+
+    async def flush(batch):
+      if self.fail:
+        return False
+      self.batches.append(batch)
+      return True
+
+    self.flush = flush
+
+  async def test_flushes_full_batches(self):
+    queue = BatchQueue(self.flush, max_batch=3, max_delay=60)
+    for i in range(7):
+      queue.put(i)
+    await asyncio.sleep(0.01)
+    self.assertEqual(self.batches, [[0, 1, 2], [3, 4, 5]])
+    await queue.stop()
+    self.assertEqual(self.batches[-1], [6])
+    self.assertEqual(queue.stats()["flushed"], 7)
+
+  async def test_flushes_partial_batch_after_delay(self):
+    queue = BatchQueue(self.flush, max_batch=100, max_delay=0.02)
+    queue.put("a")
+    await asyncio.sleep(0.06)
+    self.assertEqual(self.batches, [["a"]])
+    await queue.stop()
+
+  async def test_drops_oldest_when_full(self):
+    queue = BatchQueue(self.flush, max_batch=100, max_delay=60, max_items=2)
+    self.assertTrue(queue.put(1))
+    self.assertTrue(queue.put(2))
+    self.assertFalse(queue.put(3))
+    self.assertEqual(queue.stats()["dropped"], 1)
+    await queue.stop()
+    self.assertEqual(self.batches, [[2, 3]])
+
+  async def test_failed_flush_requeues_batch(self):
+    queue = BatchQueue(self.flush, max_batch=2, max_delay=60, max_backoff=60)
+    self.fail = True
+    queue.put(1)
+    queue.put(2)
+    await asyncio.sleep(0.01)
+    stats = queue.stats()
+    self.assertEqual(stats["failed_flushes"], 1)
+    self.assertEqual(stats["depth"], 2)
+    self.fail = False
+    await queue.stop()
+    self.assertEqual(self.batches, [[1, 2]])
+
+
+class TestDebouncer(unittest.IsolatedAsyncioTestCase):
+  async def asyncSetUp(self):
+    self.flushed = []
+
+    async def flush(key, items):
+      self.flushed.append((key, items))
+
+    self.flush = flush
+
+  async def test_merges_items_inside_window_per_key(self):
+    debouncer = Debouncer(self.flush, window=0.03)
+    debouncer.put("a", 1)
+    debouncer.put("b", 2)
+    await asyncio.sleep(0.01)
+    debouncer.put("a", 3)
+    await asyncio.sleep(0.08)
+    self.assertEqual(sorted(self.flushed), [("a", [1, 3]), ("b", [2])])
+    self.assertEqual(debouncer.stats()["merged"], 1)
+
+  async def test_max_wait_bounds_a_steady_stream(self):
+    debouncer = Debouncer(self.flush, window=0.03, max_wait=0.05)
+    for i in range(6):
+      debouncer.put("a", i)
+      await asyncio.sleep(0.02)
+    await asyncio.sleep(0.05)
+    self.assertGreaterEqual(len(self.flushed), 2)
+    self.assertEqual([i for _, items in self.flushed for i in items], list(range(6)))
+
+  async def test_flush_key_flushes_now(self):
+    debouncer = Debouncer(self.flush, window=60)
+    debouncer.put("a", 1)
+    await debouncer.flush_key("a")
+    await debouncer.flush_key("a")
+    self.assertEqual(self.flushed, [("a", [1])])
+    self.assertEqual(debouncer.stats()["pending"], 0)
+
+
+class TestRateLimit(unittest.TestCase):
+  def test_token_bucket_refills_over_time(self):
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, burst=2, clock=clock)
+    self.assertTrue(bucket.try_acquire())
+    self.assertTrue(bucket.try_acquire())
+    self.assertFalse(bucket.try_acquire())
+    clock.now += 1.5
+    self.assertTrue(bucket.try_acquire())
+    self.assertFalse(bucket.try_acquire())
+
+  def test_rate_limiter_is_per_key(self):
+    clock = FakeClock()
+    limiter = RateLimiter(2, clock=clock)
+    self.assertEqual([limiter.allow("a") for _ in range(3)], [True, True, False])
+    self.assertTrue(limiter.allow("b"))
+    clock.now += 30
+    self.assertTrue(limiter.allow("a"))
+    self.assertEqual(limiter.stats(), {"keys": 2, "limited": 1})
+    self.assertTrue(all(RateLimiter(0).allow("a") for _ in range(100)))
+
+
+class TestDispatchQueue(unittest.IsolatedAsyncioTestCase):
+  async def test_bounded_workers_and_shedding(self):
+    release = asyncio.Event()
+    handled = []
+
+    async def handler(item):
+      await release.wait()
+      if item == "bad":
+        raise ValueError(item)
+      handled.append(item)
+
+    queue = DispatchQueue(handler, workers=2, maxsize=2)
+    self.assertTrue(queue.offer("a") and queue.offer("b"))
+    await asyncio.sleep(0)
+    # Both workers are busy; two more can wait, the next is shed
+    self.assertEqual(queue.stats()["busy"], 2)
+    self.assertEqual([queue.offer(i) for i in ("bad", "c", "d")], [True, True, False])
+    release.set()
+    await queue._queue.join()
+    await queue.stop()
+    self.assertEqual(sorted(handled), ["a", "b", "c"])
+    stats = queue.stats()
+    self.assertEqual((stats["processed"], stats["failed"], stats["shed"]), (3, 1, 1))
+
+
+class TestDegradationPolicy(unittest.TestCase):
+  def test_steps_down_under_rate_limits_and_recovers(self):
+    clock = FakeClock()
+    policy = DegradationPolicy(clock=clock)
+    for _ in range(4):
+      policy.record(rate_limited=True)
+    self.assertEqual(policy.level, REDUCED_TOOLS)
+    # One step at a time
+    self.assertEqual(policy.level, REDUCED_TOOLS)
+    clock.now += 15
+    self.assertEqual(policy.level, FALLBACK_MODEL)
+
+    # Old 429s age out; pressure between the thresholds holds the level
+    clock.now += 61
+    policy.observe_backlog(0.3)
+    self.assertEqual(policy.level, FALLBACK_MODEL)
+    policy.observe_backlog(0.1)
+    self.assertEqual(policy.level, REDUCED_TOOLS)
+    self.assertEqual(policy.level, REDUCED_TOOLS)
+    clock.now += 60
+    self.assertEqual(policy.level, NORMAL)
+    self.assertEqual(policy.stats()["transitions"], 4)
+
+  def test_few_samples_and_stale_backlog_are_ignored(self):
+    clock = FakeClock()
+    policy = DegradationPolicy(clock=clock)
+    policy.record(rate_limited=True)
+    self.assertEqual(policy.level, NORMAL)
+    policy.observe_backlog(1.0)
+    clock.now += 61
+    self.assertEqual(policy.level, NORMAL)
+
+
 if __name__ == "__main__":
   unittest.main()
@@ -0,0 +1,418 @@
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+SRC_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if SRC_PATH not in sys.path:
+  sys.path.insert(0, SRC_PATH)
+
+# utils.config exits on missing settings; the workflows only need them to be present
+for _name in (
+  "ENVIRONMENT",
+  "DISCORD_TOKEN",
+  "TENOR_API_KEY",
+  "MANAGER_API_TOKEN",
+  "OPENROUTER_API_KEY",
+  "OPENROUTER_MODEL",
+  "EXA_API_KEY",
+  "VOYAGEAI_API_KEY",
+  "MEILI_MASTER_KEY",
+  "GITHUB_TOKEN",
+):
+  os.environ.setdefault(_name, "test")
+os.environ.setdefault("ADMIN_LIST", "1")
+
+
+def _installed(name: str) -> bool:
+  # test_utils may have put a spec-less discord stub in sys.modules, which
+  # find_spec rejects with ValueError
+  if name in sys.modules:
+    return getattr(sys.modules[name], "__spec__", None) is not None
+  return importlib.util.find_spec(name) is not None
+
+
+HAS_WORKER_DEPS = all(_installed(name) for name in ("temporalio", "openai", "discord", "httpx"))
+
+if HAS_WORKER_DEPS:
+  import requests
+  from cogs.message_handler import merge_chat_requests
+  from temporalio.testing import ActivityEnvironment
+
+  from activities import llm
+  from activities.models import (
+    ChatRequest,
+    ChatTurnResult,
+    GuildSessionState,
+    TokenUsage,
+    ToolCall,
+    ToolCallOutcome,
+  )
+  from utils.config import CONTEXT_LIMIT
+  from utils.tool_registry import ToolRegistry, ToolSpec
+  from workflows import chat_workflow, session_workflow
+  from workflows.chat_workflow import BooChatWorkflow, split_history
+  from workflows.session_workflow import GuildSessionWorkflow
+
+
+def _request(message_id: str, is_reset: bool = False, **kwargs) -> "ChatRequest":
+  kwargs.setdefault("prompt", "hi")
+  return ChatRequest(
+    channel_id="c",
+    message_id=message_id,
+    guild_id="g",
+    server_id="g",
+    server_name="Guild",
+    channel_name="general",
+    author_id="u",
+    author_name="user",
+    author_display_name="User",
+    is_reset=is_reset,
+    **kwargs,
+  )
+
+
+class _ContinueAsNew(Exception):
+  def __init__(self, state):
+    super().__init__("continue-as-new")
+    self.state = state
+
+
+class FakeWorkflowRuntime:
+  """
+  Stands in for the temporalio.workflow calls GuildSessionWorkflow makes. Activities
+  are answered by `handlers` (activity name -> function), child chat turns by
+  `turn`, and every wait_condition that would block times out immediately.
+  """
+
+  def __init__(self, test: unittest.TestCase):
+    self.handlers = {}
+    self.calls = []
+    self.children = []
+    self.timeouts = []
+    self.turn = lambda req: ChatTurnResult(appended_messages=[{"role": "user", "content": req.prompt}])
+    self._patcher = mock.patch.multiple(
+      session_workflow.workflow,
+      execute_activity=self.execute_activity,
+      execute_child_workflow=self.execute_child_workflow,
+      wait_condition=self.wait_condition,
+      continue_as_new=self.continue_as_new,
+      all_handlers_finished=lambda: True,
+      info=lambda: SimpleNamespace(is_continue_as_new_suggested=lambda: False),
+      logger=mock.Mock(),
+    )
+    self._patcher.start()
+    test.addCleanup(self._patcher.stop)
+
+  async def execute_activity(self, fn, arg=None, *, args=None, **_kwargs):
+    args = [arg] if args is None else args
+    self.calls.append((fn.__name__, args))
+    result = self.handlers[fn.__name__](*args)
+    if asyncio.iscoroutine(result):
+      result = await result
+    return result
+
+  async def execute_child_workflow(self, _run, *, args, id, **_kwargs):
+    self.children.append(id)
+    return self.turn(args[0])
+
+  async def wait_condition(self, fn, *, timeout=None):
+    await asyncio.sleep(0)
+    if fn():
+      return
+    if timeout is None:
+      raise AssertionError("wait_condition would block forever")
+    self.timeouts.append(timeout)
+    raise asyncio.TimeoutError()
+
+  def continue_as_new(self, state):
+    raise _ContinueAsNew(state)
+
+  def called(self, name: str) -> list:
+    return [args for called, args in self.calls if called == name]
+
+
+@unittest.skipUnless(HAS_WORKER_DEPS, "worker dependencies not installed")
+class TestSplitHistory(unittest.TestCase):
+  def test_at_and_around_the_limit(self):
+    history = list(range(10))
+    self.assertEqual(split_history(history[:9], limit=10), ([], history[:9]))
+    self.assertEqual(split_history(history, limit=10), ([], history))
+    evicted, kept = split_history(history + [10], limit=10)
+    self.assertEqual((evicted, kept), (list(range(6)), list(range(6, 11))))
+
+  def test_tiny_limit_keeps_one(self):
+    self.assertEqual(split_history([1, 2], limit=1), ([1], [2]))
+
+  def test_defaults_to_context_limit(self):
+    history = list(range(CONTEXT_LIMIT + 1))
+    self.assertEqual(split_history(history[:-1]), ([], history[:-1]))
+    evicted, kept = split_history(history)
+    self.assertEqual(len(kept), max(CONTEXT_LIMIT // 2, 1))
+    self.assertEqual(evicted + kept, history)
+
+
+@unittest.skipUnless(HAS_WORKER_DEPS, "worker dependencies not installed")
+class TestGuildSessionWorkflow(unittest.IsolatedAsyncioTestCase):
+  def setUp(self):
+    self.runtime = FakeWorkflowRuntime(self)
+    self.runtime.handlers.update(
+      get_chat_history=lambda server_id: [],
+      get_chat_summary=lambda server_id: "",
+      update_chat_history=lambda server_id, history: None,
+      update_chat_summary=lambda server_id, summary: None,
+      summarize_history=lambda payload: f"{payload.summary}+{len(payload.messages)}",
+    )
+    self.session = GuildSessionWorkflow()
+
+  async def test_persist_stays_dirty_if_changed_while_writing(self):
+    self.session._state = GuildSessionState(server_id="g", history=[])
+    self.session._mark_dirty()
+    # A compaction lands while the history write is in flight
+    self.runtime.handlers["update_chat_history"] = lambda *_: self.session._mark_dirty()
+    await self.session._persist()
+    self.assertTrue(self.session._state.dirty)
+
+    self.runtime.handlers["update_chat_history"] = lambda *_: None
+    await self.session._persist()
+    self.assertFalse(self.session._state.dirty)
+
+  async def test_failed_persist_stays_dirty(self):
+    self.session._state = GuildSessionState(server_id="g", history=[])
+    self.session._mark_dirty()
+
+    def fail(*_):
+      raise RuntimeError("manager down")
+
+    self.runtime.handlers["update_chat_history"] = fail
+    await self.session._persist()
+    self.assertTrue(self.session._state.dirty)
+
+  async def test_reset_discards_in_flight_compaction(self):
+    release = asyncio.Event()
+
+    async def summarize(payload):
+      await release.wait()
+      return "stale summary"
+
+    self.runtime.handlers["summarize_history"] = summarize
+    state = GuildSessionState(
+      server_id="g", history=[{"role": "user", "content": "old"}], summary="old", evicted=[{}]
+    )
+    self.session._state = state
+    self.session._start_compaction()
+    await asyncio.sleep(0)
+
+    self.runtime.turn = lambda req: ChatTurnResult()
+    await self.session._run_turn(_request("1", is_reset=True))
+    self.assertEqual(self.session._generation, 1)
+    self.assertEqual((state.history, state.summary), ([], ""))
+
+    release.set()
+    await self.session._drain_compaction()
+    self.assertEqual(state.summary, "")
+    self.assertFalse(state.dirty)
+
+  async def test_pending_requests_survive_continue_as_new(self):
+    with mock.patch.object(session_workflow, "_MAX_TURNS_PER_RUN", 1):
+      state = GuildSessionState(server_id="g", pending=[_request("1")])
+      self.session.submit(_request("2"))
+      with self.assertRaises(_ContinueAsNew) as raised:
+        await self.session.run(state)
+
+    carried = raised.exception.state
+    self.assertEqual([r.message_id for r in carried.pending], ["2"])
+    self.assertEqual(self.runtime.children, ["chat-1"])
+    self.assertFalse(carried.dirty)
+    self.assertEqual(self.runtime.called("update_chat_history"), [["g", carried.history]])
+
+    await GuildSessionWorkflow().run(carried)
+    self.assertEqual(self.runtime.children, ["chat-1", "chat-2"])
+    self.assertEqual(len(carried.history), 2)
+
+  async def test_idle_shutdown_retries_a_failed_persist(self):
+    failures = [RuntimeError("manager down")]
+
+    def update_summary(server_id, summary):
+      if failures:
+        raise failures.pop()
+
+    async def summarize(payload):
+      # Still running when the idle timeout fires, so shutdown has to drain it
+      for _ in range(3):
+        await asyncio.sleep(0)
+      return "+1"
+
+    self.runtime.handlers["update_chat_summary"] = update_summary
+    self.runtime.handlers["summarize_history"] = summarize
+    state = GuildSessionState(server_id="g", history=[], evicted=[{}])
+    await self.session.run(state)
+
+    self.assertEqual(
+      self.runtime.timeouts,
+      [session_workflow._IDLE_TIMEOUT, session_workflow._PERSIST_DELAY, session_workflow._IDLE_TIMEOUT],
+    )
+    self.assertEqual(self.runtime.called("update_chat_summary")[-1], ["g", "+1"])
+    self.assertFalse(state.dirty)
+
+
+@unittest.skipUnless(HAS_WORKER_DEPS, "worker dependencies not installed")
+class TestMergeChatRequests(unittest.TestCase):
+  def test_single_request_is_unchanged(self):
+    req = _request("1")
+    self.assertIs(merge_chat_requests([req]), req)
+
+  def test_orders_by_snowflake_and_replies_to_last(self):
+    # "9" < "10" numerically but not as strings
+    merged = merge_chat_requests(
+      [_request("10", prompt="second"), _request("9", prompt="first"), _request("11", prompt="")]
+    )
+    self.assertEqual(merged.message_id, "11")
+    self.assertEqual(merged.prompt, "first\nsecond")
+    self.assertEqual(merged.merged_message_ids, ["9", "10"])
+
+  def test_unions_keep_first_seen_order_without_duplicates(self):
+    merged = merge_chat_requests(
+      [
+        _request("1", image_urls=["a", "b"], mentioned_ids=["u1"], emoji_urls=["e"]),
+        _request("2", image_urls=["b", "c"], mentioned_ids=["u2", "u1"], sticker_urls=["s"]),
+      ]
+    )
+    self.assertEqual(merged.image_urls, ["a", "b", "c"])
+    self.assertEqual(merged.mentioned_ids, ["u1", "u2"])
+    self.assertEqual((merged.sticker_urls, merged.emoji_urls), (["s"], ["e"]))
+
+  def test_merging_merged_requests_keeps_every_id(self):
+    first = merge_chat_requests([_request("1"), _request("2")])
+    second = merge_chat_requests([_request("4"), _request("3")])
+    merged = merge_chat_requests([second, first, _request("5")])
+    self.assertEqual(merged.message_id, "5")
+    self.assertEqual(merged.merged_message_ids, ["1", "2", "3", "4"])
+    self.assertEqual(merged.prompt, "hi\nhi\nhi\nhi\nhi")
+
+
+@unittest.skipUnless(HAS_WORKER_DEPS, "worker dependencies not installed")
+class TestToolLoop(unittest.IsolatedAsyncioTestCase):
+  async def test_usage_is_summed_over_rounds(self):
+    rounds = [
+      llm.ChatRoundResult(
+        content="", tool_calls=[ToolCall(id="1", name="search_web")], usage=TokenUsage(100, 120)
+      ),
+      llm.ChatRoundResult(content="done", usage=TokenUsage(150, 180)),
+    ]
+
+    async def execute_activity(fn, arg=None, **_kwargs):
+      if fn is llm.pack_chat_messages:
+        return []
+      if fn is llm.run_chat_round:
+        return rounds.pop(0)
+      return ToolCallOutcome(call_id=arg.call.id, content="{}")
+
+    with mock.patch.object(chat_workflow.workflow, "execute_activity", execute_activity):
+      result = await BooChatWorkflow()._run_tool_loop(_request("1"), None)
+
+    self.assertEqual(result.response_text, "done")
+    self.assertEqual(result.usage, TokenUsage(prompt_tokens=250, total_tokens=300))
+
+
+@unittest.skipUnless(HAS_WORKER_DEPS, "worker dependencies not installed")
+class TestToolCallRetry(unittest.IsolatedAsyncioTestCase):
+  """execute_tool_call activities under the workflow's tool retry policy."""
+
+  def setUp(self):
+    self.attempts = {}
+    registry = ToolRegistry()
+    for name, function, timeout in (
+      ("flaky", self._flaky, 5.0),
+      ("broken", self._broken, 5.0),
+      ("down", self._down, 5.0),
+      ("hung", self._hung, 0.05),
+    ):
+      schema = {"type": "function", "function": {"name": name}}
+      registry.register(ToolSpec(schema, function, timeout=timeout))
+    patcher = mock.patch("services.llm_service.tool_registry", registry)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    patcher = mock.patch.multiple(
+      chat_workflow.workflow, execute_activity=self._execute_activity, logger=mock.Mock()
+    )
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def _attempt(self, name: str) -> int:
+    self.attempts[name] = self.attempts.get(name, 0) + 1
+    return self.attempts[name]
+
+  def _flaky(self):
+    if self._attempt("flaky") == 1:
+      return {"error": "GitHub API error: 503", "retryable": True}
+    return {"ok": True}
+
+  def _broken(self):
+    self._attempt("broken")
+    return {"error": "Repository not found: a/b"}
+
+  def _down(self):
+    self._attempt("down")
+    raise ConnectionError("sandbox unreachable")
+
+  def _hung(self):
+    if self._attempt("hung") == 1:
+      time.sleep(0.5)
+    return {"ok": True}
+
+  async def _execute_activity(self, fn, arg, *, retry_policy, **_kwargs):
+    # What Temporal does with the policy: any activity failure is retried
+    for attempt in range(1, retry_policy.maximum_attempts + 1):
+      try:
+        return await ActivityEnvironment().run(fn, arg)
+      except Exception:
+        if attempt == retry_policy.maximum_attempts:
+          raise
+
+  async def _run(self, name: str):
+    return await BooChatWorkflow()._run_tool(ToolCall(id=name, name=name), "g")
+
+  async def test_transient_failure_is_retried(self):
+    outcome = await self._run("flaky")
+    self.assertEqual(self.attempts["flaky"], 2)
+    self.assertEqual(json.loads(outcome.content), {"ok": True})
+
+  async def test_permanent_failure_is_not_retried(self):
+    outcome = await self._run("broken")
+    self.assertEqual(self.attempts["broken"], 1)
+    self.assertIn("not found", json.loads(outcome.content)["error"])
+
+  async def test_missed_deadline_is_retried(self):
+    outcome = await self._run("hung")
+    self.assertEqual(self.attempts["hung"], 2)
+    self.assertEqual(json.loads(outcome.content), {"ok": True})
+
+  async def test_exhausted_retries_become_an_error_result(self):
+    outcome = await self._run("down")
+    self.assertEqual(self.attempts["down"], chat_workflow._tool_retry.maximum_attempts)
+    self.assertIn("sandbox unreachable", json.loads(outcome.content)["error"])
+
+  def test_tools_flag_only_transient_errors(self):
+    from services import tool_calling_service
+
+    with mock.patch.object(
+      tool_calling_service.requests, "post", side_effect=requests.ConnectionError("refused")
+    ):
+      self.assertTrue(tool_calling_service.run_code("1")["retryable"])
+    response = requests.Response()
+    response.status_code = 404
+    with mock.patch.object(tool_calling_service, "github_get", return_value=response):
+      self.assertNotIn("retryable", tool_calling_service.search_github("q"))
+    response.status_code = 502
+    with mock.patch.object(tool_calling_service, "github_get", return_value=response):
+      self.assertTrue(tool_calling_service.search_github("q")["retryable"])
+
+
+if __name__ == "__main__":
+  unittest.main()